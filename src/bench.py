@@ -0,0 +1,306 @@
+"""
+Bench — 裝置上的微基準測試（mpremote run src/bench.py）。
+
+同一份資料以不同格式 / 解析方式處理，比較耗時與 heap 用量：
+耗時以 time.ticks_us() 量測多次取平均；heap 用量在 gc 停用下執行一次，
+以 gc.mem_free() 的前後差計算（期間不回收，即為峰值上限）。
+在 CPython 上試跑時改用 perf_counter 與 tracemalloc。
+"""
+import gc
+import json
+import struct
+import time
+
+from json_stream import JsonStream
+from mini_ticker import MiniTickerTable
+from weather_data import WeatherRecord, dispatch, decode_fb
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:  # CPython
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+_CHUNK = 256  # 與 json_stream.parse_stream 相同的讀取大小
+
+
+def _heap_used(fn):
+    """執行 fn 一次，回傳期間配置的 bytes。"""
+    if hasattr(gc, "mem_free"):
+        gc.collect()
+        gc.disable()
+        try:
+            free = gc.mem_free()
+            fn()
+            return free - gc.mem_free()
+        finally:
+            gc.enable()
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(name, fn, repeat=20):
+    """量測 fn 的平均耗時與 heap 用量並印出。
+
+    Returns:
+        (平均微秒, heap bytes)。
+    """
+    heap = _heap_used(fn)
+    gc.collect()
+    t0 = ticks_us()
+    for _ in range(repeat):
+        fn()
+    us = ticks_diff(ticks_us(), t0) // repeat
+    print("  {:<20} {:>8} us {:>8} B".format(name, us, heap))
+    return us, heap
+
+
+# --- Open-Meteo 測試資料 ---
+
+def _weather_sample():
+    """與 WeatherPage 請求相同欄位的 4 日 / 48 小時資料。"""
+    hours = 48
+    return {
+        "utc_offset": 28800,
+        "day_time": 1792339200,    # 2026-10-19 00:00 +08:00
+        "hour_time": 1792357200,   # 2026-10-19 05:00 +08:00
+        "current": (21.4, 72, 3, 8.6),
+        "day_code": [3, 61, 80, 1],
+        "day_max": [25.1, 24.3, 26.8, 27.2],
+        "day_min": [19.0, 18.7, 20.2, 20.9],
+        "hour_temp": [19.0 + (h % 24) * 0.35 for h in range(hours)],
+        "hour_precip": [(h * 7) % 100 for h in range(hours)],
+        "hour_code": [61 if h % 12 > 8 else 3 for h in range(hours)],
+    }
+
+
+def _weather_json(s):
+    """測試資料 → Open-Meteo JSON 回應（含 *_units 等實際會收到的欄位）。"""
+    def day(i):
+        return "2026-10-{:02d}".format(19 + i)
+
+    def hour(h):
+        return "2026-10-{:02d}T{:02d}:00".format(19 + (h + 5) // 24,
+                                                 (h + 5) % 24)
+    temp, hum, code, wind = s["current"]
+    doc = {
+        "latitude": 25.0, "longitude": 121.5625,
+        "generationtime_ms": 0.12, "utc_offset_seconds": s["utc_offset"],
+        "timezone": "Asia/Taipei", "timezone_abbreviation": "GMT+8",
+        "elevation": 12.0,
+        "current_units": {
+            "time": "iso8601", "interval": "seconds",
+            "temperature_2m": "°C", "relative_humidity_2m": "%",
+            "weather_code": "wmo code", "wind_speed_10m": "km/h",
+        },
+        "current": {
+            "time": "2026-10-19T05:00", "interval": 900,
+            "temperature_2m": temp, "relative_humidity_2m": hum,
+            "weather_code": code, "wind_speed_10m": wind,
+        },
+        "hourly_units": {
+            "time": "iso8601", "temperature_2m": "°C",
+            "precipitation_probability": "%", "weather_code": "wmo code",
+        },
+        "hourly": {
+            "time": [hour(h) for h in range(len(s["hour_temp"]))],
+            "temperature_2m": s["hour_temp"],
+            "precipitation_probability": s["hour_precip"],
+            "weather_code": s["hour_code"],
+        },
+        "daily_units": {
+            "time": "iso8601", "weather_code": "wmo code",
+            "temperature_2m_max": "°C", "temperature_2m_min": "°C",
+        },
+        "daily": {
+            "time": [day(i) for i in range(len(s["day_code"]))],
+            "weather_code": s["day_code"],
+            "temperature_2m_max": s["day_max"],
+            "temperature_2m_min": s["day_min"],
+        },
+    }
+    return json.dumps(doc).encode()
+
+
+def _fb_table(out, fields):
+    """在 out 尾端寫入 vtable + table。
+
+    fields 為 [(slot, fmt, value)]；fmt 為 "ref" 時寫入佔位，
+    之後以 _fb_link 指向子物件。
+
+    Returns:
+        (table 位置, {slot: 欄位位置})。
+    """
+    n = max(f[0] for f in fields) + 1
+    offsets = [0] * n
+    size = 4
+    for slot, fmt, _ in fields:
+        offsets[slot] = size
+        size += struct.calcsize("<I" if fmt == "ref" else fmt)
+    vt = len(out)
+    out += struct.pack("<HH" + "H" * n, 4 + 2 * n, size, *offsets)
+    while len(out) % 4:
+        out.append(0)
+    t = len(out)
+    out += struct.pack("<i", t - vt)
+    pos = {}
+    for slot, fmt, value in fields:
+        pos[slot] = len(out)
+        if fmt == "ref":
+            out += b"\0\0\0\0"
+        else:
+            out += struct.pack(fmt, value)
+    return t, pos
+
+
+def _fb_link(out, at, target):
+    """把 at 處的 uoffset 指向 target。"""
+    struct.pack_into("<I", out, at, target - at)
+
+
+def _fb_variables(out, vars_pos, items):
+    """寫入 VariableWithValues 向量；items 為 (variable, aggregation, value
+    或 float 串列)。"""
+    vec = len(out)
+    out += struct.pack("<I", len(items)) + b"\0" * (4 * len(items))
+    _fb_link(out, vars_pos, vec)
+    for i, (var, agg, data) in enumerate(items):
+        fields = [(0, "B", var), (6, "B", agg)]
+        if isinstance(data, list):
+            fields.append((3, "ref", None))
+        else:
+            fields.append((2, "<f", data))
+        t, pos = _fb_table(out, fields)
+        _fb_link(out, vec + 4 + 4 * i, t)
+        if isinstance(data, list):
+            _fb_link(out, pos[3], len(out))
+            out += struct.pack("<I{}f".format(len(data)), len(data), *data)
+
+
+def _weather_fb(s):
+    """測試資料 → Open-Meteo FlatBuffers 回應（一則 size-prefixed 訊息）。
+
+    只編碼 decode_fb 會讀取的欄位，供 bench 使用。
+    """
+    out = bytearray(4)  # root uoffset
+    root, rpos = _fb_table(out, [
+        (0, "<f", 25.0), (1, "<f", 121.5625), (6, "<i", s["utc_offset"]),
+        (9, "ref", None), (10, "ref", None), (11, "ref", None),
+    ])
+    _fb_link(out, 0, root)
+    temp, hum, code, wind = s["current"]
+    sections = (
+        (9, 0, 900, [(47, 0, temp), (29, 0, hum), (56, 0, code),
+                     (59, 0, wind)]),
+        (10, s["day_time"], 86400, [(56, 9, s["day_code"]),
+                                    (47, 2, s["day_max"]),
+                                    (47, 1, s["day_min"])]),
+        (11, s["hour_time"], 3600, [(47, 0, s["hour_temp"]),
+                                    (26, 0, s["hour_precip"]),
+                                    (56, 0, s["hour_code"])]),
+    )
+    for slot, t0, interval, items in sections:
+        t, pos = _fb_table(out, [
+            (0, "<q", t0), (2, "<i", interval), (3, "ref", None),
+        ])
+        _fb_link(out, rpos[slot], t)
+        _fb_variables(out, pos[3], [
+            (var, agg, [float(v) for v in data]
+             if isinstance(data, list) else float(data))
+            for var, agg, data in items
+        ])
+    return struct.pack("<I", len(out)) + out
+
+
+def bench_weather(repeat=20):
+    """Open-Meteo 回應：json.loads vs json_stream vs FlatBuffers。"""
+    sample = _weather_sample()
+    body = _weather_json(sample)
+    msg = _weather_fb(sample)
+    # FlatBuffers 訊息已讀進 buffer（read_messages 的狀態），只量解碼
+    fb_buf = bytearray(msg[4:])
+    record = WeatherRecord(25.0, 121.5625)
+    callback = dispatch([record])
+
+    def run_loads():
+        json.loads(body)
+
+    def run_stream():
+        parser = JsonStream(callback)
+        mv = memoryview(body)
+        for i in range(0, len(body), _CHUNK):
+            parser.feed(mv[i:i + _CHUNK])
+        parser.close()
+
+    def run_fb():
+        decode_fb(fb_buf, record)
+
+    print("weather: JSON {} B, FlatBuffers {} B".format(len(body), len(msg)))
+    measure("json.loads", run_loads, repeat)
+    measure("json_stream", run_stream, repeat)
+    measure("flatbuffers", run_fb, repeat)
+
+    # 兩種格式必須得到相同結果
+    fb_record = WeatherRecord()
+    decode_fb(fb_buf, fb_record)
+    json_record = WeatherRecord()
+    parser = JsonStream(dispatch([json_record]))
+    parser.feed(body)
+    parser.close()
+    for name in ("code", "days", "hours", "hour_start"):
+        assert getattr(fb_record, name) == getattr(json_record, name), name
+    assert list(fb_record.weekday) == list(json_record.weekday)
+    assert list(fb_record.hour_precip) == list(json_record.hour_precip)
+
+
+# --- Binance miniTicker ---
+
+_TICKER = (
+    b'{"stream":"btcusdt@miniTicker","data":{"e":"24hrMiniTicker",'
+    b'"E":1792357200123,"s":"BTCUSDT","c":"67012.34000000",'
+    b'"o":"65000.01000000","h":"68000.00000000","l":"64000.00000000",'
+    b'"v":"12345.67800000","q":"827361234.12345678"}}'
+)
+
+
+def bench_ticker(repeat=200):
+    """miniTicker 訊息：json.loads（舊路徑）vs MiniTickerTable 擷取。"""
+    buf = bytearray(512)
+    n = len(_TICKER)
+    buf[:n] = _TICKER
+    table = MiniTickerTable(("BTCUSDT", "ETHUSDT"))
+
+    def run_loads():
+        # 與改版前 MarketPage._on_ws_message 相同
+        msg = json.loads(bytes(buf[:n]))
+        ticker = msg.get("data", msg)
+        close_p = float(ticker.get("c", 0))
+        open_p = float(ticker.get("o", 0))
+        return ticker.get("s", ""), close_p, open_p
+
+    def run_extract():
+        table.parse(buf, n)
+
+    print("miniTicker: {} B/message".format(n))
+    for name, fn in (("json.loads", run_loads), ("extractor", run_extract)):
+        us, heap = measure(name, fn, repeat)
+        print("  {:<20} {:>8} msg/s".format(name, 1000000 // max(us, 1)))
+    assert table.fallbacks == 0
+    assert abs(table.close[0] - 67012.34) < 0.01
+
+
+def run():
+    bench_weather()
+    bench_ticker()
+
+
+if __name__ == "__main__":
+    run()
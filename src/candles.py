@@ -0,0 +1,249 @@
+"""
+Candles — K 線（OHLC）序列，價格以縮放整數存在 array('i')。
+
+Binance 的價格是十進位字串（"67012.34000000"），這裡直接逐位累加成
+「價格 × 10^decimals」的整數，不經過 float（RP2 上是單精度，五位數以上
+的價格會失真），也不配置中間字串。decimals 依第一個價格決定，保留約
+7 位有效數字。
+
+資料來源有兩個：
+- REST /api/v3/klines 回填（json_stream callback，見 CandleSeries.backfill）
+- WebSocket <symbol>@kline_1m 推送（在接收 buffer 上就地擷取，見 parse）
+"""
+from array import array
+from mini_ticker import find
+
+_KEY_KLINE = b'"k":{'
+_KEY_SYMBOL = b'"s":"'
+_KEY_TIME = b'"t":'
+_KEYS = (b'"o":"', b'"h":"', b'"l":"', b'"c":"')
+
+_SIG_DIGITS = 7     # 保留的有效位數（int32 仍有兩個數量級的餘裕）
+_MAX_DECIMALS = 8   # Binance 價格最多 8 位小數
+_MS_PER_MIN = 60000
+
+# 回填：klines 每根為 [open time, open, high, low, close, ...]
+_COL_TIME = 0
+_COL_CLOSE = 4
+
+
+def kline_start(buf, n):
+    """buf[:n] 若為 kline 推送，回傳 "k" 物件的位置，否則回傳 -1。"""
+    return find(buf, _KEY_KLINE, 0, n)
+
+
+def decimals_for(buf, start, end):
+    """依價格字串決定縮放位數（約 _SIG_DIGITS 位有效數字）。"""
+    int_digits = 0
+    zeros = 0
+    dot = False
+    for i in range(start, end):
+        c = buf[i]
+        if c == 46:            # '.'
+            dot = True
+        elif c == 48 and not int_digits:
+            if dot:
+                zeros += 1     # 小數點後的前導 0
+        elif 48 <= c <= 57:
+            if not dot:
+                int_digits += 1
+            else:
+                break
+    if int_digits:
+        d = _SIG_DIGITS - int_digits
+    else:
+        d = _SIG_DIGITS + zeros
+    return max(0, min(d, _MAX_DECIMALS))
+
+
+def parse_scaled(buf, start, end, decimals):
+    """把 buf[start:end] 的十進位字串轉成 值 × 10^decimals 的整數。
+
+    多出的小數位數直接捨去；格式錯誤回傳 None。
+    """
+    value = 0
+    frac = -1          # 已讀的小數位數，-1 = 尚未遇到小數點
+    for i in range(start, end):
+        c = buf[i]
+        if c == 46:
+            if frac >= 0:
+                return None
+            frac = 0
+        elif 48 <= c <= 57:
+            if frac < 0:
+                value = value * 10 + c - 48
+            elif frac < decimals:
+                value = value * 10 + c - 48
+                frac += 1
+        else:
+            return None
+    if start == end:
+        return None
+    for _ in range(decimals - max(frac, 0)):
+        value *= 10
+    return value
+
+
+def _parse_int(buf, start, end):
+    """buf[start:] 起的非負整數（讀到非數字為止）。"""
+    value = 0
+    for i in range(start, end):
+        c = buf[i]
+        if not 48 <= c <= 57:
+            break
+        value = value * 10 + c - 48
+    return value
+
+
+class CandleSeries:
+    """單一交易對最近 size 根 K 線（ring buffer）。
+
+    第 k 根（k = 0 為最舊）在 ``(head + k) % size``。
+
+    Args:
+        symbol: 交易對（大寫，如 "BTCUSDT"）。
+        size: 保留根數。
+
+    Attributes:
+        minute: 各根的開盤時間（epoch 分鐘，array 'i'）。
+        open / high / low / close: 縮放後的價格（array 'i'）。
+        decimals: 縮放位數，尚未收到價格時為 -1。
+        version: 新增一根（最右一根以外的內容改變）時遞增。
+        ready: 回填完成後才接受 WebSocket 推送，避免新資料先到、
+            較舊的回填資料被丟棄。
+    """
+
+    def __init__(self, symbol, size=56):
+        self.symbol = symbol
+        self.size = size
+        self.minute = array("i", [0] * size)
+        self.open = array("i", [0] * size)
+        self.high = array("i", [0] * size)
+        self.low = array("i", [0] * size)
+        self.close = array("i", [0] * size)
+        self.head = 0
+        self.count = 0
+        self.decimals = -1
+        self.version = 0
+        self.ready = False
+        self._raw = symbol.encode()
+        self._row = [0, None, None, None, None]   # 回填中的一根
+
+    def index(self, k):
+        """第 k 根（0 = 最舊）在陣列中的位置。"""
+        return (self.head + k) % self.size
+
+    def last(self):
+        """最新一根的位置；沒有資料時回傳 -1。"""
+        return self.index(self.count - 1) if self.count else -1
+
+    def price(self, value):
+        """縮放整數 → float（顯示用）。"""
+        return value / 10 ** self.decimals
+
+    def put(self, minute, o, hi, lo, c):
+        """寫入一根 K 線。
+
+        Returns:
+            1 = 新增一根、0 = 更新最新一根、-1 = 比最新一根舊（忽略）。
+        """
+        if self.count:
+            last = self.last()
+            if minute == self.minute[last]:
+                i = last
+                result = 0
+            elif minute < self.minute[last]:
+                return -1
+            else:
+                i = -1
+        else:
+            i = -1
+        if i < 0:
+            if self.count < self.size:
+                i = self.index(self.count)
+                self.count += 1
+            else:
+                i = self.head
+                self.head = (self.head + 1) % self.size
+            self.minute[i] = minute
+            self.version += 1
+            result = 1
+        self.open[i] = o
+        self.high[i] = hi
+        self.low[i] = lo
+        self.close[i] = c
+        return result
+
+    def _scale(self, buf, start, end):
+        if self.decimals < 0:
+            self.decimals = decimals_for(buf, start, end)
+        return parse_scaled(buf, start, end, self.decimals)
+
+    # --- REST 回填 ---
+
+    def backfill(self, path, value):
+        """json_stream callback：[[t, "o", "h", "l", "c", ...], ...]。"""
+        if len(path) != 2:
+            return
+        col = path[1]
+        if col > _COL_CLOSE:
+            return
+        row = self._row
+        if col == _COL_TIME:
+            row[0] = value // _MS_PER_MIN
+            return
+        raw = value.encode() if isinstance(value, str) else b""
+        row[col] = self._scale(raw, 0, len(raw))
+        if col == _COL_CLOSE and None not in row:
+            self.put(row[0], row[1], row[2], row[3], row[4])
+            for j in range(1, 5):
+                row[j] = None
+
+    # --- WebSocket 推送 ---
+
+    def parse(self, buf, k, n):
+        """擷取 kline 推送（k 為 kline_start() 的結果）。
+
+        Returns:
+            是否更新了序列（交易對不符、尚未回填完成或格式不符時為 False）。
+        """
+        if not self.ready:
+            return False
+        s = find(buf, _KEY_SYMBOL, k, n)
+        if s < 0:
+            return False
+        s += len(_KEY_SYMBOL)
+        raw = self._raw
+        if s + len(raw) >= n or buf[s + len(raw)] != 34:   # '"'
+            return False
+        for i in range(len(raw)):
+            if buf[s + i] != raw[i]:
+                return False
+        t = find(buf, _KEY_TIME, k, n)
+        if t < 0:
+            return False
+        # 毫秒時間戳 → epoch 分鐘。秒數已超出 small int，拆成
+        # 秒 // 100 與末兩位分別計算，不產生大整數
+        t += len(_KEY_TIME)
+        e = t
+        while e < n and 48 <= buf[e] <= 57:
+            e += 1
+        if e - t < 6:
+            return False
+        hi = _parse_int(buf, t, e - 5) * 5       # 秒 // 100 * 5
+        minute = hi // 3 + (hi % 3 * 20 + _parse_int(buf, e - 5, e - 3)) // 60
+        vals = self._row
+        for j, key in enumerate(_KEYS):
+            p = find(buf, key, k, n)
+            if p < 0:
+                return False
+            p += len(key)
+            q = find(buf, b'"', p, n)
+            v = self._scale(buf, p, q) if q > p else None
+            if v is None:
+                return False
+            vals[j + 1] = v
+        self.put(minute, vals[1], vals[2], vals[3], vals[4])
+        for j in range(1, 5):
+            vals[j] = None
+        return True
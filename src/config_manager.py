@@ -6,17 +6,23 @@ CONFIG_FILE = "wifi_config.json"
 CONFIG_VERSION = 2
 
 SETTINGS_FILE = "settings.json"
+# weather_locations 上限（WeatherPage 一次請求的地點數，設定 API 同樣截斷）
+MAX_WEATHER_LOCATIONS = 4
 DEFAULT_SETTINGS = {
     "backlight": 1.0,
     "timezone": 8,
     "weather_lat": 25.033,
     "weather_lon": 121.565,
+    "weather_locations": [],
     "ambient_leds": False,
     "pages": ["clock", "weather", "calendar"],
     "pomodoro_work": 30,
     "pomodoro_break": 5,
     "pomodoro_total": 120,
     "pomodoro_alert": "loud",
+    "calendar_ics_url": "",
+    "market_crypto": ["BTCUSDT", "ETHUSDT"],
+    "market_stocks": ["spy", "aapl", "^twii", "2330.tw"],
 }
 
 
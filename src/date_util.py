@@ -0,0 +1,40 @@
+"""
+Date utilities — 純整數的日期運算，不經過 mktime / localtime。
+
+天數一律以 2000-01-01 為第 0 天（MicroPython 紀元）。
+"""
+
+
+def days_from_civil(y, m, d):
+    """西元日期 → 自 2000-01-01 起的天數。"""
+    y -= m <= 2
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 730425
+
+
+def civil_from_days(n):
+    """自 2000-01-01 起的天數 → (year, month, day)。"""
+    n += 730425
+    era = n // 146097
+    doe = n - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = mp + (3 if mp < 10 else -9)
+    return yoe + era * 400 + (m <= 2), m, d
+
+
+def weekday(n):
+    """天數 → 星期（0=Monday）；2000-01-01 為星期六。"""
+    return (n + 5) % 7
+
+
+def days_in_month(y, m):
+    """指定月份的天數。"""
+    if m == 12:
+        return 31
+    return days_from_civil(y, m + 1, 1) - days_from_civil(y, m, 1)
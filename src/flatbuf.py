@@ -0,0 +1,116 @@
+"""
+FlatBuffers reader — 不依賴 flatbuffers 套件，直接在原始 buffer 上讀取欄位。
+
+FlatBuffers 是免解析的二進位格式：table 透過 vtable 記錄各欄位的位移，
+讀取時以 struct.unpack_from 在 bytearray 上就地取值，不建立物件樹，
+也不需要文字轉數字。本模組只提供讀取（小端序），table 以其在 buffer 中的
+絕對位置（int）表示，欄位以 schema 中的序號（slot，從 0 開始）指定。
+
+read_messages() 從 asyncio stream 讀取 size-prefixed 訊息
+（每則前綴 4 bytes 長度），重複使用同一塊 buffer。
+"""
+import struct
+
+# 訊息內容不符格式時可能丟出的例外（呼叫端據此區分格式錯誤與網路錯誤；
+# CPython 的 struct.error 不是 ValueError 的子類別）
+DECODE_ERRORS = (ValueError, IndexError, getattr(struct, "error", ValueError))
+
+
+def root(buf, pos=0):
+    """訊息起點 pos → root table 位置。"""
+    return pos + struct.unpack_from("<I", buf, pos)[0]
+
+
+def field(buf, tbl, slot):
+    """欄位的絕對位置；欄位不存在（使用預設值）時回傳 0。"""
+    vt = tbl - struct.unpack_from("<i", buf, tbl)[0]
+    off = 4 + 2 * slot
+    if off >= struct.unpack_from("<H", buf, vt)[0]:
+        return 0
+    o = struct.unpack_from("<H", buf, vt + off)[0]
+    return tbl + o if o else 0
+
+
+def scalar(buf, tbl, slot, fmt, default=0):
+    """讀取純量欄位（fmt 如 '<f'、'<i'、'<q'、'B'）。"""
+    p = field(buf, tbl, slot)
+    if not p:
+        return default
+    return struct.unpack_from(fmt, buf, p)[0]
+
+
+def indirect(buf, p):
+    """跟隨 p 處的 uoffset，回傳目標位置。"""
+    return p + struct.unpack_from("<I", buf, p)[0]
+
+
+def table(buf, tbl, slot):
+    """子 table 欄位的位置；不存在時回傳 0。"""
+    p = field(buf, tbl, slot)
+    return indirect(buf, p) if p else 0
+
+
+def vector(buf, tbl, slot):
+    """向量欄位 → (第一個元素位置, 長度)；不存在時回傳 (0, 0)。
+
+    純量向量的第 i 個元素在 start + i * 元素大小；
+    table 向量以 indirect(buf, start + 4 * i) 取得元素。
+    """
+    p = field(buf, tbl, slot)
+    if not p:
+        return 0, 0
+    v = indirect(buf, p)
+    return v + 4, struct.unpack_from("<I", buf, v)[0]
+
+
+async def _fill(reader, mv):
+    """把 mv 讀滿；回傳實際讀到的 bytes 數（EOF 時可能不足）。"""
+    n = len(mv)
+    got = 0
+    readinto = getattr(reader, "readinto", None)
+    while got < n:
+        if readinto is not None:
+            k = await readinto(mv[got:])
+        else:
+            chunk = await reader.read(n - got)
+            k = len(chunk)
+            mv[got:got + k] = chunk
+        if not k:
+            break
+        got += k
+    return got
+
+
+async def read_messages(reader, callback, bufsize=2048, max_size=16384):
+    """從 stream 逐則讀取 size-prefixed 訊息直到 EOF。
+
+    Args:
+        reader: 已跳過 HTTP headers 的 StreamReader。
+        callback: callback(buf, index)，buf 前段為完整訊息，
+            root(buf) 即為 root table（buf 會重複使用，勿保留引用）。
+        bufsize: 初始 buffer 大小，訊息較大時擴充一次。
+        max_size: 單則訊息上限；超過時視為非 FlatBuffers 回應（如 JSON
+            錯誤訊息）並丟出 ValueError。
+
+    Returns:
+        讀到的訊息數。
+    """
+    head = bytearray(4)
+    buf = bytearray(bufsize)
+    index = 0
+    while True:
+        got = await _fill(reader, memoryview(head))
+        if got == 0:
+            return index
+        if got < 4:
+            raise ValueError("truncated size prefix")
+        size = struct.unpack_from("<I", head, 0)[0]
+        if size > max_size:
+            raise ValueError("bad message size {}".format(size))
+        if size > len(buf):
+            buf = None
+            buf = bytearray(size)
+        if await _fill(reader, memoryview(buf)[:size]) < size:
+            raise ValueError("truncated message")
+        callback(buf, index)
+        index += 1
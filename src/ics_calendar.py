@@ -0,0 +1,563 @@
+"""
+ICS Calendar — 串流解析 iCalendar（.ics）事件，建立以日為單位的索引。
+
+逐行讀取 socket，不保留整份檔案；重複事件（RRULE）只展開到可見視窗內，
+結果存成「每天事件數」的 bytearray 與今日議程清單，月曆每格查詢為 O(1)。
+
+時間一律換算為本地「分鐘戳」：自 2000-01-01 起的天數 * 1440 + 當日分鐘。
+UTC 時間（結尾 Z）依 tz_offset 轉為本地；TZID 與浮動時間視為本地時間
+（裝置沒有時區資料庫，請讓行事曆時區與裝置時區一致）。
+"""
+import uasyncio as asyncio
+import tls
+from date_util import days_from_civil, civil_from_days, weekday, days_in_month
+from logger import Logger
+
+_DAY_MIN = 1440
+_MAX_SUMMARY = 40       # 摘要保留字元數
+_MAX_LINE = 256         # 折行合併後的單行上限
+_MAX_EXDATES = 16       # 每個事件保留的 EXDATE 數
+_AGENDA_MAX = 8         # 今日議程最多筆數
+_MAX_EXPAND = 2000      # 單一 RRULE 展開次數上限（防止異常資料卡住）
+
+_WEEKDAYS = {b"MO": 0, b"TU": 1, b"WE": 2, b"TH": 3,
+             b"FR": 4, b"SA": 5, b"SU": 6}
+
+
+class EventIndex:
+    """以日為單位的事件索引。
+
+    Args:
+        start_day: 視窗第一天（自 2000-01-01 起的天數）。
+        days: 視窗天數。
+
+    Attributes:
+        counts: 每天的事件數（上限 255）。
+        agenda: 今日事件 [(start_min, end_min, all_day, summary)]，
+            分鐘為當日 0–1440，依開始時間排序。
+    """
+
+    def __init__(self, start_day, days):
+        self.start_day = start_day
+        self.counts = bytearray(days)
+        self.agenda = []
+
+    def day_index(self, year, month, day):
+        """日期在 counts 中的索引，視窗外回傳 -1。"""
+        i = days_from_civil(year, month, day) - self.start_day
+        return i if 0 <= i < len(self.counts) else -1
+
+    def count(self, year, month, day):
+        """指定日期的事件數（視窗外為 0）。"""
+        i = self.day_index(year, month, day)
+        return self.counts[i] if i >= 0 else 0
+
+    def _mark(self, start, end):
+        """把 [start, end) 分鐘戳涵蓋的每一天計數 +1。"""
+        first = start // _DAY_MIN
+        last = (end - 1) // _DAY_MIN if end > start else first
+        counts = self.counts
+        lo = max(first - self.start_day, 0)
+        hi = min(last - self.start_day, len(counts) - 1)
+        for i in range(lo, hi + 1):
+            if counts[i] < 255:
+                counts[i] += 1
+
+
+class _Event:
+    """解析中的 VEVENT，只保留索引需要的欄位。"""
+
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self.duration = None
+        self.all_day = False
+        self.summary = ""
+        self.rrule = None
+        self.exdates = []
+        self.skip = False
+
+
+class IcsParser:
+    """逐行餵入的 ICS 解析器，直接把事件寫入 EventIndex。
+
+    Args:
+        index: 目標 EventIndex。
+        today: 今日天數（自 2000-01-01 起），用於收集議程。
+        tz_offset: 時區偏移（小時），用於換算 UTC 時間。
+    """
+
+    def __init__(self, index, today, tz_offset=8):
+        self._index = index
+        self._today = today
+        self._tz_min = int(tz_offset * 60)
+        self._win_start = index.start_day * _DAY_MIN
+        self._win_end = (index.start_day + len(index.counts)) * _DAY_MIN
+        self._event = None
+        self._pending = b""
+        self.events = 0
+
+    def feed(self, line):
+        """餵入一行原始資料（可含結尾 CRLF）。"""
+        line = line.rstrip(b"\r\n")
+        if line[:1] in (b" ", b"\t"):
+            # 折行：接續上一行
+            if len(self._pending) < _MAX_LINE:
+                self._pending += line[1:]
+            return
+        if self._pending:
+            self._process(self._pending)
+        self._pending = line
+
+    def close(self):
+        """處理最後一行。"""
+        if self._pending:
+            self._process(self._pending)
+            self._pending = b""
+
+    def _process(self, line):
+        colon = line.find(b":")
+        if colon < 0:
+            return
+        head = line[:colon]
+        value = line[colon + 1:]
+        semi = head.find(b";")
+        name = head if semi < 0 else head[:semi]  # 略過 TZID 等參數
+
+        if name == b"BEGIN":
+            if value == b"VEVENT":
+                self._event = _Event()
+            return
+        ev = self._event
+        if ev is None:
+            return
+        if name == b"END":
+            if value == b"VEVENT":
+                self._event = None
+                if not ev.skip and ev.start is not None:
+                    self._expand(ev)
+            return
+        if ev.skip:
+            return
+        if name == b"DTSTART":
+            ev.start, ev.all_day = self._parse_time(value)
+        elif name == b"DTEND":
+            ev.end = self._parse_time(value)[0]
+        elif name == b"DURATION":
+            ev.duration = _parse_duration(value)
+        elif name == b"SUMMARY":
+            ev.summary = _unescape(value[:_MAX_SUMMARY * 2])[:_MAX_SUMMARY]
+        elif name == b"RRULE":
+            ev.rrule = _parse_rrule(value)
+        elif name == b"EXDATE":
+            for part in value.split(b","):
+                if len(ev.exdates) >= _MAX_EXDATES:
+                    break
+                stamp = self._parse_time(part)[0]
+                if stamp is not None:
+                    ev.exdates.append(stamp // _DAY_MIN)
+        elif name == b"STATUS":
+            ev.skip = value == b"CANCELLED"
+        elif name == b"RECURRENCE-ID":
+            # 單次修改的實例：主事件已展開原本的時間，略過避免重複
+            ev.skip = True
+
+    def _parse_time(self, value):
+        """解析 DATE 或 DATE-TIME 為 (本地分鐘戳, 是否全天)。"""
+        try:
+            y = int(value[0:4])
+            m = int(value[4:6])
+            d = int(value[6:8])
+        except ValueError:
+            return None, False
+        day = days_from_civil(y, m, d)
+        if len(value) < 13 or value[8:9] != b"T":
+            return day * _DAY_MIN, True
+        try:
+            minutes = int(value[9:11]) * 60 + int(value[11:13])
+        except ValueError:
+            return None, False
+        stamp = day * _DAY_MIN + minutes
+        if value.endswith(b"Z"):
+            stamp += self._tz_min
+        return stamp, False
+
+    def _expand(self, ev):
+        """展開事件（含 RRULE）在視窗內的每次發生並寫入索引。"""
+        start = ev.start
+        if ev.end is not None and ev.end >= start:
+            length = ev.end - start
+        elif ev.duration is not None:
+            length = ev.duration
+        else:
+            length = _DAY_MIN if ev.all_day else 0
+        self.events += 1
+
+        rule = ev.rrule
+        if rule is None:
+            self._occurrence(start, length, ev)
+            return
+        for stamp in _occurrences(rule, start, length,
+                                  self._win_start, self._win_end):
+            if stamp // _DAY_MIN not in ev.exdates:
+                self._occurrence(stamp, length, ev)
+
+    def _occurrence(self, start, length, ev):
+        end = start + length
+        # 長度為 0 的事件視為一個時間點，仍須落在視窗內
+        if end <= self._win_start and not (
+            length == 0 and start >= self._win_start
+        ):
+            return
+        if start >= self._win_end:
+            return
+        self._index._mark(start, end)
+
+        day0 = self._today * _DAY_MIN
+        if start < day0 + _DAY_MIN and (end > day0 or start >= day0):
+            agenda = self._index.agenda
+            if len(agenda) < _AGENDA_MAX:
+                agenda.append((
+                    max(start - day0, 0),
+                    min(end - day0, _DAY_MIN),
+                    ev.all_day,
+                    ev.summary,
+                ))
+
+
+def _unescape(value):
+    """ICS TEXT 反跳脫並轉為 str（無法解碼的位元組略過）。"""
+    text = value.replace(b"\\,", b",").replace(b"\\;", b";")
+    text = text.replace(b"\\n", b" ").replace(b"\\N", b" ")
+    text = text.replace(b"\\\\", b"\\")
+    # 截斷可能切在 UTF-8 多位元組字元中間，最多退 3 bytes
+    for cut in range(4):
+        try:
+            return text[:len(text) - cut].decode()
+        except UnicodeError:
+            pass
+    return ""
+
+
+def _parse_duration(value):
+    """解析 ISO 8601 期間（如 PT1H30M、P1D）為分鐘數。"""
+    total = 0
+    num = 0
+    for c in value:
+        if 48 <= c <= 57:
+            num = num * 10 + c - 48
+        elif c == 87:     # W
+            total += num * 7 * _DAY_MIN
+            num = 0
+        elif c == 68:     # D
+            total += num * _DAY_MIN
+            num = 0
+        elif c == 72:     # H
+            total += num * 60
+            num = 0
+        elif c == 77:     # M
+            total += num
+            num = 0
+        elif c == 83:     # S
+            num = 0
+    return total
+
+
+def _parse_rrule(value):
+    """解析 RRULE 為 dict（FREQ / INTERVAL / COUNT / UNTIL / BYDAY）。
+
+    BYDAY 轉為 [(ordinal, weekday)]，ordinal 0 表示每一個。
+    不支援的 FREQ，或 INTERVAL / COUNT 格式錯誤時回傳 None（事件只算
+    第一次，不影響其他事件）；格式錯誤的 BYDAY 項目略過。
+    """
+    rule = {"interval": 1, "count": 0, "until": None, "byday": None}
+    for part in value.split(b";"):
+        eq = part.find(b"=")
+        if eq < 0:
+            continue
+        key = part[:eq]
+        val = part[eq + 1:]
+        if key == b"FREQ":
+            rule["freq"] = val
+        elif key == b"INTERVAL":
+            try:
+                rule["interval"] = max(int(val), 1)
+            except ValueError:
+                return None
+        elif key == b"COUNT":
+            try:
+                rule["count"] = int(val)
+            except ValueError:
+                return None
+        elif key == b"UNTIL":
+            try:
+                rule["until"] = days_from_civil(
+                    int(val[0:4]), int(val[4:6]), int(val[6:8])
+                )
+            except ValueError:
+                pass
+        elif key == b"BYDAY":
+            days = []
+            for item in val.split(b","):
+                wd = _WEEKDAYS.get(item[-2:])
+                if wd is None:
+                    continue
+                try:
+                    ordinal = int(item[:-2]) if len(item) > 2 else 0
+                except ValueError:
+                    continue
+                days.append((ordinal, wd))
+            rule["byday"] = days or None
+    if rule.get("freq") not in (b"DAILY", b"WEEKLY", b"MONTHLY", b"YEARLY"):
+        return None
+    return rule
+
+
+def _nth_weekday(y, m, ordinal, wd):
+    """當月第 ordinal 個星期 wd 的天數（負數由月底算起），不存在回傳 None。"""
+    first = days_from_civil(y, m, 1)
+    dim = days_in_month(y, m)
+    if ordinal > 0:
+        n = first + (wd - weekday(first)) % 7 + (ordinal - 1) * 7
+    else:
+        last = first + dim - 1
+        n = last - (weekday(last) - wd) % 7 + (ordinal + 1) * 7
+    return n if first <= n < first + dim else None
+
+
+def _occurrences(rule, start, length, win_start, win_end):
+    """產生 RRULE 在 [win_start, win_end) 內的各次開始分鐘戳。
+
+    沒有 COUNT 時直接跳到視窗附近開始展開；有 COUNT 時必須從
+    DTSTART 起計數，但只有落在視窗內的才會產出。
+    """
+    freq = rule["freq"]
+    interval = rule["interval"]
+    count = rule["count"]
+    until = rule["until"]
+    byday = rule["byday"]
+    tod = start % _DAY_MIN
+    day0 = start // _DAY_MIN
+    # 與視窗重疊的最早開始時間
+    lo = win_start - length
+    emitted = 0
+
+    def in_window(stamp):
+        return stamp + length > win_start or (
+            length == 0 and stamp >= win_start
+        )
+
+    if freq == b"DAILY" or (freq == b"WEEKLY" and not byday):
+        step = interval * (7 if freq == b"WEEKLY" else 1)
+        k = 0
+        if not count and lo > start:
+            k = (lo - start) // (step * _DAY_MIN)
+        for _ in range(_MAX_EXPAND):
+            day = day0 + k * step
+            stamp = day * _DAY_MIN + tod
+            if (count and k >= count) or (until is not None and day > until):
+                return
+            if stamp >= win_end:
+                return
+            if in_window(stamp):
+                yield stamp
+            k += 1
+        return
+
+    if freq == b"WEEKLY":
+        wds = sorted(wd for _, wd in byday)
+        week0 = day0 - weekday(day0)  # DTSTART 所在週的星期一
+        w = 0
+        if not count and lo > start:
+            w = ((lo // _DAY_MIN - week0) // 7) // interval
+        for _ in range(_MAX_EXPAND):
+            monday = week0 + w * interval * 7
+            if monday * _DAY_MIN >= win_end:
+                return
+            for wd in wds:
+                day = monday + wd
+                if day < day0:
+                    continue
+                if until is not None and day > until:
+                    return
+                stamp = day * _DAY_MIN + tod
+                if stamp >= win_end:
+                    return
+                emitted += 1
+                if count and emitted > count:
+                    return
+                if in_window(stamp):
+                    yield stamp
+            w += 1
+        return
+
+    # MONTHLY / YEARLY：逐月（或逐年）計算
+    y, m, d = civil_from_days(day0)
+    months = interval * (12 if freq == b"YEARLY" else 1)
+    for _ in range(_MAX_EXPAND):
+        if days_from_civil(y, m, 1) * _DAY_MIN >= win_end:
+            return
+        if byday and freq == b"MONTHLY":
+            days = []
+            for ordinal, wd in byday:
+                if ordinal:
+                    n = _nth_weekday(y, m, ordinal, wd)
+                    if n is not None:
+                        days.append(n)
+                else:
+                    n = _nth_weekday(y, m, 1, wd)
+                    while n is not None and civil_from_days(n)[1] == m:
+                        days.append(n)
+                        n += 7
+            days.sort()
+        elif d <= days_in_month(y, m):
+            days = [days_from_civil(y, m, d)]
+        else:
+            days = []  # 如 2/30，跳過
+        for day in days:
+            if day < day0:
+                continue
+            if until is not None and day > until:
+                return
+            stamp = day * _DAY_MIN + tod
+            if stamp >= win_end:
+                return
+            emitted += 1
+            if count and emitted > count:
+                return
+            if in_window(stamp):
+                yield stamp
+        m += months
+        while m > 12:
+            m -= 12
+            y += 1
+
+
+def _split_url(url):
+    """拆解 URL 為 (ssl, host, port, path)。"""
+    ssl = url.startswith("https://")
+    rest = url.split("://", 1)[-1]
+    slash = rest.find("/")
+    hostport = rest if slash < 0 else rest[:slash]
+    path = "/" if slash < 0 else rest[slash:]
+    if ":" in hostport:
+        host, port = hostport.split(":", 1)
+        port = int(port)
+    else:
+        host, port = hostport, 443 if ssl else 80
+    return ssl, host, port, path
+
+
+class IcsCalendar:
+    """從 ICS URL 抓取事件並維護 EventIndex。
+
+    視窗為今日所在月份的前一個月到後兩個月（約 4 個月）。
+    重新整理時以串流方式建立新索引，完成後才替換，
+    失敗時保留舊索引。
+
+    Args:
+        url: ICS 訂閱網址（http:// 或 https://）。
+        tz_offset: 時區偏移（小時）。
+
+    Attributes:
+        index: 目前的 EventIndex，尚未成功抓取時為 None。
+        version: 每次索引更新時遞增，供頁面判斷是否需要重繪。
+        last_fetch: 上次成功抓取的 epoch 秒。
+        last_attempt: 上次開始抓取的 epoch 秒（含失敗）。
+        error: 上次失敗的錯誤訊息，成功時為 None。
+    """
+
+    def __init__(self, url, tz_offset=8):
+        self._log = Logger("ICS")
+        self.url = url
+        self.tz_offset = tz_offset
+        self.index = None
+        self.version = 0
+        self.last_fetch = 0
+        self.last_attempt = 0
+        self.error = None
+        self.fetching = False
+
+    @staticmethod
+    def window(year, month):
+        """以 (year, month) 為中心的視窗 (start_day, days)。"""
+        py, pm = (year - 1, 12) if month == 1 else (year, month - 1)
+        ey, em = year, month + 3
+        if em > 12:
+            ey, em = ey + 1, em - 12
+        start = days_from_civil(py, pm, 1)
+        return start, days_from_civil(ey, em, 1) - start
+
+    async def refresh(self, year, month, day, now=0):
+        """抓取並解析 ICS，成功時替換索引。
+
+        Args:
+            year, month, day: 今日本地日期（決定視窗與議程）。
+            now: 目前 epoch 秒，記錄為 last_fetch。
+
+        Returns:
+            是否成功。
+        """
+        if self.fetching:
+            return False
+        self.fetching = True
+        self.last_attempt = now
+        start, days = self.window(year, month)
+        index = EventIndex(start, days)
+        parser = IcsParser(
+            index, days_from_civil(year, month, day), self.tz_offset
+        )
+        try:
+            await self._stream(parser)
+            parser.close()
+            index.agenda.sort()
+            self.index = index
+            self.version += 1
+            self.last_fetch = now
+            self.error = None
+            self._log.info(
+                f"{parser.events} events, "
+                f"{len(index.agenda)} today"
+            )
+            return True
+        except Exception as e:
+            self.error = str(e)
+            self._log.error(f"Fetch failed: {e}")
+            return False
+        finally:
+            self.fetching = False
+
+    async def _stream(self, parser):
+        """HTTP/1.0 GET，逐行把 body 餵給解析器。"""
+        ssl, host, port, path = _split_url(self.url)
+        request = (
+            "GET {} HTTP/1.0\r\n"
+            "Host: {}\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+        ).format(path, host).encode()
+        if ssl:
+            reader, writer, status = await tls.request(host, port, request)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        try:
+            if not ssl:
+                writer.write(request)
+                await writer.drain()
+                status = await reader.readline()
+            parts = status.split(None, 2)
+            if len(parts) < 2 or parts[1] != b"200":
+                raise OSError("HTTP " + status.decode().strip())
+            # 跳過 HTTP headers
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n" or line == b"":
+                    break
+            # 逐行處理 body，同一時間只保留一行
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parser.feed(line)
+        finally:
+            writer.close()
@@ -0,0 +1,279 @@
+"""
+JSON Stream — 增量式 JSON tokenizer，以固定大小緩衝區消化 socket 串流。
+
+不建立完整物件樹：每遇到一個純值（字串、數字、true/false/null）就以
+(path, value) 呼叫 callback，path 為目前的鍵 / 陣列索引堆疊，例如
+``["daily", "temperature_2m_max", 2]``。呼叫端只挑需要的欄位存進精簡結構，
+解析期間的記憶體用量與回應大小無關。
+
+數字以整數運算逐位累加，不經過字串與 float() 轉換。
+"""
+
+# 解析狀態
+_VALUE = 0      # 等待值（陣列中也可遇到 ']'）
+_KEY = 1        # 物件中等待鍵（或 '}'）
+_COLON = 2      # 鍵之後等待 ':'
+_AFTER = 3      # 值之後等待 ',' 或結尾
+_STRING = 4
+_NUMBER = 5
+_LITERAL = 6
+
+_LITERALS = {116: (b"true", True), 102: (b"false", False),
+             110: (b"null", None)}
+_ESCAPES = {98: 8, 102: 12, 110: 10, 114: 13, 116: 9}  # \b \f \n \r \t
+
+# 10 的次方表（避免 float 次方運算累積誤差）
+_POW10 = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000,
+          100000000, 1000000000)
+
+
+class JsonStream:
+    """推送式 JSON 解析器，可分段 feed()。
+
+    Args:
+        callback: callback(path, value)，path 為 list（勿保留引用，
+            解析過程會原地修改）。
+        max_str: 字串值保留的最大位元組數，超過的部分捨棄。
+    """
+
+    def __init__(self, callback, max_str=64):
+        self._cb = callback
+        self.path = []
+        self._containers = []  # 巢狀容器種類：ord('{') / ord('[')
+        self._state = _VALUE
+        self._str = bytearray(max_str)
+        self._slen = 0
+        self._is_key = False
+        self._escape = 0    # 0 = 無，1 = 剛讀到 '\'，>1 = \uXXXX 剩餘位數 + 1
+        self._uni = 0
+        self._lit = None
+        self._lit_pos = 0
+        self._reset_number()
+
+    def _reset_number(self):
+        self._neg = False
+        self._mant = 0
+        self._frac = 0       # 小數位數
+        self._exp = 0
+        self._exp_neg = False
+        self._num_part = 0   # 0 = 整數部, 1 = 小數部, 2 = 指數部
+
+    def feed(self, buf, n=None):
+        """餵入一段資料（bytes / bytearray / memoryview 的前 n bytes）。"""
+        if n is None:
+            n = len(buf)
+        i = 0
+        while i < n:
+            c = buf[i]
+            state = self._state
+            if state == _STRING:
+                self._string_char(c)
+            elif state == _NUMBER:
+                if not self._number_char(c):
+                    # 數字結束，同一字元以新狀態重新處理
+                    self._emit(self._number_value())
+                    continue
+            elif state == _LITERAL:
+                word, value = self._lit
+                if c != word[self._lit_pos]:
+                    raise ValueError("bad literal")
+                self._lit_pos += 1
+                if self._lit_pos == len(word):
+                    self._emit(value)
+            elif c in (32, 9, 10, 13):   # 空白
+                pass
+            elif state == _VALUE:
+                self._start_value(c)
+            elif state == _KEY:
+                if c == 34:
+                    self._state = _STRING
+                    self._is_key = True
+                    self._slen = 0
+                elif c == 125:   # '}'
+                    self._close(123)
+                else:
+                    raise ValueError("expected key")
+            elif state == _COLON:
+                if c != 58:
+                    raise ValueError("expected ':'")
+                self._state = _VALUE
+            else:   # _AFTER
+                if c == 44:      # ','
+                    if self._containers[-1] == 91:
+                        self.path[-1] += 1
+                        self._state = _VALUE
+                    else:
+                        self._state = _KEY
+                elif c == 125:
+                    self._close(123)
+                elif c == 93:    # ']'
+                    self._close(91)
+                else:
+                    raise ValueError("expected ',' at byte {}".format(c))
+            i += 1
+
+    def close(self):
+        """資料結束：收尾最後一個頂層數字並檢查是否完整。"""
+        if self._state == _NUMBER:
+            self._emit(self._number_value())
+        if self._containers or self._state not in (_AFTER, _VALUE):
+            raise ValueError("truncated JSON")
+
+    # --- 值 ---
+
+    def _start_value(self, c):
+        if c == 34:          # '"'
+            self._state = _STRING
+            self._is_key = False
+            self._slen = 0
+        elif c == 123:       # '{'
+            self._containers.append(123)
+            self.path.append(None)
+            self._state = _KEY
+        elif c == 91:        # '['
+            self._containers.append(91)
+            self.path.append(0)
+            self._state = _VALUE
+        elif c == 93 and self._containers and self._containers[-1] == 91:
+            self._close(91)  # 空陣列
+        elif c == 45 or 48 <= c <= 57:
+            self._reset_number()
+            self._state = _NUMBER
+            if c == 45:
+                self._neg = True
+            else:
+                self._mant = c - 48
+        elif c in _LITERALS:
+            self._lit = _LITERALS[c]
+            self._lit_pos = 1
+            self._state = _LITERAL
+        else:
+            raise ValueError("unexpected byte {}".format(c))
+
+    def _emit(self, value):
+        self._cb(self.path, value)
+        self._state = _AFTER
+
+    def _close(self, kind):
+        if not self._containers or self._containers[-1] != kind:
+            raise ValueError("mismatched bracket")
+        self._containers.pop()
+        self.path.pop()
+        self._state = _AFTER
+
+    # --- 字串 ---
+
+    def _put(self, b):
+        if self._slen < len(self._str):
+            self._str[self._slen] = b
+            self._slen += 1
+
+    def _put_code(self, cp):
+        """寫入 \\uXXXX 解出的字元（UTF-8 編碼）。"""
+        if cp < 0x80:
+            self._put(cp)
+        elif cp < 0x800:
+            self._put(0xC0 | cp >> 6)
+            self._put(0x80 | cp & 0x3F)
+        else:
+            self._put(0xE0 | cp >> 12)
+            self._put(0x80 | cp >> 6 & 0x3F)
+            self._put(0x80 | cp & 0x3F)
+
+    def _string_char(self, c):
+        esc = self._escape
+        if esc == 0:
+            if c == 34:
+                self._end_string()
+            elif c == 92:    # '\'
+                self._escape = 1
+            else:
+                self._put(c)
+        elif esc == 1:
+            if c == 117:     # 'u'
+                self._escape = 5
+                self._uni = 0
+            else:
+                self._put(_ESCAPES.get(c, c))
+                self._escape = 0
+        else:
+            self._uni = self._uni * 16 + int(chr(c), 16)
+            self._escape -= 1
+            if self._escape == 1:
+                self._put_code(self._uni)
+                self._escape = 0
+
+    def _end_string(self):
+        n = self._slen
+        # 截斷可能切在多位元組字元中間，退回到完整字元
+        for cut in range(min(4, n + 1)):
+            try:
+                text = bytes(self._str[:n - cut]).decode()
+                break
+            except UnicodeError:
+                text = ""
+        if self._is_key:
+            self.path[-1] = text
+            self._state = _COLON
+        else:
+            self._emit(text)
+
+    # --- 數字 ---
+
+    def _number_char(self, c):
+        """處理數字的一個字元；不屬於數字時回傳 False。"""
+        if 48 <= c <= 57:
+            part = self._num_part
+            if part == 2:
+                self._exp = self._exp * 10 + c - 48
+            else:
+                self._mant = self._mant * 10 + c - 48
+                if part == 1:
+                    self._frac += 1
+            return True
+        if c == 46 and self._num_part == 0:      # '.'
+            self._num_part = 1
+            return True
+        if c in (101, 69) and self._num_part < 2:  # 'e' / 'E'
+            self._num_part = 2
+            return True
+        if self._num_part == 2 and c in (43, 45):  # 指數正負號
+            self._exp_neg = c == 45
+            return True
+        return False
+
+    def _number_value(self):
+        mant = -self._mant if self._neg else self._mant
+        exp = (-self._exp if self._exp_neg else self._exp) - self._frac
+        if self._num_part == 0:
+            return mant
+        if 0 <= exp < 10:
+            return float(mant * _POW10[exp])
+        if -10 < exp < 0:
+            return mant / _POW10[-exp]
+        return mant * 10.0 ** exp
+
+
+async def parse_stream(reader, callback, bufsize=256):
+    """從 asyncio stream 以固定緩衝區讀到 EOF，逐段解析。
+
+    Args:
+        reader: 已跳過 HTTP headers 的 StreamReader。
+        callback: 傳給 JsonStream 的 callback(path, value)。
+        bufsize: 讀取緩衝區大小（bytes）。
+    """
+    parser = JsonStream(callback)
+    buf = bytearray(bufsize)
+    readinto = getattr(reader, "readinto", None)
+    while True:
+        if readinto is not None:
+            n = await readinto(buf)
+            if not n:
+                break
+            parser.feed(buf, n)
+        else:
+            chunk = await reader.read(bufsize)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
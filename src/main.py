@@ -2,6 +2,7 @@ import uasyncio as asyncio
 from wifi_manager import WiFiManager
 from ui.app import App
 from config_manager import ConfigManager
+from ntp_client import NtpClient
 from pages.splash_page import SplashPage
 from pages.clock_page import ClockPage
 from pages.weather_page import WeatherPage
@@ -23,9 +24,16 @@ async def main():
     app = App()
     app.wm = wm
 
+    # 背景 NTP 同步（非阻塞，依 RTC 漂移自動定期重新同步）
+    app.ntp = NtpClient()
+    # 由 Flash 還原上次同步的時間，連網前時鐘即大致正確
+    app.ntp.restore()
+
     # 事件驅動頁面路由
     def on_connected(ip):
         """WiFi 連線成功 → 建立頁面序列，滑動切換。"""
+        asyncio.create_task(app.ntp.run())
+
         async def _wait_and_switch():
             splash = app._current_page
             while isinstance(splash, SplashPage) and not splash.ready:
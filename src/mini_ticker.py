@@ -0,0 +1,213 @@
+"""
+Mini ticker — Binance miniTicker 推送的欄位擷取，不建立 JSON 物件樹。
+
+每秒每個交易對一則訊息，以 json.loads 解析會產生整棵 dict 與一串字串，
+對 MicroPython heap 是持續的垃圾。這裡直接在接收 buffer 上搜尋
+``"s":"``、``"c":"``、``"o":"``（viper 快速路徑），交易對名稱以雜湊
+對應到固定槽位，價格字串逐位累加成整數後換算，結果寫進 array('f')。
+格式不符預期時退回 json.loads。
+"""
+import json
+from array import array
+
+_KEY_SYMBOL = b'"s":"'
+_KEY_CLOSE = b'"c":"'
+_KEY_OPEN = b'"o":"'
+
+_MAX_DIGITS = 9   # 有效位數上限：保持在 small int 範圍，float32 也只有 ~7 位
+_POW10 = (1.0, 10.0, 100.0, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10,
+          1e11, 1e12, 1e13, 1e14, 1e15, 1e16)
+
+try:
+    import micropython
+
+    @micropython.viper
+    def find(buf, pat, start: int, end: int) -> int:
+        # buf[start:end] 中 pat 的位置，找不到回傳 -1
+        # （MicroPython 的 bytearray 沒有 find()）
+        b = ptr8(buf)
+        p = ptr8(pat)
+        m = int(len(pat))
+        i = start
+        last = end - m
+        while i <= last:
+            j = 0
+            while j < m and b[i + j] == p[j]:
+                j += 1
+            if j == m:
+                return i
+            i += 1
+        return -1
+except (ImportError, AttributeError):
+    def find(buf, pat, start, end):
+        # 沒有 viper 時逐 byte 比對（同樣不依賴 bytearray.find()）
+        first = pat[0]
+        m = len(pat)
+        for i in range(start, end - m + 1):
+            if buf[i] == first:
+                j = 1
+                while j < m and buf[i + j] == pat[j]:
+                    j += 1
+                if j == m:
+                    return i
+        return -1
+
+
+def _hash(buf, start, end):
+    """buf[start:end] 的 30-bit 雜湊（不建立切片）。"""
+    h = 0
+    for i in range(start, end):
+        h = (h * 31 + buf[i]) & 0x3FFFFFFF
+    return h
+
+
+def _parse_price(buf, start, end):
+    """把 buf[start:end] 的十進位字串轉成 float；格式錯誤回傳 None。"""
+    mant = 0
+    digits = 0
+    frac = 0
+    scale = 0      # 超過有效位數後捨棄的整數位
+    dot = False
+    for i in range(start, end):
+        c = buf[i]
+        if c == 46:            # '.'
+            if dot:
+                return None
+            dot = True
+        elif 48 <= c <= 57:
+            if digits < _MAX_DIGITS:
+                if mant or c != 48:
+                    digits += 1
+                mant = mant * 10 + c - 48
+                if dot:
+                    frac += 1
+            elif not dot:
+                scale += 1
+        else:
+            return None
+    if start == end or frac >= len(_POW10) or scale >= len(_POW10):
+        return None
+    if scale:
+        return mant * _POW10[scale]
+    return mant / _POW10[frac]
+
+
+class MiniTickerTable:
+    """交易對 → 槽位的報價表。
+
+    Args:
+        symbols: 交易對名稱（大寫，如 "BTCUSDT"）。
+
+    Attributes:
+        symbols: 交易對名稱，索引即槽位。
+        close / open: 各槽位最新的收盤價與 24h 開盤價（array 'f'，
+            尚未收到資料時為 0）。
+        fallbacks: 退回 json.loads 的次數（統計用）。
+    """
+
+    def __init__(self, symbols):
+        self.symbols = []
+        self.close = array("f")
+        self.open = array("f")
+        self.fallbacks = 0
+        self._raw = []
+        self._slots = {}   # 雜湊 → 槽位
+        self.set_symbols(symbols)
+
+    def set_symbols(self, symbols):
+        """更換交易對清單（監看清單變更）。
+
+        仍在清單中的交易對保留目前報價，新加入的從 0 開始；槽位依新順序
+        重新編號。
+        """
+        symbols = list(symbols)
+        n = len(symbols)
+        close = array("f", [0] * n)
+        open_ = array("f", [0] * n)
+        for i, sym in enumerate(symbols):
+            old = self.slot(sym)
+            if old >= 0:
+                close[i] = self.close[old]
+                open_[i] = self.open[old]
+        self.symbols = symbols
+        self.close = close
+        self.open = open_
+        self._raw = [sym.encode() for sym in symbols]
+        self._slots = {}
+        for i, raw in enumerate(self._raw):
+            self._slots[_hash(raw, 0, len(raw))] = i
+
+    def slot(self, symbol):
+        """交易對名稱 → 槽位，不存在時回傳 -1。"""
+        try:
+            return self.symbols.index(symbol)
+        except ValueError:
+            return -1
+
+    def change(self, slot):
+        """槽位的 24h 漲跌幅（%）。"""
+        open_p = self.open[slot]
+        if open_p <= 0:
+            return 0.0
+        return (self.close[slot] - open_p) / open_p * 100
+
+    def parse(self, buf, n):
+        """解析一則訊息（buf[:n]，buf 為 bytearray），更新報價。
+
+        Returns:
+            更新的槽位；不是 miniTicker 或交易對不在表中時回傳 -1。
+        """
+        s = find(buf, _KEY_SYMBOL, 0, n)
+        if s < 0:
+            return self._parse_json(buf, n)
+        s += len(_KEY_SYMBOL)
+        e = find(buf, b'"', s, n)
+        c = find(buf, _KEY_CLOSE, 0, n)
+        o = find(buf, _KEY_OPEN, 0, n)
+        if e < 0 or c < 0 or o < 0:
+            return self._parse_json(buf, n)
+        slot = self._slots.get(_hash(buf, s, e), -1)
+        if slot < 0 or not self._match(slot, buf, s, e):
+            return -1
+        c += len(_KEY_CLOSE)
+        o += len(_KEY_OPEN)
+        close_p = _parse_price(buf, c, find(buf, b'"', c, n))
+        open_p = _parse_price(buf, o, find(buf, b'"', o, n))
+        if close_p is None or open_p is None:
+            return self._parse_json(buf, n)
+        self.close[slot] = close_p
+        self.open[slot] = open_p
+        return slot
+
+    def _match(self, slot, buf, start, end):
+        """確認雜湊命中的槽位名稱與 buf[start:end] 相同。"""
+        raw = self._raw[slot]
+        if len(raw) != end - start:
+            return False
+        for i in range(end - start):
+            if raw[i] != buf[start + i]:
+                return False
+        return True
+
+    def _parse_json(self, buf, n):
+        """完整 JSON 解析（非預期格式時的退路）。"""
+        try:
+            msg = json.loads(bytes(buf[:n]))
+        except ValueError:
+            return -1
+        if not isinstance(msg, dict):
+            return -1
+        # Combined stream 格式：{"stream":..., "data":{...}}
+        ticker = msg.get("data", msg)
+        if not isinstance(ticker, dict) or "s" not in ticker:
+            return -1   # 訂閱回應等非報價訊息
+        self.fallbacks += 1
+        slot = self.slot(ticker["s"])
+        if slot < 0:
+            return -1
+        try:
+            self.close[slot] = float(ticker.get("c", 0))
+            self.open[slot] = float(ticker.get("o", 0))
+        except (TypeError, ValueError):
+            return -1
+        return slot
@@ -0,0 +1,340 @@
+"""
+Async NTP client — 以非阻塞 UDP 同步時間，不會卡住 UI render loop。
+
+支援多伺服器備援、RTT 補償的時間偏移計算，並追蹤 RTC 漂移率，
+依漂移大小自動調整下次重新同步的間隔。
+
+同步後的時間與漂移率定期寫入 Flash（time_state.json），開機時先以此
+還原 RTC，網路連線前時鐘與月曆就大致正確，NTP 只負責修正。
+"""
+import json
+import socket
+import struct
+import time
+import machine
+import uasyncio as asyncio
+from logger import Logger
+
+NTP_SERVERS = ("pool.ntp.org", "time.google.com", "time.cloudflare.com")
+_NTP_PORT = 123
+_TIMEOUT_MS = 2000      # 單一伺服器等待回應上限
+_POLL_MS = 20           # 等待回應時的輪詢間隔
+_DNS_RETRY_MS = 60000   # DNS 解析失敗後的首次退避，之後倍增
+_DNS_MAX_RETRY_MS = 3600000
+
+# 重新同步間隔（秒）
+_INITIAL_INTERVAL = 3600
+_MIN_INTERVAL = 15 * 60
+_MAX_INTERVAL = 24 * 3600
+_RETRY_INTERVAL = 30    # 失敗後第一次重試，之後倍增至 _MIN_INTERVAL
+_TARGET_ERROR_MS = 500  # 兩次同步間允許累積的最大誤差
+
+# 時間狀態持久化
+TIME_STATE_FILE = "time_state.json"
+_SAVE_INTERVAL = 15 * 60  # 寫入 Flash 的間隔（秒），兼顧誤差與 Flash 壽命
+
+# 時間可信度
+CONFIDENCE_NONE = 0      # RTC 未校正（開機預設值）
+CONFIDENCE_RESTORED = 1  # 由 Flash 還原，或 NTP 已久未成功
+CONFIDENCE_SYNCED = 2    # 近期 NTP 同步成功
+
+# NTP 紀元（1900）與 MicroPython 紀元的差（秒）
+_NTP_DELTA = 3155673600 if time.gmtime(0)[0] == 2000 else 2208988800
+
+
+def _local_ms():
+    """本地 epoch 毫秒（整數，避免單精度 float 的精度問題）。"""
+    try:
+        return time.time_ns() // 1000000
+    except AttributeError:
+        return time.time() * 1000
+
+
+def _ntp_ms(data, offset):
+    """解析封包中 64-bit NTP 時間戳為本地紀元毫秒。"""
+    secs, frac = struct.unpack_from("!II", data, offset)
+    return (secs - _NTP_DELTA) * 1000 + (frac * 1000 >> 32)
+
+
+def set_rtc(epoch):
+    """以 epoch 秒設定 RTC（UTC）。"""
+    tm = time.gmtime(epoch)
+    machine.RTC().datetime(
+        (tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0)
+    )
+
+
+class NtpClient:
+    """非阻塞 NTP 用戶端，含漂移追蹤與自適應重新同步。
+
+    Args:
+        servers: NTP 伺服器清單，依序嘗試。
+
+    Attributes:
+        synced: 是否至少成功同步過一次。
+        last_sync: 上次成功同步時的 epoch 秒。
+        last_offset_ms: 上次同步修正的時間偏移（毫秒）。
+        last_rtt_ms: 上次同步的網路往返時間（毫秒）。
+        drift_ppm: 估算的 RTC 漂移率（ppm，正值 = RTC 走太慢）。
+        interval: 目前的重新同步間隔（秒）。
+        restored: 開機時是否由 Flash 還原過時間。
+    """
+
+    def __init__(self, servers=NTP_SERVERS):
+        self._log = Logger("NTP")
+        self._servers = servers
+        self._addrs = {}            # 已解析的伺服器位址快取
+        self._dns_fail = {}         # 解析失敗的伺服器 → (ticks_ms, 退避 ms)
+        self._buf = bytearray(48)
+        self._wake = asyncio.Event()
+        self._running = False
+        self._failures = 0
+        self._next_due = 0
+        self.synced = False
+        self.last_sync = 0
+        self.last_offset_ms = 0
+        self.last_rtt_ms = 0
+        self.drift_ppm = 0.0
+        self.interval = _INITIAL_INTERVAL
+        self.restored = False
+
+    def request_sync(self):
+        """要求背景迴圈立即同步一次（非阻塞）。"""
+        self._wake.set()
+
+    def next_due(self):
+        """下次排定同步的 epoch 秒。"""
+        return self._next_due
+
+    def confidence(self):
+        """目前系統時間的可信度（CONFIDENCE_*）。
+
+        已同步但超過兩個同步間隔未成功時降為 CONFIDENCE_RESTORED。
+        """
+        if self.synced:
+            if time.time() - self.last_sync <= 2 * self.interval:
+                return CONFIDENCE_SYNCED
+            return CONFIDENCE_RESTORED
+        if self.restored:
+            return CONFIDENCE_RESTORED
+        return CONFIDENCE_NONE
+
+    # --- 持久化 ---
+
+    def restore(self):
+        """開機時由 Flash 還原 RTC 與漂移率。
+
+        RTC 落後於上次保存的時間（斷電後重置）時以保存值設定 RTC；
+        仍在走（軟重啟）則保留 RTC。斷電期間的時間無法得知，
+        因此還原後的時間只保證不早於上次保存，仍需 NTP 修正。
+
+        Returns:
+            是否成功讀取保存的狀態。
+        """
+        try:
+            with open(TIME_STATE_FILE, "r") as f:
+                state = json.load(f)
+            epoch = int(state["epoch"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.drift_ppm = float(state.get("drift_ppm", 0.0))
+        self.interval = int(state.get("interval", _INITIAL_INTERVAL))
+        if time.time() < epoch:
+            set_rtc(epoch)
+            self._log.info(f"RTC restored from flash: {epoch}")
+        self.restored = True
+        return True
+
+    def save(self):
+        """把目前時間與漂移率寫入 Flash（RTC 未校正時不寫）。
+
+        Returns:
+            是否寫入成功。
+        """
+        if not (self.synced or self.restored):
+            return False
+        state = {
+            "epoch": time.time(),
+            "drift_ppm": self.drift_ppm,
+            "interval": self.interval,
+        }
+        try:
+            with open(TIME_STATE_FILE, "w") as f:
+                json.dump(state, f)
+            return True
+        except OSError as e:
+            self._log.warning(f"Save time state failed: {e}")
+            return False
+
+    async def run(self):
+        """背景同步迴圈：成功後依漂移調整間隔，失敗則退避重試。
+
+        每次呼叫（WiFi 連線 / 重新連線）先重新解析伺服器位址；
+        已在執行時只會要求立即同步。
+        """
+        self.resolve()
+        if self._running:
+            self.request_sync()
+            return
+        self._running = True
+        while True:
+            if await self.sync():
+                self._failures = 0
+                delay = self.interval
+            else:
+                self._failures += 1
+                delay = min(
+                    _RETRY_INTERVAL << min(self._failures - 1, 5),
+                    _MIN_INTERVAL,
+                )
+            self._next_due = time.time() + delay
+            self.save()
+            # 分段等待：每段逾時就寫一次 Flash，直到排定時間或被喚醒
+            while True:
+                remaining = self._next_due - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(), min(remaining, _SAVE_INTERVAL)
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    self.save()
+            self._wake.clear()
+
+    async def sync(self):
+        """依序向各伺服器查詢並校正 RTC。
+
+        Returns:
+            是否同步成功。
+        """
+        for host in self._servers:
+            try:
+                result = await self._query(host)
+            except Exception as e:
+                self._log.debug(f"{host}: {e}")
+                result = None
+            if result is None:
+                continue
+            offset_ms, rtt_ms = result
+            await self._apply(offset_ms)
+            self._log.info(
+                f"Synced via {host}: offset {offset_ms}ms, "
+                f"rtt {rtt_ms}ms, drift {self.drift_ppm:.1f}ppm, "
+                f"next in {self.interval}s"
+            )
+            self.last_rtt_ms = rtt_ms
+            return True
+        self._log.warning("All NTP servers failed")
+        return False
+
+    def resolve(self):
+        """解析所有伺服器位址（WiFi 連線時呼叫一次）。
+
+        getaddrinfo 會阻塞 event loop，因此結果快取起來，查詢時不再解析；
+        失敗的伺服器依退避時間跳過，不會每次重試都卡住畫面。
+        """
+        self._addrs = {}
+        self._dns_fail = {}
+        for host in self._servers:
+            self._lookup(host)
+
+    def _lookup(self, host):
+        """解析並快取位址；失敗時記錄並倍增退避時間。"""
+        try:
+            addr = socket.getaddrinfo(host, _NTP_PORT)[0][-1]
+        except (OSError, IndexError) as e:
+            prev = self._dns_fail.get(host)
+            backoff = (min(prev[1] * 2, _DNS_MAX_RETRY_MS) if prev
+                       else _DNS_RETRY_MS)
+            self._dns_fail[host] = (time.ticks_ms(), backoff)
+            self._log.debug(
+                f"{host}: DNS failed ({e}), retry in {backoff // 1000}s"
+            )
+            return None
+        self._addrs[host] = addr
+        self._dns_fail.pop(host, None)
+        return addr
+
+    def _resolve(self, host):
+        """快取的伺服器位址；上次解析失敗且仍在退避中時回傳 None。"""
+        addr = self._addrs.get(host)
+        if addr is not None:
+            return addr
+        fail = self._dns_fail.get(host)
+        if (fail is not None
+                and time.ticks_diff(time.ticks_ms(), fail[0]) < fail[1]):
+            return None
+        return self._lookup(host)
+
+    async def _query(self, host):
+        """送出一個 NTP 請求並非阻塞等待回應。
+
+        Returns:
+            (offset_ms, rtt_ms)，逾時或回應無效時回傳 None。
+        """
+        addr = self._resolve(host)
+        if addr is None:
+            return None
+        buf = self._buf
+        for i in range(48):
+            buf[i] = 0
+        buf[0] = 0x1B  # LI=0, VN=3, Mode=3 (client)
+
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.setblocking(False)
+        try:
+            t1 = _local_ms()
+            start = time.ticks_ms()
+            s.sendto(buf, addr)
+            while True:
+                try:
+                    data = s.recv(48)
+                    break
+                except OSError:
+                    if time.ticks_diff(time.ticks_ms(), start) > _TIMEOUT_MS:
+                        return None
+                    await asyncio.sleep_ms(_POLL_MS)
+            # 以 ticks 量測經過時間，本地時鐘解析度不足時也不受影響
+            t4 = t1 + time.ticks_diff(time.ticks_ms(), start)
+        finally:
+            s.close()
+
+        # Mode 必須是 4（server）且 stratum 不為 0（kiss-o'-death）
+        if len(data) < 48 or (data[0] & 0x07) != 4 or data[1] == 0:
+            return None
+        t2 = _ntp_ms(data, 32)  # 伺服器收到請求
+        t3 = _ntp_ms(data, 40)  # 伺服器送出回應
+        offset_ms = ((t2 - t1) + (t3 - t4)) // 2
+        rtt_ms = (t4 - t1) - (t3 - t2)
+        return offset_ms, rtt_ms
+
+    async def _apply(self, offset_ms):
+        """套用時間偏移，並更新漂移率與下次同步間隔。"""
+        now_ms = _local_ms()
+        if self.synced and self.last_sync:
+            elapsed_ms = now_ms - self.last_sync * 1000
+            if elapsed_ms > 60000:
+                ppm = offset_ms * 1000000 / elapsed_ms
+                # 指數平滑，避免單次網路抖動造成間隔大幅跳動
+                self.drift_ppm = (
+                    ppm if not self.drift_ppm
+                    else self.drift_ppm * 0.5 + ppm * 0.5
+                )
+        if self.drift_ppm:
+            interval = int(
+                _TARGET_ERROR_MS * 1000 / abs(self.drift_ppm)
+            )
+            self.interval = max(_MIN_INTERVAL,
+                                min(interval, _MAX_INTERVAL))
+
+        # 等到下一個整秒再設定 RTC，避免捨去小數秒
+        target_ms = now_ms + offset_ms
+        await asyncio.sleep_ms(1000 - target_ms % 1000)
+        epoch = target_ms // 1000 + 1
+        set_rtc(epoch)
+
+        self.synced = True
+        self.last_sync = epoch
+        self.last_offset_ms = offset_ms
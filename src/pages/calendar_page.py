@@ -1,9 +1,20 @@
-"""Calendar Page — 月曆頁面。"""
+"""Calendar Page — 月曆頁面。
+
+月份排版（格位、顏色、標題位置）依 (year, month) 存於小型 LRU，
+整頁畫面擷取成 Layer，只在切換月份、跨天、事件更新或主題改變時重繪。
+設定 calendar_ics_url 後，有事件的日期下方標示圓點，點擊中間切換今日議程。
+"""
 
 import time
+import uasyncio as asyncio
+from config_manager import ConfigManager
+from date_util import days_from_civil
+from ics_calendar import IcsCalendar
 from ui.page import Page
+from ui.layer import Layer
+from ui.clip import contains
 from ui.theme import (
-    WHITE, GRAY, DARK_GRAY, PRIMARY, CYAN,
+    WHITE, GRAY, DARK_GRAY, PRIMARY, CYAN, YELLOW,
     FONT_SMALL, FONT_MEDIUM,
 )
 
@@ -21,6 +32,11 @@ _GRID_Y = _HEADER_H + _WEEKDAY_H  # 57 — grid start y
 _COL_W = 34      # Column width; 34*7 = 238 ≈ 240
 _ROW_H = 30      # Row height; 30*6 = 180 (grid fills to y=237)
 _TEXT_H = 8      # Approximate text height at FONT_SMALL (scale=1)
+_LAYOUT_CACHE_SIZE = 6  # 月份排版 LRU 容量
+_DOT_W = 4       # 事件標記寬度
+_AGENDA_ROW_H = 22
+_ICS_REFRESH = 1800  # ICS 重新抓取間隔（秒）
+_ICS_RETRY = 120     # 抓取失敗後的重試間隔（秒）
 
 
 def _days_in_month(year, month):
@@ -60,6 +76,21 @@ class CalendarPage(Page):
         self._view_month = t[1]
         self._last_day = t[2]
 
+        # {(year, month): (title, title_x, cells)}，_layout_order 最舊在前
+        self._layouts = {}
+        self._layout_order = []
+        self._weekday_layout = None  # [(abbr, x, weekend), ...]
+        self._next_btn_x = 0
+
+        # ICS 事件（未設定 URL 時為 None）
+        self._ics = None
+        self._events_version = 0
+        self._show_agenda = False
+
+        # 整頁快取圖層，第一次完整可見時建立
+        self._layer = None
+        self._cacheable = True
+
     def _get_local_time(self):
         """取得本地時間 tuple。"""
         return time.localtime(time.time() + self._tz_offset * 3600)
@@ -72,6 +103,32 @@ class CalendarPage(Page):
         self._today_day = t[2]
         self._view_year = t[0]
         self._view_month = t[1]
+        self._show_agenda = False
+        self._invalidate()
+
+        url = ConfigManager.get_setting("calendar_ics_url", "")
+        if not url:
+            self._ics = None
+        elif self._ics is None or self._ics.url != url:
+            self._ics = IcsCalendar(url, self._tz_offset)
+        self._refresh_events()
+
+    def _refresh_events(self, force=False):
+        """ICS 過期（或 force）時在背景重新抓取。"""
+        ics = self._ics
+        if ics is None or ics.fetching:
+            return
+        now = time.time()
+        # 尚未成功過時以較短間隔重試
+        wait = _ICS_REFRESH if ics.last_fetch else _ICS_RETRY
+        if force or now - ics.last_attempt >= wait:
+            t = self._get_local_time()
+            asyncio.create_task(ics.refresh(t[0], t[1], t[2], now))
+
+    def _invalidate(self):
+        """標記整頁快取圖層失效。"""
+        if self._layer:
+            self._layer.invalidate()
 
     def update(self):
         """偵測日期跨天，更新今日標記。"""
@@ -82,6 +139,16 @@ class CalendarPage(Page):
             self._today_year = t[0]
             self._today_month = t[1]
             self._today_day = day
+            self._invalidate()
+            # 議程與視窗以今日為準，跨天需重新整理
+            self._refresh_events(force=True)
+        else:
+            self._refresh_events()
+
+        ics = self._ics
+        if ics is not None and ics.version != self._events_version:
+            self._events_version = ics.version
+            self._invalidate()
 
     def handle_touch(self, tx, ty):
         """左側觸控 → 上個月，右側觸控 → 下個月。"""
@@ -91,52 +158,115 @@ class CalendarPage(Page):
             if self._view_month < 1:
                 self._view_month = 12
                 self._view_year -= 1
+            self._invalidate()
             return True
         if tx > w * 2 // 3:
             self._view_month += 1
             if self._view_month > 12:
                 self._view_month = 1
                 self._view_year += 1
+            self._invalidate()
             return True
-        return False
+        # 中間 → 切換月曆 / 今日議程
+        self._show_agenda = not self._show_agenda
+        self._invalidate()
+        return True
 
     def draw(self, display, vector, offset_x=0):
+        layer = self._layer
+        if layer and layer.valid and layer.key == self.bg:
+            if layer.blit(display, offset_x, 0):
+                return
+
+        layout = self._month_layout(
+            display, self._view_year, self._view_month
+        )
         self._draw_background(display)
-        self._draw_header(display, offset_x)
-        self._draw_weekday_labels(display, offset_x)
-        self._draw_grid(display, offset_x)
+        if self._show_agenda:
+            self._draw_agenda(display, offset_x)
+        else:
+            self._draw_header(display, offset_x, layout)
+            self._draw_weekday_labels(display, offset_x)
+            self._draw_grid(display, offset_x, layout)
+
+        # 只在整頁完整可見時擷取，避免把其他頁面或裁切邊緣存進快取
+        w = self.app.width
+        h = self.app.height
+        if self._cacheable and offset_x == 0 and contains(0, 0, w, h):
+            if layer is None:
+                layer = self._layer = Layer(w, h)
+            if layer.capture(display, 0, 0):
+                layer.key = self.bg
+            else:
+                self._cacheable = False
+                self._layer = None
+
+    def _month_layout(self, display, year, month):
+        """取得 (year, month) 的排版，未快取時計算並放入 LRU。
+
+        Returns:
+            (title, title_x, cells)；cells[day - 1] 為
+            (day_str, cell_x, cell_y, text_x, text_y, weekend)，
+            座標不含 offset_x。
+        """
+        key = (year, month)
+        order = self._layout_order
+        layout = self._layouts.get(key)
+        if layout is not None:
+            if order[-1] != key:
+                order.remove(key)
+                order.append(key)
+            return layout
 
-    def _draw_header(self, display, offset_x):
+        w = self.app.width
+        title = "{} {}".format(_MONTH_NAMES[month - 1], year)
+        title_x = (w - display.measure_text(title, FONT_MEDIUM)) // 2
+
+        cells = []
+        col = _first_weekday(year, month)
+        row = 0
+        text_dy = (_ROW_H - _TEXT_H) // 2
+        for day in range(1, _days_in_month(year, month) + 1):
+            cell_x = col * _COL_W
+            cell_y = _GRID_Y + row * _ROW_H
+            day_str = str(day)
+            tw = display.measure_text(day_str, FONT_SMALL)
+            cells.append((
+                day_str, cell_x, cell_y,
+                cell_x + (_COL_W - tw) // 2, cell_y + text_dy,
+                col >= 5,
+            ))
+            col += 1
+            if col >= 7:
+                col = 0
+                row += 1
+
+        layout = (title, title_x, cells)
+        self._layouts[key] = layout
+        order.append(key)
+        if len(order) > _LAYOUT_CACHE_SIZE:
+            del self._layouts[order.pop(0)]
+        return layout
+
+    def _draw_header(self, display, offset_x, layout):
         """繪製月份 / 年份標題列。"""
         w = self.app.width
+        title, title_x, _ = layout
 
         display.set_pen(display.create_pen(*DARK_GRAY))
         display.rectangle(offset_x, 0, w, _HEADER_H)
 
-        # < button (left touch zone)
+        # < / > buttons (left / right touch zones)
+        if not self._next_btn_x:
+            btn_w = display.measure_text(">", FONT_MEDIUM)
+            self._next_btn_x = w - btn_w - 8
         display.set_pen(display.create_pen(*GRAY))
         display.text("<", offset_x + 8, 10, w, FONT_MEDIUM)
+        display.text(">", offset_x + self._next_btn_x, 10, w, FONT_MEDIUM)
 
         # Month + Year centred
-        title = "{} {}".format(
-            _MONTH_NAMES[self._view_month - 1], self._view_year
-        )
-        title_w = display.measure_text(title, FONT_MEDIUM)
         display.set_pen(display.create_pen(*WHITE))
-        display.text(
-            title,
-            offset_x + (w - title_w) // 2,
-            10, w, FONT_MEDIUM,
-        )
-
-        # > button (right touch zone)
-        display.set_pen(display.create_pen(*GRAY))
-        btn_w = display.measure_text(">", FONT_MEDIUM)
-        display.text(
-            ">",
-            offset_x + w - btn_w - 8,
-            10, w, FONT_MEDIUM,
-        )
+        display.text(title, offset_x + title_x, 10, w, FONT_MEDIUM)
 
     def _draw_weekday_labels(self, display, offset_x):
         """繪製星期標題列（Sa / Su 以青色區分）。"""
@@ -145,56 +275,111 @@ class CalendarPage(Page):
         display.set_pen(display.create_pen(*DARK_GRAY))
         display.rectangle(offset_x, _HEADER_H, w, _WEEKDAY_H)
 
+        labels = self._weekday_layout
+        if labels is None:
+            labels = self._weekday_layout = []
+            for i, abbr in enumerate(_WEEKDAY_ABBR):
+                col_center = i * _COL_W + _COL_W // 2
+                tw = display.measure_text(abbr, FONT_SMALL)
+                labels.append((abbr, col_center - tw // 2, i >= 5))
+
         label_y = _HEADER_H + (_WEEKDAY_H - _TEXT_H) // 2
-        for i, abbr in enumerate(_WEEKDAY_ABBR):
-            col_center = offset_x + i * _COL_W + _COL_W // 2
-            tw = display.measure_text(abbr, FONT_SMALL)
-            color = CYAN if i >= 5 else GRAY
-            display.set_pen(display.create_pen(*color))
-            display.text(
-                abbr, col_center - tw // 2,
-                label_y, w, FONT_SMALL,
-            )
+        gray = display.create_pen(*GRAY)
+        cyan = display.create_pen(*CYAN)
+        for abbr, x, weekend in labels:
+            display.set_pen(cyan if weekend else gray)
+            display.text(abbr, offset_x + x, label_y, w, FONT_SMALL)
 
-    def _draw_grid(self, display, offset_x):
+    def _draw_grid(self, display, offset_x, layout):
         """繪製月曆格和日期數字。"""
         w = self.app.width
-        year = self._view_year
-        month = self._view_month
-
-        first_wd = _first_weekday(year, month)
-        num_days = _days_in_month(year, month)
-        is_current = (
-            year == self._today_year
-            and month == self._today_month
+        cells = layout[2]
+
+        today = 0
+        if (self._view_year == self._today_year
+                and self._view_month == self._today_month):
+            today = self._today_day
+
+        # Today highlight — filled rect
+        if today:
+            _, cell_x, cell_y, _, _, _ = cells[today - 1]
+            display.set_pen(display.create_pen(*PRIMARY))
+            display.rectangle(
+                offset_x + cell_x + 2, cell_y + 2,
+                _COL_W - 4, _ROW_H - 4,
+            )
+
+        # Event markers — 每格 O(1) 查詢事件索引
+        index = self._ics.index if self._ics else None
+        if index is not None:
+            counts = index.counts
+            base = days_from_civil(
+                self._view_year, self._view_month, 1
+            ) - index.start_day
+            display.set_pen(display.create_pen(*YELLOW))
+            for day, cell in enumerate(cells):
+                i = base + day
+                if 0 <= i < len(counts) and counts[i]:
+                    display.rectangle(
+                        offset_x + cell[1] + (_COL_W - _DOT_W) // 2,
+                        cell[2] + _ROW_H - 7, _DOT_W, 2,
+                    )
+
+        # Day numbers — 平日與週末各設定一次畫筆
+        white = display.create_pen(*WHITE)
+        cyan = display.create_pen(*CYAN)
+        for weekend_pass in (False, True):
+            display.set_pen(cyan if weekend_pass else white)
+            for day, cell in enumerate(cells, 1):
+                day_str, _, _, tx, ty, weekend = cell
+                if weekend != weekend_pass:
+                    continue
+                if weekend and day == today:
+                    display.set_pen(white)
+                    display.text(day_str, offset_x + tx, ty, w, FONT_SMALL)
+                    display.set_pen(cyan)
+                    continue
+                display.text(day_str, offset_x + tx, ty, w, FONT_SMALL)
+
+    def _draw_agenda(self, display, offset_x):
+        """繪製今日議程（時間 + 摘要）。"""
+        w = self.app.width
+
+        display.set_pen(display.create_pen(*DARK_GRAY))
+        display.rectangle(offset_x, 0, w, _HEADER_H)
+        title = "Today {:02d}/{:02d}".format(
+            self._today_month, self._today_day
         )
+        title_w = display.measure_text(title, FONT_MEDIUM)
+        display.set_pen(display.create_pen(*WHITE))
+        display.text(title, offset_x + (w - title_w) // 2,
+                     10, w, FONT_MEDIUM)
 
-        col = first_wd
-        row = 0
-        for day in range(1, num_days + 1):
-            cell_x = offset_x + col * _COL_W
-            cell_y = _GRID_Y + row * _ROW_H
-            is_today = is_current and day == self._today_day
-            is_weekend = col >= 5
-
-            # Today highlight — filled rect
-            if is_today:
-                display.set_pen(display.create_pen(*PRIMARY))
-                display.rectangle(
-                    cell_x + 2, cell_y + 2,
-                    _COL_W - 4, _ROW_H - 4,
-                )
-
-            # Day number — centred in cell
-            day_str = str(day)
-            tw = display.measure_text(day_str, FONT_SMALL)
-            tx = cell_x + (_COL_W - tw) // 2
-            ty = cell_y + (_ROW_H - _TEXT_H) // 2
-            color = WHITE if (is_today or not is_weekend) else CYAN
-            display.set_pen(display.create_pen(*color))
-            display.text(day_str, tx, ty, w, FONT_SMALL)
+        ics = self._ics
+        y = _HEADER_H + 8
+        if ics is None:
+            message = "No ICS URL set"
+        elif ics.index is None:
+            message = ics.error or "Loading..."
+        elif not ics.index.agenda:
+            message = "No events"
+        else:
+            message = None
+        if message:
+            display.set_pen(display.create_pen(*GRAY))
+            display.text(message, offset_x + 8, y, w - 16, FONT_SMALL)
+            return
 
-            col += 1
-            if col >= 7:
-                col = 0
-                row += 1
+        gray = display.create_pen(*GRAY)
+        white = display.create_pen(*WHITE)
+        for start, _, all_day, summary in ics.index.agenda:
+            if y + _AGENDA_ROW_H > self.app.height:
+                break
+            when = "All day" if all_day else "{:02d}:{:02d}".format(
+                start // 60, start % 60
+            )
+            display.set_pen(gray)
+            display.text(when, offset_x + 8, y, w, FONT_SMALL)
+            display.set_pen(white)
+            display.text(summary, offset_x + 60, y, w - 68, FONT_SMALL)
+            y += _AGENDA_ROW_H
@@ -2,11 +2,12 @@
 
 import math
 import time
-import ntptime
-import uasyncio as asyncio
 from config_manager import ConfigManager
+from ntp_client import CONFIDENCE_NONE, CONFIDENCE_RESTORED
 from ui.page import Page
 from ui.widget import Label
+from ui.layer import Layer
+from ui.clip import contains
 from ui.theme import (
     WHITE, GRAY, DARK_GRAY, PRIMARY, BACKGROUND,
     FONT_SMALL, FONT_MEDIUM, FONT_LARGE, FONT_XLARGE,
@@ -23,6 +24,7 @@ _WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
 _CENTER_X = 120
 _CENTER_Y = 120
 _FACE_RADIUS = 105
+_FACE_SIZE = 2 * (_FACE_RADIUS + 2)  # 錶面快取圖層邊長（含加粗外圈）
 _HOUR_MARK_OUTER = 100
 _HOUR_MARK_INNER = 88
 _MIN_MARK_OUTER = 100
@@ -36,6 +38,18 @@ _HOUR_HAND_W = 4
 _MIN_HAND_W = 3
 _SEC_HAND_W = 1
 
+# 螢幕保護漂移以 1/16 px 定點整數計算
+_DRIFT_SHIFT = 4
+
+# 時間可信度指示點（底部中央）：綠 = NTP 已同步、橘 = 由 Flash 還原、紅 = 未校正
+_CONF_DOT_Y = 232
+_CONF_DOT_R = 2
+_CONF_COLORS = {
+    CONFIDENCE_NONE: (200, 40, 40),
+    CONFIDENCE_RESTORED: (230, 150, 0),
+}
+_CONF_SYNCED_COLOR = (0, 170, 80)
+
 
 class ClockPage(Page):
     """時鐘頁面，點擊螢幕切換數位/類比模式。
@@ -49,7 +63,6 @@ class ClockPage(Page):
         super().__init__(app)
         self._mode = MODE_DIGITAL
         self._tz_offset = tz_offset
-        self._ntp_synced = False
         self._last_sec = -1
 
         # 滑動動畫
@@ -64,11 +77,19 @@ class ClockPage(Page):
         self._last_tap_time = 0
         self._double_tap_ms = 400  # 雙擊最大間隔
 
-        # 螢幕保護漂移
-        self._drift_x = 0.0
-        self._drift_y = 0.0
-        self._drift_vx = 0.7   # px/frame
-        self._drift_vy = 0.5
+        # 螢幕保護漂移（定點整數，每幀只做整數加減）
+        self._drift_x = 0
+        self._drift_y = 0
+        self._drift_vx = 11    # ≈0.7 px/frame
+        self._drift_vy = 8     # 0.5 px/frame
+        self._applied_dx = None  # 已套用到 label 的整數偏移
+        self._applied_dy = None
+
+        # 文字量測快取：文字改變時才重算寬度、漂移邊界與各 label 相對位置
+        self._metrics_dirty = True
+        self._max_dx = 5 << _DRIFT_SHIFT
+        self._max_dy = 5 << _DRIFT_SHIFT
+        self._layout = ()  # ((label, x, y), ...)，未加漂移的位置
 
         # 預計算三角函數表（60 格，每格 6 度）
         self._sin_table = []
@@ -110,6 +131,10 @@ class ClockPage(Page):
         self._hand_polygons = {}
         self._build_hand_polygons()
 
+        # 靜態錶面（外圈、刻度、數字）快取圖層，主題或解析度改變時重建
+        self._face_layer = Layer(_FACE_SIZE, _FACE_SIZE)
+        self._face_cacheable = True
+
     def _build_hand_polygons(self):
         """預建指針 Polygon 物件。"""
         try:
@@ -157,16 +182,18 @@ class ClockPage(Page):
         self._tz_offset = ConfigManager.get_setting(
             "timezone", self._tz_offset
         )
-        asyncio.create_task(self._sync_ntp())
+        self._metrics_dirty = True
+        self._sync_ntp()
 
-    async def _sync_ntp(self):
-        """背景同步 NTP 時間。"""
-        try:
-            ntptime.settime()
-            self._ntp_synced = True
-        except Exception:
-            # NTP 失敗就用系統時間
-            pass
+    def _sync_ntp(self):
+        """請求背景 NTP 同步（非阻塞，失敗時沿用系統時間）。
+
+        實際同步由 app.ntp（NtpClient）的背景迴圈執行，
+        並依 RTC 漂移自動定期重新同步，頁面不需常駐。
+        """
+        ntp = getattr(self.app, 'ntp', None)
+        if ntp and not ntp.synced:
+            ntp.request_sync()
 
     def _get_local_time(self):
         """取得本地時間 tuple。"""
@@ -193,65 +220,81 @@ class ClockPage(Page):
         if self._mode == MODE_DIGITAL:
             self._update_digital_text(t)
 
-    def _update_drift(self):
-        """更新螢幕保護漂移位置（每幀呼叫）。"""
+    def _measure(self):
+        """量測 label 文字寬度，更新漂移邊界與整組排版（文字改變時呼叫）。"""
         d = self.app.display
         w = self.app.width
         h = self.app.height
-        time_text = self._time_label.text or "--:--"
-        sec_text = self._sec_label.text or ":00"
-        total_w = (d.measure_text(time_text, self._time_scale) +
-                   d.measure_text(sec_text, self._sec_scale))
-        block_h = 100
+        time_w = d.measure_text(self._time_label.text or "--:--",
+                                self._time_scale)
+        sec_w = d.measure_text(self._sec_label.text or ":00",
+                               self._sec_scale)
+        date_w = d.measure_text(self._date_label.text or "0000/00/00",
+                                FONT_LARGE)
+        wday_w = d.measure_text(self._weekday_label.text or "Mon",
+                                FONT_MEDIUM)
+
+        # 整組寬度 = HH:MM + :SS；秒數緊貼時間右側，底部對齊
+        total_w = time_w + sec_w
+        base_x = (w - total_w) // 2
+        base_y = 65
+        self._layout = (
+            (self._time_label, base_x, base_y),
+            (self._sec_label, base_x + time_w,
+             base_y + 8 * self._time_scale - 8 * self._sec_scale),
+            (self._date_label, (w - date_w) // 2, base_y + 55),
+            (self._weekday_label, (w - wday_w) // 2, base_y + 85),
+        )
 
-        max_dx = max((w - total_w) // 2, 5)
-        max_dy = max((h - block_h) // 2, 5)
+        block_h = 100
+        self._max_dx = max((w - total_w) // 2, 5) << _DRIFT_SHIFT
+        self._max_dy = max((h - block_h) // 2, 5) << _DRIFT_SHIFT
+        self._metrics_dirty = False
+        self._applied_dx = None  # 排版改變，強制重新套用
 
-        self._drift_x += self._drift_vx
-        self._drift_y += self._drift_vy
-        if self._drift_x > max_dx or self._drift_x < -max_dx:
-            self._drift_vx = -self._drift_vx
-            self._drift_x += self._drift_vx
-        if self._drift_y > max_dy or self._drift_y < -max_dy:
-            self._drift_vy = -self._drift_vy
-            self._drift_y += self._drift_vy
+    def _update_drift(self):
+        """更新螢幕保護漂移位置（每幀呼叫）。"""
+        if self._metrics_dirty:
+            self._measure()
+
+        x = self._drift_x + self._drift_vx
+        if x > self._max_dx:
+            x = self._max_dx
+            self._drift_vx = -abs(self._drift_vx)
+        elif x < -self._max_dx:
+            x = -self._max_dx
+            self._drift_vx = abs(self._drift_vx)
+        y = self._drift_y + self._drift_vy
+        if y > self._max_dy:
+            y = self._max_dy
+            self._drift_vy = -abs(self._drift_vy)
+        elif y < -self._max_dy:
+            y = -self._max_dy
+            self._drift_vy = abs(self._drift_vy)
+        self._drift_x = x
+        self._drift_y = y
 
         self._apply_drift_positions()
 
     def _apply_drift_positions(self):
-        """根據漂移偏移量套用 widget 位置。"""
-        d = self.app.display
-        w = self.app.width
-        dx = int(self._drift_x)
-        dy = int(self._drift_y)
-
-        time_text = self._time_label.text or "--:--"
-        time_w = d.measure_text(time_text, self._time_scale)
-        sec_text = self._sec_label.text or ":00"
-        sec_w = d.measure_text(sec_text, self._sec_scale)
-
-        # 整組寬度 = HH:MM + :SS
-        total_w = time_w + sec_w
-        base_x = (w - total_w) // 2 + dx
-        base_y = 65 + dy
-
-        self._time_label.x = base_x
-        self._time_label.y = base_y
-
-        # 秒數緊貼時間右側，底部對齊
-        self._sec_label.x = base_x + time_w
-        self._sec_label.y = base_y + (8 * self._time_scale -
-                                       8 * self._sec_scale)
-
-        date_text = self._date_label.text or "0000/00/00"
-        date_w = d.measure_text(date_text, FONT_LARGE)
-        self._date_label.x = (w - date_w) // 2 + dx
-        self._date_label.y = base_y + 55
-
-        wday_text = self._weekday_label.text or "Mon"
-        wday_w = d.measure_text(wday_text, FONT_MEDIUM)
-        self._weekday_label.x = (w - wday_w) // 2 + dx
-        self._weekday_label.y = base_y + 85
+        """根據漂移偏移量套用 widget 位置（整數偏移改變時才寫入）。"""
+        if self._metrics_dirty:
+            self._measure()
+        dx = self._drift_x >> _DRIFT_SHIFT
+        dy = self._drift_y >> _DRIFT_SHIFT
+        if dx == self._applied_dx and dy == self._applied_dy:
+            return
+        self._applied_dx = dx
+        self._applied_dy = dy
+        for label, x, y in self._layout:
+            label.x = x + dx
+            label.y = y + dy
+
+    def _set_label(self, label, text):
+        """更新 label 文字，改變時標記需要重新量測。"""
+        if label.text != text:
+            label.set_text(text)
+            self._metrics_dirty = True
 
     def _update_digital_text(self, t):
         """更新數位時鐘文字（每秒呼叫）。"""
@@ -259,13 +302,12 @@ class ClockPage(Page):
         year, month, day = t[0], t[1], t[2]
         wday = t[6]  # 0=Monday
 
-        self._time_label.set_text(
-            "{:02d}:{:02d}".format(hour, minute))
-        self._sec_label.set_text(
-            ":{:02d}".format(sec))
-        self._date_label.set_text(
-            "{:04d}/{:02d}/{:02d}".format(year, month, day))
-        self._weekday_label.set_text(_WEEKDAYS[wday])
+        self._set_label(self._time_label,
+                        "{:02d}:{:02d}".format(hour, minute))
+        self._set_label(self._sec_label, ":{:02d}".format(sec))
+        self._set_label(self._date_label,
+                        "{:04d}/{:02d}/{:02d}".format(year, month, day))
+        self._set_label(self._weekday_label, _WEEKDAYS[wday])
 
     def _update_animation(self):
         """更新滑動過渡動畫（線性）。"""
@@ -294,6 +336,16 @@ class ClockPage(Page):
             self._draw_widgets(display, offset_x)
         else:
             self._draw_analog(display, vector, offset_x)
+        self._draw_confidence(display, offset_x)
+
+    def _draw_confidence(self, display, offset_x):
+        """繪製時間可信度指示點。"""
+        ntp = getattr(self.app, 'ntp', None)
+        level = ntp.confidence() if ntp else CONFIDENCE_NONE
+        color = _CONF_COLORS.get(level, _CONF_SYNCED_COLOR)
+        display.set_pen(display.create_pen(*color))
+        self._fill_circle(display, self.app.width // 2 + offset_x,
+                          _CONF_DOT_Y, _CONF_DOT_R)
 
     def _draw_animated(self, display, vector, offset_x):
         """繪製滑動過渡動畫。"""
@@ -330,15 +382,8 @@ class ClockPage(Page):
         t = self._get_local_time()
         hour, minute, sec = t[3] % 12, t[4], t[5]
 
-        # 錶面外圈
-        self._draw_circle_outline(display, cx, cy,
-                                  _FACE_RADIUS, DARK_GRAY)
-
-        # 刻度
-        self._draw_tick_marks(display, cx, cy)
-
-        # 數字 12, 3, 6, 9
-        self._draw_hour_numbers(display, cx, cy)
+        # 靜態錶面：優先貼快取圖層
+        self._draw_face(display, cx, cy, offset_x)
 
         # 中央日期
         month, day = t[1], t[2]
@@ -366,6 +411,38 @@ class ClockPage(Page):
         display.set_pen(display.create_pen(*WHITE))
         self._fill_circle(display, cx, cy, 4)
 
+    def _draw_face(self, display, cx, cy, offset_x):
+        """繪製靜態錶面（外圈、刻度、12/3/6/9）。
+
+        第一次在完整可見、無偏移的情況下繪製後擷取成圖層，
+        之後每幀（含滑動中）只貼圖層；主題背景或解析度改變時重建。
+        """
+        layer = self._face_layer
+        half = _FACE_SIZE // 2
+        key = (self.bg, self.app.width, self.app.height)
+        if layer.valid and layer.key == key:
+            if layer.blit(display, cx - half, cy - half):
+                return
+
+        # 錶面外圈
+        self._draw_circle_outline(display, cx, cy,
+                                  _FACE_RADIUS, DARK_GRAY)
+
+        # 刻度
+        self._draw_tick_marks(display, cx, cy)
+
+        # 數字 12, 3, 6, 9
+        self._draw_hour_numbers(display, cx, cy)
+
+        # 只在整個錶面完整可見時擷取，避免把其他頁面或裁切邊緣存進快取
+        if self._face_cacheable and offset_x == 0:
+            x, y = cx - half, cy - half
+            if contains(x, y, _FACE_SIZE, _FACE_SIZE):
+                if layer.capture(display, x, y):
+                    layer.key = key
+                else:
+                    self._face_cacheable = False
+
     def _draw_circle_outline(self, display, cx, cy, r, color):
         """用點陣繪製圓形外框。"""
         display.set_pen(display.create_pen(*color))
@@ -1,184 +1,205 @@
 """Market Page — 加密貨幣（WebSocket 即時）+ 股票行情。"""
 
 import gc
-import ssl
-import struct
-import time
 import json
-import uos
-import ubinascii
+import time
+from array import array
 import uasyncio as asyncio
+import tls
+from ws_client import WebSocketClient, OP_TEXT
+from mini_ticker import MiniTickerTable
+from price_history import PriceHistory
+from candles import CandleSeries, kline_start
+from json_stream import parse_stream
+from config_manager import ConfigManager
+from refresh_policy import RefreshPolicy
 from ui.page import Page
-from ui.widget import Label
+from ui.widget import Widget, Label, Container, ListView, Sparkline
+from ui.layer import Layer
+from ui.clip import contains
 from ui.theme import (
     WHITE, GREEN, RED, DARK_GRAY, GRAY,
     FONT_SMALL, FONT_MEDIUM,
 )
 
 # Binance WebSocket combined stream（即時推送，無需 API key）
+# 監看清單（market_crypto）變更時以 SUBSCRIBE / UNSUBSCRIBE 在同一條
+# 連線上增減 stream，不重新連線
 _WS_HOST = "stream.binance.com"
 _WS_PORT = 9443
-_WS_PATH = (
-    "/stream?streams="
-    "btcusdt@miniTicker/ethusdt@miniTicker"
-)
+_WS_STREAM = "{}@miniTicker"
+_KLINE_STREAM = "{}@kline_1m"
+_QUOTE_ASSETS = ("USDT", "USDC", "FDUSD", "BUSD")  # 顯示名稱省略的計價幣
 
 # Stooq CSV API（股票每日資料，市場收盤時顯示 --）
+# 多個代號以 "+" 串接，一次請求取得所有報價（每個代號一行 CSV）
 _STOOQ_HOST = "stooq.com"
 _STOOQ_PATH = "/q/l/?s={}&f=sd2t2ohlcv&e=csv"
-_STOCK_SYMBOLS = [
-    ("SPY",  "spy"),
-    ("AAPL", "aapl"),
-    ("TWII", "%5etwii"),
-    ("2330", "2330.tw"),
-]
 
 _STOCK_INTERVAL = 300   # 股票刷新間隔（5 分鐘）
 _WS_PING_INTERVAL = 30  # WebSocket ping 間隔（秒）
+_WS_MAX_MESSAGE = 2048  # miniTicker 訊息約 200 bytes，留足訂閱回應的空間
+_ROW_H = 28             # 行情列高度（px）
+
+# 加密貨幣走勢：每分鐘一筆、保留 24 小時，每列一個 sparkline
+# （每欄 30 分鐘，記憶體固定為每個交易對 1440 * 4 bytes）
+_HISTORY_SIZE = 1440
+_HISTORY_INTERVAL = 60
+_CHART_X = 52
+_CHART_W = 48
+_CHART_H = 14
+
+# K 線圖：點擊加密貨幣列開啟，1 分鐘 K 線、最近 56 根。
+# 開啟時以 REST 回填一次，之後由 @kline_1m stream 更新最右一根
+_KLINE_HOST = "api.binance.com"
+_KLINE_PATH = "/api/v3/klines?symbol={}&interval=1m&limit={}"
+_CANDLES = 56
+_CANDLE_PITCH = 4       # 每根寬度（含 1 px 間隔）
+_CANDLE_X = (240 - _CANDLES * _CANDLE_PITCH) // 2
+_CANDLE_TOP = 46
+_CANDLE_H = 150
 
 
 # ---------------------------------------------------------------------------
-# WebSocket 工具函式
+# 代號工具
 # ---------------------------------------------------------------------------
 
-async def _ws_recv_frame(reader):
-    """讀取一個 WebSocket frame。
+def _ws_path(streams):
+    """stream 名稱清單 → combined stream 路徑。"""
+    return "/stream?streams=" + "/".join(streams)
 
-    Returns:
-        (opcode, data) 或 None（連線關閉）。
-    """
-    header = await reader.read(2)
-    if len(header) < 2:
-        return None
-    opcode = header[0] & 0x0F
-    length = header[1] & 0x7F
-
-    if length == 126:
-        ext = await reader.read(2)
-        length = struct.unpack(">H", ext)[0]
-    elif length == 127:
-        ext = await reader.read(8)
-        length = struct.unpack(">Q", ext)[0]
-
-    # Server→Client frames 不加 mask
-    data = await reader.read(length)
-    return opcode, data
-
-
-async def _ws_send_frame(writer, opcode, data):
-    """發送一個 WebSocket frame（Client→Server，需 mask）。"""
-    mask_key = uos.urandom(4)
-    payload = bytes(
-        b ^ mask_key[i % 4] for i, b in enumerate(data)
-    )
-    length = len(payload)
-    if length < 126:
-        header = bytes([0x80 | opcode, 0x80 | length])
-    else:
-        header = bytes(
-            [0x80 | opcode, 0x80 | 126]
-        ) + struct.pack(">H", length)
-    writer.write(header + mask_key + payload)
-    await writer.drain()
+
+def _crypto_name(symbol):
+    """交易對 → 顯示名稱（"BTCUSDT" → "BTC"）。"""
+    for quote in _QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return symbol
+
+
+def _stock_name(symbol):
+    """Stooq 代號 → 顯示名稱（"^twii" → "TWII"、"2330.tw" → "2330"）。"""
+    return _stooq_key(symbol).decode().lstrip("^")
+
+
+def _format_price(price):
+    """價格 → 顯示字串（位數依價格大小）。"""
+    if price >= 10000:
+        return "{:.0f}".format(price)
+    if price >= 100:
+        return "{:.1f}".format(price)
+    return "{:.2f}".format(price)
 
 
 # ---------------------------------------------------------------------------
-# HTTPS 工具函式（Stooq 股票用）
+# Stooq 批次報價（股票用）
 # ---------------------------------------------------------------------------
 
-async def _async_https_get(host, path):
-    """非阻塞 HTTPS GET，支援 chunked encoding。
+def _stooq_key(symbol):
+    """CSV 第一欄的比對鍵：大寫、去掉市場後綴（"SPY.US" → b"SPY"）。"""
+    symbol = symbol.upper()
+    dot = symbol.find(".")
+    if dot > 0:
+        symbol = symbol[:dot]
+    return symbol.encode()
+
+
+def _parse_stooq_line(line):
+    """解析一行 CSV（Symbol,Date,Time,Open,High,Low,Close,Volume）。
 
     Returns:
-        回應 body 的 bytes。
+        (比對鍵, open, close)；N/D（無資料）時 open、close 為 0；
+        格式不符（如標頭列）時回傳 None。
+    """
+    vals = line.split(b",")
+    if len(vals) < 7:
+        return None
+    key = vals[0]
+    dot = key.find(b".")
+    if dot > 0:
+        key = key[:dot]
+    if vals[6].strip() == b"N/D":
+        return key, 0.0, 0.0
+    try:
+        return key, float(vals[3]), float(vals[6])
+    except ValueError:
+        return None
+
+
+async def _https_open(host, path):
+    """HTTPS GET（HTTP/1.0，回應不會是 chunked），跳過 headers 後回傳
+    (reader, writer)。
+
+    呼叫端自行逐行或串流讀取 body，讀完後需 writer.close()。
+    TLS context 與 session 由 tls 模組依主機共用，輪詢時不必每次完整握手。
 
     Raises:
-        OSError: HTTP 狀態非 200。
+        OSError: 連線失敗或 HTTP 狀態非 200（連線已關閉）。
     """
-    ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-    ssl_ctx.verify_mode = ssl.CERT_NONE
-    reader, writer = await asyncio.open_connection(
-        host, 443, ssl=ssl_ctx
-    )
     request = (
-        "GET {} HTTP/1.1\r\n"
+        "GET {} HTTP/1.0\r\n"
         "Host: {}\r\n"
         "User-Agent: MicroPython/1.0\r\n"
         "Accept: */*\r\n"
         "Connection: close\r\n"
         "\r\n"
     ).format(path, host)
-    writer.write(request.encode())
-    await writer.drain()
-
-    status_line = await reader.readline()
-    if b"200" not in status_line:
-        writer.close()
-        raise OSError("HTTP " + status_line.decode().strip())
-
-    is_chunked = False
-    while True:
-        line = await reader.readline()
-        if not line or line == b"\r\n":
-            break
-        if b"transfer-encoding: chunked" in line.lower():
-            is_chunked = True
-
-    if is_chunked:
-        chunks = []
-        while True:
-            size_line = await reader.readline()
-            try:
-                size = int(size_line.strip(), 16)
-            except Exception:
-                break
-            if size == 0:
-                break
-            chunks.append(await reader.read(size))
-            await reader.read(2)
-        body = b"".join(chunks)
-    else:
-        chunks = []
+    reader, writer, status = await tls.request(host, 443, request.encode())
+    try:
+        if b" 200 " not in status:
+            raise OSError("HTTP " + status.decode().strip())
         while True:
-            chunk = await reader.read(512)
-            if not chunk:
+            line = await reader.readline()
+            if not line or line == b"\r\n":
                 break
-            chunks.append(chunk)
-        body = b"".join(chunks)
+    except Exception:
+        writer.close()
+        raise
+    return reader, writer
+
 
-    writer.close()
-    await asyncio.sleep_ms(50)
-    return body
+async def _fetch_stooq(symbols, keys, close, change):
+    """一次 HTTPS 請求取得所有股票報價，逐行解析寫入 close / change。
 
+    使用 HTTP/1.0，回應不會是 chunked，body 可直接逐行讀取，
+    同一時間只保留一行 CSV。
 
-async def _fetch_stooq(display_name, symbol):
-    """取得 Stooq 股票報價（日資料）。
+    Args:
+        symbols: Stooq 代號清單。
+        keys: 各槽位的比對鍵（_stooq_key），順序即槽位。
+        close / change: 各槽位的收盤價與漲跌幅（array 'f'，就地更新）。
 
     Returns:
-        (display_name, price, change_pct) 或 None。
+        更新的槽位 bitmask。
+
+    Raises:
+        OSError: 連線失敗或 HTTP 狀態非 200。
     """
+    path = _STOOQ_PATH.format(
+        "+".join(sym.replace("^", "%5e") for sym in symbols)
+    )
+    reader, writer = await _https_open(_STOOQ_HOST, path)
+    updated = 0
     try:
-        body = await _async_https_get(
-            _STOOQ_HOST, _STOOQ_PATH.format(symbol)
-        )
-        gc.collect()
-        text = body.decode()
-        lines = text.strip().split("\n")
-        data_line = lines[-1].strip()
-        vals = data_line.split(",")
-        if len(vals) < 7:
-            return None
-        if "N/D" in vals:
-            return (display_name, 0.0, 0.0)
-        open_p = float(vals[3])
-        close_p = float(vals[6])
-        if open_p == 0:
-            return (display_name, close_p, 0.0)
-        change = (close_p - open_p) / open_p * 100
-        return (display_name, close_p, change)
-    except Exception as e:
-        print("Stooq {} err: {}".format(symbol, e))
-        return None
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            rec = _parse_stooq_line(line)
+            if rec is None:
+                continue
+            key, open_p, close_p = rec
+            try:
+                slot = keys.index(key)
+            except ValueError:
+                continue
+            close[slot] = close_p
+            change[slot] = ((close_p - open_p) / open_p * 100
+                            if open_p else 0.0)
+            updated |= 1 << slot
+    finally:
+        writer.close()
+    return updated
 
 
 # ---------------------------------------------------------------------------
@@ -186,7 +207,15 @@ async def _fetch_stooq(display_name, symbol):
 # ---------------------------------------------------------------------------
 
 class MarketPage(Page):
-    """行情頁面：BTC/ETH WebSocket 即時 + 股票每日資料。
+    """行情頁面：加密貨幣 WebSocket 即時 + 股票每日資料。
+
+    監看清單來自 market_crypto / market_stocks 設定；Web 設定修改後經
+    on_settings_changed() 立即套用，加密貨幣在現有連線上改訂閱，
+    股票則立刻重新抓取。
+
+    點擊加密貨幣列開啟 1 分鐘 K 線圖：REST 回填最近 _CANDLES 根後，
+    在同一條 WebSocket 連線上加訂 @kline_1m，只更新最右一根；
+    點擊任意處返回清單。
 
     Args:
         app: App 實例。
@@ -195,19 +224,52 @@ class MarketPage(Page):
     def __init__(self, app):
         super().__init__(app)
 
-        # WebSocket 狀態
+        # WebSocket 狀態（收發 buffer 預先配置，重連時沿用）
+        self._ws = WebSocketClient(
+            _WS_HOST, "", port=_WS_PORT, max_size=_WS_MAX_MESSAGE,
+        )
         self._ws_task = None
         self._ws_connected = False
-
-        # 加密貨幣報價（WebSocket 更新）
-        # {"BTCUSDT": (price, change_pct), ...}
-        self._crypto_data = {}
-
-        # 股票報價（HTTPS 輪詢）
-        self._stock_data = []  # [(name, price, change), ...]
-        self._stock_last_fetch = 0
+        self._ws_wake = asyncio.Event()   # 清單由空變為非空時喚醒連線
+        self._ws_streams = []   # 目前連線上已訂閱的 stream 名稱
+        self._ws_req_id = 0
+
+        # 加密貨幣報價（WebSocket 更新，直接由接收 buffer 擷取）
+        self._tickers = MiniTickerTable(())
+        self._crypto_names = []
+
+        # 加密貨幣走勢（每個交易對一個 ring buffer 與 sparkline）
+        self._history = PriceHistory(_HISTORY_SIZE, _HISTORY_INTERVAL)
+        self._charts = []
+        self._chart_seen = array("i")   # 各圖表已處理到的 appended 筆數
+        self._no_chart = Widget(visible=False)   # 股票列不顯示走勢
+
+        # 待刷新的行情列（bitmask）：資料到達只記錄，draw() 時才交給
+        # ListView 重新綁定，一幀最多刷新一次，頁面不可見時不做任何 widget 工作
+        self._dirty_rows = 0
+        self._minute = -1
+
+        # 股票報價（HTTPS 批次輪詢，槽位順序同 _stock_symbols）
+        self._stock_symbols = []
+        self._stock_names = []
+        self._stock_keys = []
+        self._stock_close = array("f")
+        self._stock_change = array("f")
+        self._stock_valid = 0   # 已收到報價的槽位 bitmask
+        # 成功後每 _STOCK_INTERVAL 秒更新，失敗（含沒有任何報價）時退避重試
+        self._stock_policy = RefreshPolicy(interval=_STOCK_INTERVAL)
         self._stock_fetching = False
 
+        # K 線圖（同時只開一張）：除最右一根外的 K 線快取成 Layer，
+        # 新增一根或縱軸範圍改變時才重繪
+        self._candles = None
+        self._candle_layer = None
+        self._candle_cacheable = True
+        self._candle_version = -1
+        self._candle_lo = 0
+        self._candle_hi = 0
+        self._candle_dirty = False
+
         # 標題列
         self._title_label = Label(
             x=10, y=10, text="Market",
@@ -220,28 +282,21 @@ class MarketPage(Page):
         self.add(self._title_label)
         self.add(self._time_label)
 
-        # 行情列（2 crypto + 4 stock = 6 列）
-        self._row_labels = []
-        start_y = 50
-        row_h = 28
-        for i in range(6):
-            y = start_y + i * row_h
-            sym_lbl = Label(
-                x=10, y=y, text="",
-                color=GRAY, scale=FONT_SMALL,
-            )
-            prc_lbl = Label(
-                x=85, y=y, text="",
-                color=WHITE, scale=FONT_SMALL,
-            )
-            chg_lbl = Label(
-                x=165, y=y, text="",
-                color=GRAY, scale=FONT_SMALL,
-            )
-            self.add(sym_lbl)
-            self.add(prc_lbl)
-            self.add(chg_lbl)
-            self._row_labels.append((sym_lbl, prc_lbl, chg_lbl))
+        # 行情列（加密貨幣在前、股票在後；超過 6 列時可捲動）
+        self._list = self.add(ListView(
+            x=0, y=46, w=240, h=6 * _ROW_H, row_h=_ROW_H,
+            row_count=self._row_count,
+            build_row=self._build_row,
+            bind_row=self._bind_row,
+            on_select=self._open_chart,
+        ))
+
+        # K 線圖下方的最新價與區間漲跌幅
+        self._chart_label = Label(
+            x=10, y=202, text="", color=GRAY, scale=FONT_SMALL,
+        )
+        self._chart_label.visible = False
+        self.add(self._chart_label)
 
         # 狀態列
         self._status_label = Label(
@@ -250,8 +305,9 @@ class MarketPage(Page):
         )
         self.add(self._status_label)
 
+        self._apply_watchlist()
+
     def on_enter(self):
-        self._update_time()
         # 啟動 WebSocket（僅建立一次，背景持續運行）
         if self._ws_task is None:
             self._ws_task = asyncio.create_task(self._ws_run())
@@ -259,23 +315,185 @@ class MarketPage(Page):
         if not self._stock_fetching:
             asyncio.create_task(self._fetch_stocks())
 
+    def on_exit(self):
+        # K 線圖不在背景保留（釋放快取並退訂 kline stream）
+        if self._candles is not None:
+            self._close_chart()
+            self._streams_changed()
+
+    def on_settings_changed(self, key):
+        if key == "watchlist":
+            self._apply_watchlist()
+
     def _update_time(self):
-        lt = time.localtime()
+        """跨分鐘時才重新格式化時間。"""
+        now = time.time()
+        minute = now // 60
+        if minute == self._minute:
+            return
+        self._minute = minute
+        lt = time.localtime(now)
         self._time_label.set_text(
             "{:02d}:{:02d}".format(lt[3], lt[4])
         )
 
+    # --- 監看清單 ---
+
+    def _apply_watchlist(self):
+        """讀取監看清單設定並套用（保留仍在清單中的報價）。"""
+        crypto = ConfigManager.get_setting("market_crypto")
+        stocks = ConfigManager.get_setting("market_stocks")
+
+        if crypto != self._tickers.symbols:
+            old = self._tickers.symbols
+            was_empty = not old
+            keep = [old.index(sym) if sym in old else -1 for sym in crypto]
+            self._history.set_slots(keep)
+            self._charts = [
+                self._charts[k] if k >= 0 else self._new_chart(i)
+                for i, k in enumerate(keep)
+            ]
+            self._chart_seen = array(
+                "i", [self._chart_seen[k] if k >= 0 else 0 for k in keep]
+            )
+            self._tickers.set_symbols(crypto)
+            self._crypto_names = [_crypto_name(sym) for sym in crypto]
+            if (self._candles is not None
+                    and self._candles.symbol not in crypto):
+                self._close_chart()
+            self._streams_changed()
+            if not self._ws_connected and was_empty:
+                self._ws_wake.set()
+
+        if stocks != self._stock_symbols:
+            n = len(stocks)
+            keys = [_stooq_key(sym) for sym in stocks]
+            close = array("f", [0] * n)
+            change = array("f", [0] * n)
+            valid = 0
+            for i, key in enumerate(keys):
+                if key in self._stock_keys:
+                    j = self._stock_keys.index(key)
+                    close[i] = self._stock_close[j]
+                    change[i] = self._stock_change[j]
+                    valid |= (self._stock_valid >> j & 1) << i
+            self._stock_symbols = list(stocks)
+            self._stock_names = [_stock_name(sym) for sym in stocks]
+            self._stock_keys = keys
+            self._stock_close = close
+            self._stock_change = change
+            self._stock_valid = valid
+            # 新代號立即抓取，不等下一次輪詢
+            self._stock_policy.reset()
+            if self._ws_task is not None and not self._stock_fetching:
+                asyncio.create_task(self._fetch_stocks())
+
+        # 列數與順序可能改變，全部重新綁定
+        self._dirty_rows = 0
+        self._list.scroll_to(0)
+        self._list.refresh()
+
+    def _wanted_streams(self):
+        """應訂閱的 stream：每個交易對的 miniTicker，加上開啟中的 K 線圖。"""
+        streams = [_WS_STREAM.format(sym.lower())
+                   for sym in self._tickers.symbols]
+        if self._candles is not None:
+            streams.append(_KLINE_STREAM.format(self._candles.symbol.lower()))
+        return streams
+
+    def _streams_changed(self):
+        """訂閱內容改變：更新重連路徑，已連線時在現有連線上改訂閱。"""
+        self._ws.path = _ws_path(self._wanted_streams())
+        if self._ws_connected:
+            asyncio.create_task(self._sync_streams())
+
+    async def _sync_streams(self):
+        """把目前連線上的訂閱同步為 _wanted_streams()（SUBSCRIBE / UNSUBSCRIBE）。"""
+        want = self._wanted_streams()
+        have = self._ws_streams
+        removed = [name for name in have if name not in want]
+        added = [name for name in want if name not in have]
+        # 先更新，避免同時執行的另一次同步重複送出
+        self._ws_streams = want
+        for method, streams in (("UNSUBSCRIBE", removed),
+                                ("SUBSCRIBE", added)):
+            if not streams:
+                continue
+            self._ws_req_id += 1
+            await self._ws.send(json.dumps({
+                "method": method,
+                "params": streams,
+                "id": self._ws_req_id,
+            }))
+
+    # --- 行情列 ---
+
+    def _new_chart(self, slot):
+        h = self._history
+        chart = Sparkline(
+            x=_CHART_X, y=(_ROW_H - _CHART_H) // 2 - 4,
+            w=_CHART_W, h=_CHART_H,
+            bucket=_HISTORY_SIZE // _CHART_W,
+        )
+        chart.set_series(h.series[slot], h.head[slot], h.count[slot])
+        return chart
+
+    def _sync_chart(self, slot):
+        """把新進的歷史樣本交給 sparkline（只重算尾端欄位）。"""
+        h = self._history
+        added = h.appended[slot] - self._chart_seen[slot]
+        self._chart_seen[slot] = h.appended[slot]
+        self._charts[slot].advance(h.head[slot], h.count[slot], added)
+
+    def _row_count(self):
+        return len(self._crypto_names) + len(self._stock_names)
+
+    def _build_row(self, list_view):
+        row = Container(w=list_view.w, h=list_view.row_h, padding=0)
+        row.add(Label(x=10, y=4, color=GRAY, scale=FONT_SMALL))
+        row.add(Label(x=106, y=4, color=WHITE, scale=FONT_SMALL))
+        row.add(Label(x=170, y=4, color=GRAY, scale=FONT_SMALL))
+        row.add(self._no_chart)   # 綁定時換成該交易對的 sparkline
+        return row
+
+    def _bind_row(self, row, index):
+        """格式化一列行情（只在該列可見時由 ListView 呼叫）。"""
+        n_crypto = len(self._crypto_names)
+        if index < n_crypto:
+            tickers = self._tickers
+            change = tickers.change(index)
+            self._set_row(row, self._crypto_names[index],
+                          tickers.close[index], change)
+            chart = self._charts[index]
+            chart.color = RED if change < 0 else GREEN
+            row.children[3] = chart
+        else:
+            row.children[3] = self._no_chart
+            j = index - n_crypto
+            if self._stock_valid & (1 << j):
+                self._set_row(row, self._stock_names[j],
+                              self._stock_close[j], self._stock_change[j])
+            else:
+                self._set_row(row, self._stock_names[j], 0.0, 0.0)
+
     # --- WebSocket ---
 
     async def _ws_run(self):
         """WebSocket 背景 task，自動重連。"""
         while True:
+            if not self._tickers.symbols:
+                # 清單為空時不建立連線
+                self._status_label.set_text("")
+                self._ws_wake.clear()
+                await self._ws_wake.wait()
+                continue
             try:
                 self._status_label.set_text("WS Connecting...")
                 self._status_label.color = GRAY
                 await self._ws_session()
             except Exception as e:
                 print("WS err:", e)
+            await self._ws.close()
             self._ws_connected = False
             self._status_label.set_text("WS Reconnecting...")
             self._status_label.color = RED
@@ -283,161 +501,263 @@ class MarketPage(Page):
             await asyncio.sleep(5)
 
     async def _ws_session(self):
-        """建立 WebSocket 連線並持續接收 frames。"""
-        ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        ssl_ctx.verify_mode = ssl.CERT_NONE
-        reader, writer = await asyncio.open_connection(
-            _WS_HOST, _WS_PORT, ssl=ssl_ctx
-        )
-
-        # WebSocket HTTP Upgrade 握手
-        key = ubinascii.b2a_base64(uos.urandom(16)).strip()
-        handshake = (
-            "GET {} HTTP/1.1\r\n"
-            "Host: {}:{}\r\n"
-            "Upgrade: websocket\r\n"
-            "Connection: Upgrade\r\n"
-            "Sec-WebSocket-Key: {}\r\n"
-            "Sec-WebSocket-Version: 13\r\n"
-            "\r\n"
-        ).format(_WS_PATH, _WS_HOST, _WS_PORT, key.decode())
-        writer.write(handshake.encode())
-        await writer.drain()
-
-        # 讀取握手回應 headers
-        while True:
-            line = await reader.readline()
-            if not line or line == b"\r\n":
-                break
+        """建立 WebSocket 連線並持續接收訊息。"""
+        ws = self._ws
+        streams = self._wanted_streams()
+        ws.path = _ws_path(streams)
+        await ws.connect()
 
         self._ws_connected = True
+        self._ws_streams = streams
+        # 連線期間清單或 K 線圖若已變更，補送訂閱
+        if streams != self._wanted_streams():
+            await self._sync_streams()
         self._status_label.set_text("Live")
         self._status_label.color = GREEN
 
-        last_ping = time.time()
+        # ticks_ms 為 small int；time.time() 每次呼叫都會配置
+        last_ping = time.ticks_ms()
 
         while True:
             # 定期發送 ping 保持連線
-            now = time.time()
-            if now - last_ping > _WS_PING_INTERVAL:
-                await _ws_send_frame(writer, 0x9, b"ping")
+            now = time.ticks_ms()
+            if time.ticks_diff(now, last_ping) > _WS_PING_INTERVAL * 1000:
+                await ws.ping(b"ping")
                 last_ping = now
 
-            frame = await _ws_recv_frame(reader)
-            if frame is None:
-                break
-
-            opcode, data = frame
-            if opcode == 0x8:    # Close
+            # Ping / Pong / Close 由 WebSocketClient 處理
+            msg = await ws.recv()
+            if msg is None:
                 break
-            elif opcode == 0xA:  # Pong（忽略）
-                pass
-            elif opcode == 0x9:  # Ping（回應 Pong）
-                await _ws_send_frame(writer, 0xA, data)
-            elif opcode == 0x1:  # Text frame
-                self._on_ws_message(data)
+            opcode, data = msg
+            if opcode == OP_TEXT:
+                self._on_ws_message(len(data))
+
+    def _on_ws_message(self, size):
+        """處理 Binance 推送（訊息位於 WebSocket buffer 前 size bytes）。"""
+        buf = self._ws.buffer
+        k = kline_start(buf, size)
+        if k >= 0:
+            # kline 推送只交給 K 線圖（退訂前仍在途中的訊息直接丟棄）
+            if self._candles is not None and self._candles.parse(buf, k, size):
+                self._candle_dirty = True
+            return
+        slot = self._tickers.parse(buf, size)
+        if slot >= 0:
+            self._history.add(slot, self._tickers.close[slot])
+            self._dirty_rows |= 1 << slot
 
-        writer.close()
+    # --- K 線圖 ---
 
-    def _on_ws_message(self, data):
-        """處理 Binance miniTicker 推送。"""
+    def _open_chart(self, index):
+        """點擊加密貨幣列：開啟該交易對的 K 線圖（股票列不處理）。"""
+        if index >= len(self._crypto_names):
+            return
+        series = CandleSeries(self._tickers.symbols[index], _CANDLES)
+        self._candles = series
+        self._candle_version = -1
+        self._candle_dirty = True
+        self._list.visible = False
+        self._title_label.set_text(self._crypto_names[index] + " 1m")
+        self._chart_label.visible = True
+        asyncio.create_task(self._fetch_candles(series))
+        self._streams_changed()
+
+    def _close_chart(self):
+        """回到行情列表並釋放 K 線資料與快取（訂閱由呼叫端同步）。"""
+        self._candles = None
+        self._candle_layer = None
+        self._chart_label.visible = False
+        self._list.visible = True
+        self._title_label.set_text("Market")
+
+    def handle_touch(self, tx, ty):
+        """K 線圖開啟時點擊任意處返回列表。"""
+        if self._candles is not None:
+            self._close_chart()
+            self._streams_changed()
+            return True
+        return super().handle_touch(tx, ty)
+
+    async def _fetch_candles(self, series):
+        """以 REST klines 回填 K 線（開啟圖表時一次），完成後才接受推送。"""
         try:
-            msg = json.loads(data)
-            # Combined stream 格式：{"stream":..., "data":{...}}
-            ticker = msg.get("data", msg)
-            sym = ticker.get("s", "")
-            close_p = float(ticker.get("c", 0))
-            open_p = float(ticker.get("o", 0))
-            if open_p > 0:
-                change = (close_p - open_p) / open_p * 100
-            else:
-                change = 0.0
-            self._crypto_data[sym] = (close_p, change)
-            self._update_display()
-        except Exception:
-            pass
+            reader, writer = await _https_open(
+                _KLINE_HOST, _KLINE_PATH.format(series.symbol, series.size),
+            )
+            try:
+                await parse_stream(reader, series.backfill)
+            finally:
+                writer.close()
+        except Exception as e:
+            print("Kline fetch err:", e)
+        finally:
+            series.ready = True
+            if series is self._candles:
+                self._candle_dirty = True
+            gc.collect()
+
+    def _update_chart_label(self):
+        """最新價與圖表區間（最舊一根開盤起）的漲跌幅。"""
+        s = self._candles
+        label = self._chart_label
+        if not s.count:
+            label.set_text("No data" if s.ready else "Loading...")
+            label.color = GRAY
+            return
+        first = s.open[s.index(0)]
+        close = s.close[s.last()]
+        change = (close - first) / first * 100 if first else 0.0
+        label.set_text("{}  {}{:.2f}%  {}m".format(
+            _format_price(s.price(close)),
+            "+" if change >= 0 else "", change, s.count,
+        ))
+        label.color = RED if change < 0 else GREEN
+
+    def _draw_candles(self, display, offset_x):
+        """繪製 K 線：快取層貼上既有 K 線，最右一根每幀重畫。"""
+        s = self._candles
+        if not s.count:
+            return
+        last = s.last()
+        # 縱軸範圍（上下各留 1/16）：新增一根或最新一根超出範圍時才重算
+        if (s.version != self._candle_version
+                or s.high[last] > self._candle_hi
+                or s.low[last] < self._candle_lo):
+            lo = s.low[last]
+            hi = s.high[last]
+            for k in range(s.count):
+                i = s.index(k)
+                if s.low[i] < lo:
+                    lo = s.low[i]
+                if s.high[i] > hi:
+                    hi = s.high[i]
+            pad = max((hi - lo) >> 4, 1)
+            self._candle_lo = lo - pad
+            self._candle_hi = hi + pad
+            self._candle_version = s.version
+
+        up = display.create_pen(*GREEN)
+        down = display.create_pen(*RED)
+        x0 = _CANDLE_X + offset_x
+        w = _CANDLES * _CANDLE_PITCH
+        key = (s.version, self._candle_lo, self._candle_hi, self.bg)
+        layer = self._candle_layer
+        if not (layer and layer.valid and layer.key == key
+                and layer.blit(display, x0, _CANDLE_TOP)):
+            for k in range(s.count - 1):
+                self._draw_candle(display, x0, k, s.index(k), up, down)
+            # 只在圖表區完整可見時擷取（同 WeatherPage）
+            if (self._candle_cacheable and offset_x == 0
+                    and contains(x0, _CANDLE_TOP, w, _CANDLE_H)):
+                if layer is None:
+                    layer = self._candle_layer = Layer(w, _CANDLE_H)
+                if layer.capture(display, x0, _CANDLE_TOP):
+                    layer.key = key
+                else:
+                    self._candle_cacheable = False
+                    self._candle_layer = None
+        self._draw_candle(display, x0, s.count - 1, last, up, down)
+
+    def _draw_candle(self, display, x0, k, i, up, down):
+        """第 k 根（陣列位置 i）：1 px 影線 + 3 px 實體。"""
+        s = self._candles
+        lo = self._candle_lo
+        span = self._candle_hi - lo
+        bottom = _CANDLE_TOP + _CANDLE_H - 1
+        o = s.open[i]
+        c = s.close[i]
+        x = x0 + k * _CANDLE_PITCH
+        y_hi = bottom - (s.high[i] - lo) * (_CANDLE_H - 1) // span
+        y_lo = bottom - (s.low[i] - lo) * (_CANDLE_H - 1) // span
+        y_top = bottom - (max(o, c) - lo) * (_CANDLE_H - 1) // span
+        y_bot = bottom - (min(o, c) - lo) * (_CANDLE_H - 1) // span
+        display.set_pen(up if c >= o else down)
+        display.rectangle(x + 1, y_hi, 1, y_lo - y_hi + 1)
+        display.rectangle(x, y_top, _CANDLE_PITCH - 1, y_bot - y_top + 1)
 
     # --- 股票輪詢 ---
 
     async def _fetch_stocks(self):
-        """HTTPS 輪詢 Stooq 股票資料。"""
-        now = time.time()
-        if (self._stock_fetching
-                or now - self._stock_last_fetch < _STOCK_INTERVAL):
+        """HTTPS 輪詢 Stooq 股票資料（所有代號一次請求）。"""
+        if (self._stock_fetching or not self._stock_symbols
+                or not self._stock_policy.due(time.time())):
             return
         self._stock_fetching = True
-        new_data = []
         try:
-            for name, sym in _STOCK_SYMBOLS:
-                result = await _fetch_stooq(name, sym)
-                if result:
-                    new_data.append(result)
-                await asyncio.sleep_ms(300)
-                gc.collect()
-            if new_data:
-                self._stock_data = new_data
-                self._stock_last_fetch = time.time()
-                self._update_display()
+            symbols = self._stock_symbols
+            updated = await _fetch_stooq(
+                symbols, self._stock_keys,
+                self._stock_close, self._stock_change,
+            )
+            if symbols is not self._stock_symbols:
+                return   # 抓取期間清單已變更，結果寫在舊的 array 上
+            if updated:
+                self._stock_valid |= updated
+                self._stock_policy.success(time.time())
+                # 股票列接在加密貨幣之後
+                self._dirty_rows |= updated << len(self._crypto_names)
+            else:
+                self._stock_policy.failure(time.time())
         except Exception as e:
             print("Stock fetch err:", e)
+            self._stock_policy.failure(time.time())
         finally:
             self._stock_fetching = False
             gc.collect()
 
     # --- 顯示更新 ---
 
-    def _update_display(self):
-        """合併加密貨幣與股票資料，更新所有行情 widgets。"""
-        rows = []
-        for sym, display in (
-            ("BTCUSDT", "BTC"),
-            ("ETHUSDT", "ETH"),
-        ):
-            if sym in self._crypto_data:
-                price, change = self._crypto_data[sym]
-                rows.append((display, price, change))
-            else:
-                rows.append((display, 0.0, 0.0))
-
-        for item in self._stock_data:
-            rows.append(item)
-
-        for i, (name, price, change) in enumerate(rows):
-            if i >= len(self._row_labels):
-                break
-            sym_lbl, prc_lbl, chg_lbl = self._row_labels[i]
-            sym_lbl.set_text(name[:6])
-
-            if price == 0.0:
-                prc_lbl.set_text("--")
-                chg_lbl.set_text("--")
-                chg_lbl.color = GRAY
+    def _flush_rows(self):
+        """把標記為 dirty 的行情列交給 ListView 重新綁定（只在 draw() 中呼叫）。"""
+        dirty = self._dirty_rows
+        if not dirty or not self._list.visible:
+            return   # K 線圖開啟時累積到返回列表再刷新
+        self._dirty_rows = 0
+        n_crypto = len(self._crypto_names)
+        i = 0
+        while dirty:
+            if dirty & 1:
+                if i < n_crypto:
+                    self._sync_chart(i)
+                self._list.refresh(i)
+            dirty >>= 1
+            i += 1
+
+    def _set_row(self, row, name, price, change):
+        """格式化一列行情。"""
+        sym_lbl, prc_lbl, chg_lbl = row.children[:3]
+        sym_lbl.set_text(name[:6])
+        if price == 0.0:
+            prc_lbl.set_text("--")
+            chg_lbl.set_text("--")
+            chg_lbl.color = GRAY
+        else:
+            prc_lbl.set_text(_format_price(price))
+            arrow = "+" if change >= 0 else ""
+            chg_lbl.set_text("{}{:.2f}%".format(arrow, change))
+            if change > 0:
+                chg_lbl.color = GREEN
+            elif change < 0:
+                chg_lbl.color = RED
             else:
-                if price >= 10000:
-                    prc_str = "{:.0f}".format(price)
-                elif price >= 100:
-                    prc_str = "{:.1f}".format(price)
-                else:
-                    prc_str = "{:.2f}".format(price)
-                prc_lbl.set_text(prc_str)
-                arrow = "+" if change >= 0 else ""
-                chg_lbl.set_text("{}{:.2f}%".format(arrow, change))
-                if change > 0:
-                    chg_lbl.color = GREEN
-                elif change < 0:
-                    chg_lbl.color = RED
-                else:
-                    chg_lbl.color = WHITE
+                chg_lbl.color = WHITE
 
     def update(self):
-        self._update_time()
-        now = time.time()
-        if (now - self._stock_last_fetch > _STOCK_INTERVAL
+        super().update()
+        if (self._stock_symbols
                 and not self._stock_fetching
-                and self._ws_task is not None):
+                and self._ws_task is not None
+                and self._stock_policy.due(time.time())):
             asyncio.create_task(self._fetch_stocks())
 
     def draw(self, display, vector, offset_x=0):
+        # 只有可見（或滑入中）時才會被繪製，資料刷新延到這裡
+        self._update_time()
+        self._flush_rows()
+        if self._candles is not None and self._candle_dirty:
+            self._candle_dirty = False
+            self._update_chart_label()
         self._draw_background(display)
 
         display.set_pen(display.create_pen(*DARK_GRAY))
@@ -449,3 +769,5 @@ class MarketPage(Page):
         self._status_label.x = (240 - sw) // 2
 
         self._draw_widgets(display, offset_x)
+        if self._candles is not None:
+            self._draw_candles(display, offset_x)
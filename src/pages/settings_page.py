@@ -6,6 +6,7 @@ from ui.widget import Label
 from ui.theme import (
     WHITE, GRAY, CYAN, FONT_SMALL, FONT_MEDIUM,
 )
+from ui.clip import is_visible
 from settings_server import SettingsServer
 from uQR import QRCode
 
@@ -91,10 +92,13 @@ class SettingsPage(Page):
         black_pen = display.create_pen(0, 0, 0)
         display.set_pen(black_pen)
         for r in range(qr_size):
+            py = start_y + r * pixel_size
+            # 整列落在可見視窗外（如 overlay 動畫中）就跳過
+            if not is_visible(start_x, py, total_px, pixel_size):
+                continue
             for c in range(qr_size):
                 if qr[r][c]:
                     px = start_x + c * pixel_size
-                    py = start_y + r * pixel_size
                     display.rectangle(
                         px, py, pixel_size, pixel_size
                     )
@@ -1,11 +1,19 @@
-"""Weather Page — 即時天氣 + 多日預報頁面。"""
+"""Weather Page — 即時天氣 + 多日預報 / 48 小時逐時圖表頁面。"""
 
 import time
-import json
 import uasyncio as asyncio
-from config_manager import ConfigManager
+from config_manager import ConfigManager, MAX_WEATHER_LOCATIONS
+from json_stream import parse_stream
+from flatbuf import read_messages, DECODE_ERRORS
+from logger import Logger
+from refresh_policy import RefreshPolicy
+from weather_data import (
+    WeatherRecord, dispatch, decode_fb, save_cache, load_cache,
+)
 from ui.page import Page
-from ui.widget import Label
+from ui.widget import Label, Sparkline
+from ui.layer import Layer
+from ui.clip import contains
 from ui.theme import (
     WHITE, GRAY, DARK_GRAY, PRIMARY, CYAN, YELLOW, RED,
     FONT_SMALL, FONT_MEDIUM, FONT_LARGE, FONT_XLARGE,
@@ -19,15 +27,36 @@ _API_PATH = (
     "&current=temperature_2m,relative_humidity_2m,"
     "weather_code,wind_speed_10m"
     "&daily=weather_code,temperature_2m_max,temperature_2m_min"
-    "&timezone=auto&forecast_days=4"
+    "&hourly=temperature_2m,precipitation_probability,weather_code"
+    "&timezone=auto&forecast_days=4&forecast_hours=48"
 )
+# 二進位回應：每個地點一則 size-prefixed FlatBuffers 訊息，免文字解析
+_FB_FORMAT = "&format=flatbuffers"
+# 多地點：座標以逗號串接，一次請求取得所有地點（回應為陣列），
+# 上限為 config_manager.MAX_WEATHER_LOCATIONS
 
 # 預設經緯度（台北）
 _DEFAULT_LAT = 25.033
 _DEFAULT_LON = 121.565
 
-# 刷新間隔（秒）
-_FETCH_INTERVAL = 600  # 10 分鐘
+# 逐時圖表區域（分隔線以下、狀態列以上），整塊快取成 Layer
+_CHART_TOP = 122
+_CHART_H = 100
+_CHART_X = 30          # 左側留給最高 / 最低溫標示
+_CHART_W = 200
+_TEMP_Y = 128          # 氣溫折線
+_TEMP_H = 48
+_PRECIP_Y = 182        # 降雨機率長條（底部對齊）
+_PRECIP_H = 22
+_HOUR_LABEL_Y = 210
+_HOUR_TICK = 12        # 每 12 小時標一次時刻
+
+# 刷新排程（秒）：Open-Meteo 每 15 分鐘更新即時資料，對齊其發布點，
+# 並多等一分鐘讓新資料上線；休眠或頁面遠離時由 RefreshPolicy 放寬
+_FETCH_INTERVAL = 900
+_FETCH_ALIGN = 900
+_FETCH_DELAY = 60
+_RECHECK = 60          # 背景迴圈重新評估排程（休眠、頁面距離）的間隔
 
 # WMO Weather Code 對應
 _WMO_ICONS = {
@@ -58,6 +87,9 @@ _WMO_ICONS = {
 }
 
 
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
 def _wmo_text(code):
     """WMO weather code 轉文字描述和顏色。"""
     entry = _WMO_ICONS.get(code)
@@ -66,8 +98,11 @@ def _wmo_text(code):
     return ("???", GRAY)
 
 
-async def _async_http_get(host, path, port=80):
-    """非阻塞 HTTP GET，回傳 response body bytes。"""
+async def _async_http_open(host, path, port=80):
+    """非阻塞 HTTP GET，跳過 headers 後回傳 (reader, writer)。
+
+    呼叫端自行串流讀取 body，讀完後需 writer.close()。
+    """
     reader, writer = await asyncio.open_connection(
         host, port
     )
@@ -85,25 +120,23 @@ async def _async_http_get(host, path, port=80):
         line = await reader.readline()
         if line == b"\r\n" or line == b"":
             break
-
-    # 非阻塞讀取 body
-    chunks = []
-    while True:
-        chunk = await reader.read(1024)
-        if not chunk:
-            break
-        chunks.append(chunk)
-
-    writer.close()
-    return b"".join(chunks)
+    return reader, writer
 
 
 class WeatherPage(Page):
     """天氣頁面：即時天氣 + 4 日預報。
 
+    天氣資料由背景迴圈依 RefreshPolicy 排程更新：第一次進入頁面時啟動，
+    之後不在此頁時也會執行，切回來時即為最新資料；頁面被取代時停止。
+
+    設定 weather_locations 時為多地點模式：所有地點以一次請求抓取，
+    點擊上半部切換地點。點擊下半部在 4 日預報與 48 小時逐時圖表
+    （氣溫折線 + 降雨機率）之間切換；圖表擷取成 Layer，只在新資料到達、
+    切換地點或主題改變時重繪。
+
     Args:
         app: App 實例。
-        lat: 緯度。
+        lat: 緯度（未設定任何地點時使用）。
         lon: 經度。
     """
 
@@ -111,10 +144,21 @@ class WeatherPage(Page):
         super().__init__(app)
         self._lat = lat
         self._lon = lon
-        self._data = None
-        self._last_fetch = 0
+        self._locations = []   # [(name, lat, lon)]
+        self._records = []     # 與 _locations 對應的 WeatherRecord 或 None
+        self._loc_index = 0
+        self._policy = RefreshPolicy(
+            interval=_FETCH_INTERVAL, align=_FETCH_ALIGN, delay=_FETCH_DELAY,
+        )
+        self._wake = asyncio.Event()
+        self._refresh_task = None   # 第一次進入頁面時啟動，移除頁面時取消
         self._fetching = False
         self._error = None
+        self._log = Logger("Weather")
+        self._use_fb = True    # FlatBuffers 失敗後改用 JSON（本次開機內）
+        self._hourly = False
+        self._chart_layer = None
+        self._chart_cacheable = True
 
         # --- 地點名稱（最頂部）---
         self._location_label = Label(
@@ -178,6 +222,12 @@ class WeatherPage(Page):
                 (day_lbl, icon_lbl, temp_lbl)
             )
 
+        # --- 逐時圖表（不加入 widgets，由 _draw_hourly 繪製並快取）---
+        self._temp_chart = Sparkline(
+            x=_CHART_X, y=_TEMP_Y, w=_CHART_W, h=_TEMP_H,
+            color=YELLOW, vector=app.vector, transform=app._transform,
+        )
+
         # 狀態列
         self._status_label = Label(
             x=0, y=225, text="Loading...",
@@ -185,93 +235,249 @@ class WeatherPage(Page):
         )
         self.add(self._status_label)
 
-    def on_enter(self):
-        new_lat = ConfigManager.get_setting(
-            "weather_lat", self._lat
+        # 先顯示 Flash 中上次的結果，背景再重新驗證
+        self._set_locations(self._read_locations())
+        self._load_cache()
+
+    @property
+    def _data(self):
+        """目前顯示地點的 WeatherRecord，尚無資料時為 None。"""
+        if self._loc_index < len(self._records):
+            return self._records[self._loc_index]
+        return None
+
+    def _read_locations(self):
+        """讀取地點設定 → [(name, lat, lon)]。
+
+        weather_locations 為 [[name, lat, lon], ...]；未設定時退回
+        weather_lat / weather_lon / weather_location 單一地點。
+        """
+        result = []
+        for item in ConfigManager.get_setting("weather_locations", []):
+            try:
+                result.append((str(item[0]), float(item[1]),
+                               float(item[2])))
+            except (ValueError, TypeError, IndexError):
+                continue
+            if len(result) >= MAX_WEATHER_LOCATIONS:
+                break
+        if not result:
+            result.append((
+                ConfigManager.get_setting("weather_location", ""),
+                ConfigManager.get_setting("weather_lat", self._lat),
+                ConfigManager.get_setting("weather_lon", self._lon),
+            ))
+        return result
+
+    def _set_locations(self, locations):
+        """套用地點清單；座標改變時保留相同座標的紀錄並強制重新抓取。
+
+        Returns:
+            座標是否改變。
+        """
+        changed = len(locations) != len(self._locations) or any(
+            a[1:] != b[1:] for a, b in zip(locations, self._locations)
         )
-        new_lon = ConfigManager.get_setting(
-            "weather_lon", self._lon
+        if changed:
+            old = self._records
+            self._records = [
+                _find_record(old, lat, lon) for _, lat, lon in locations
+            ]
+            self._loc_index = min(self._loc_index, len(locations) - 1)
+            self._policy.reset()  # 強制重新抓取
+            self._wake.set()
+            self._locations = locations
+        else:
+            # 座標相同（名稱可能改了）：沿用同一個 list，
+            # 進行中的抓取仍視為有效（_fetch_weather 以 identity 判斷）
+            self._locations[:] = locations
+        self._update_location_label()
+        return changed
+
+    def _update_location_label(self):
+        """地點名稱；多地點時附上目前序號。"""
+        name = self._locations[self._loc_index][0]
+        if len(self._locations) > 1:
+            name = "{} ({}/{})".format(
+                name, self._loc_index + 1, len(self._locations)
+            )
+        self._location_label.set_text(name)
+
+    def _load_cache(self):
+        """載入 Flash 快取（座標相同者），狀態列顯示資料時間。"""
+        cached, fetched_at = load_cache()
+        if not cached:
+            return
+        self._records = [
+            _find_record(cached, lat, lon) for _, lat, lon in self._locations
+        ]
+        if self._data is None:
+            return
+        # 每個地點都有快取才算新鮮，否則立即重新抓取
+        if all(self._records):
+            self._policy.success(fetched_at)
+        self._status_label.set_text("as of " + self._hhmm(fetched_at))
+
+    def _hhmm(self, epoch):
+        """epoch 秒 → 本地 'HH:MM'。"""
+        tz = ConfigManager.get_setting("timezone", 8)
+        t = time.localtime(int(epoch + tz * 3600))
+        return "{:02d}:{:02d}".format(t[3], t[4])
+
+    def _is_due(self):
+        """依螢幕狀態與頁面距離判斷是否該更新。"""
+        app = self.app
+        return self._policy.due(
+            time.time(), not app.asleep, app.page_distance(self)
         )
-        if new_lat != self._lat or new_lon != self._lon:
-            self._lat = new_lat
-            self._lon = new_lon
-            self._last_fetch = 0  # 強制重新抓取
-        loc = ConfigManager.get_setting("weather_location", "")
-        self._location_label.set_text(loc)
+
+    async def _refresh_loop(self):
+        """背景更新迴圈：到期才抓取，失敗由 RefreshPolicy 退避。
+
+        休眠狀態與頁面距離會變，因此每 _RECHECK 秒重新評估一次；
+        進入頁面或地點變更時以 _wake 立即喚醒。
+        """
+        while True:
+            if self._is_due():
+                await self._fetch_weather()
+            try:
+                await asyncio.wait_for(self._wake.wait(), _RECHECK)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def on_enter(self):
+        # 背景更新迴圈只建立一次，離開頁面後仍持續運行
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        self._set_locations(self._read_locations())
         if self._data:
             self._update_display()
-        asyncio.create_task(self._fetch_weather())
-
-    def on_exit(self):
-        self._fetching = False
+        self._wake.set()
+
+    def on_remove(self):
+        """頁面被取代：停止背景更新並釋放圖表快取。"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        self._chart_layer = None
+
+    def on_settings_changed(self, key):
+        """Web 設定修改地點後立即套用（顯示中的頁面不必離開再進入）。"""
+        if key == "weather_locations":
+            self._set_locations(self._read_locations())
+            if self._data:
+                self._update_display()
 
     def on_resume(self):
         """Settings overlay 關閉後重新讀取位置設定。"""
-        new_lat = ConfigManager.get_setting(
-            "weather_lat", self._lat
-        )
-        new_lon = ConfigManager.get_setting(
-            "weather_lon", self._lon
-        )
-        if new_lat != self._lat or new_lon != self._lon:
-            self._lat = new_lat
-            self._lon = new_lon
-            self._last_fetch = 0
-            asyncio.create_task(self._fetch_weather())
-        loc = ConfigManager.get_setting("weather_location", "")
-        self._location_label.set_text(loc)
+        self._set_locations(self._read_locations())
         if self._data:
             self._update_display()
 
+    def handle_touch(self, tx, ty):
+        """下半部切換預報 / 逐時模式；多地點時上半部切換地點。"""
+        if ty > self._divider_y:
+            self._hourly = not self._hourly
+            for labels in self._forecast_labels:
+                for lbl in labels:
+                    lbl.visible = not self._hourly
+            return True
+        if len(self._locations) < 2:
+            return False
+        self._loc_index = (self._loc_index + 1) % len(self._locations)
+        self._update_location_label()
+        self._update_display()
+        return True
+
     async def _fetch_weather(self):
         """非阻塞取得天氣資料。"""
         if self._fetching:
             return
-        # 有快取且未過期，不重新抓取
-        if (self._data
-                and time.time() - self._last_fetch < _FETCH_INTERVAL):
-            return
         self._fetching = True
-        self._status_label.set_text("Updating...")
-        self._status_label.color = GRAY
+        if not self._data:
+            # 有舊資料時保留 "as of" 狀態，背景更新
+            self._status_label.set_text("Updating...")
+            self._status_label.color = GRAY
 
         try:
+            locations = self._locations
             path = _API_PATH.format(
-                lat=self._lat, lon=self._lon
+                lat=",".join("{:.4f}".format(loc[1]) for loc in locations),
+                lon=",".join("{:.4f}".format(loc[2]) for loc in locations),
             )
-            body = await _async_http_get(_API_HOST, path)
-            self._data = json.loads(body)
-            self._last_fetch = time.time()
+            records = None
+            if self._use_fb:
+                try:
+                    records = await self._request(locations, path, True)
+                except DECODE_ERRORS as e:
+                    # 只有回應無法解碼才改用 JSON；網路錯誤交給下方的
+                    # RefreshPolicy 退避，下次仍先試 FlatBuffers
+                    self._log.warning(f"FlatBuffers failed, using JSON: {e}")
+                    self._use_fb = False
+            if records is None:
+                records = await self._request(locations, path, False)
+            if locations is not self._locations:
+                return  # 抓取期間地點設定已變更，丟棄結果
+            self._records = records
+            now = time.time()
+            self._policy.success(now)
             self._error = None
+            save_cache(records, now)
+            self._status_label.set_text("Updated " + self._hhmm(now))
             self._update_display()
-            self._status_label.set_text(
-                "Updated {:02d}:{:02d}".format(
-                    time.localtime()[3],
-                    time.localtime()[4],
-                )
-            )
             self._status_label.color = DARK_GRAY
         except Exception as e:
             self._error = str(e)
+            wait = self._policy.failure(time.time())
+            self._log.warning(f"Fetch failed, retry in {wait}s: {e}")
             self._status_label.set_text("Err:" + self._error[:22])
             self._status_label.color = RED
         finally:
             self._fetching = False
 
+    async def _request(self, locations, path, binary):
+        """送出請求並解析成各地點的 WeatherRecord。
+
+        binary 為 True 時要求 FlatBuffers 並就地讀取欄位；否則串流解析
+        JSON。兩者都只保留需要的欄位，不組合整個 body。
+        """
+        records = [WeatherRecord(lat, lon) for _, lat, lon in locations]
+        if binary:
+            path += _FB_FORMAT
+        reader, writer = await _async_http_open(_API_HOST, path)
+        try:
+            if binary:
+                def on_message(buf, i):
+                    if i < len(records):
+                        decode_fb(buf, records[i])
+                await read_messages(reader, on_message)
+            else:
+                await parse_stream(reader, dispatch(records))
+        finally:
+            writer.close()
+        for record in records:
+            if not record.complete():
+                raise ValueError("incomplete data")
+        return records
+
     def _update_display(self):
         """根據 API 資料更新所有 widgets。"""
-        if not self._data:
+        data = self._data
+        if not data:
+            if self._records and any(self._records):
+                # 多地點中此地點尚無資料，清掉上一個地點的內容
+                self._clear_display()
             return
 
         d = self.app.display
         w = self.app.width
 
         # --- 即時天氣 ---
-        cur = self._data.get("current", {})
-        temp = cur.get("temperature_2m", 0)
-        humidity = cur.get("relative_humidity_2m", 0)
-        wind = cur.get("wind_speed_10m", 0)
-        wcode = cur.get("weather_code", -1)
+        temp = data.temp
+        humidity = data.humidity
+        wind = data.wind
+        wcode = data.code
 
         wtxt, wcolor = _wmo_text(wcode)
         self._weather_label.set_text(wtxt)
@@ -298,37 +504,33 @@ class WeatherPage(Page):
         self._wind_label.x = w // 2 + (w // 2 - wind_w) // 2
 
         # --- 4 日預報 ---
-        daily = self._data.get("daily", {})
-        dates = daily.get("time", [])
-        wcodes = daily.get("weather_code", [])
-        t_maxs = daily.get("temperature_2m_max", [])
-        t_mins = daily.get("temperature_2m_min", [])
-
         col_w = 60
-        for i in range(min(4, len(dates))):
+        for i in range(min(4, data.days)):
             day_lbl, icon_lbl, temp_lbl = self._forecast_labels[i]
 
-            date_str = dates[i]
-            day_name = self._date_to_weekday(date_str)
+            day_name = _WEEKDAYS[data.weekday[i]]
             if i == 0:
                 day_name = "Today"
             day_lbl.set_text(day_name)
             day_w = d.measure_text(day_name, FONT_SMALL)
             day_lbl.x = i * col_w + (col_w - day_w) // 2
 
-            ftxt, fcolor = _wmo_text(wcodes[i])
+            ftxt, fcolor = _wmo_text(data.day_code[i])
             icon_lbl.set_text(ftxt)
             icon_lbl.color = fcolor
             ftxt_w = d.measure_text(ftxt, FONT_SMALL)
             icon_lbl.x = i * col_w + (col_w - ftxt_w) // 2
 
             tstr = "{:.0f}/{:.0f}".format(
-                t_maxs[i], t_mins[i]
+                data.day_max[i], data.day_min[i]
             )
             temp_lbl.set_text(tstr)
             tstr_w = d.measure_text(tstr, FONT_SMALL)
             temp_lbl.x = i * col_w + (col_w - tstr_w) // 2
 
+        # --- 逐時圖表：序列直接引用紀錄中的 array，不複製 ---
+        self._temp_chart.set_series(data.hour_temp, 0, data.hours)
+
         loc_text = self._location_label.text
         if loc_text:
             lw = d.measure_text(loc_text, FONT_SMALL)
@@ -338,26 +540,16 @@ class WeatherPage(Page):
         sw = d.measure_text(status_text, FONT_SMALL)
         self._status_label.x = (w - sw) // 2
 
-    def _date_to_weekday(self, date_str):
-        """將 'YYYY-MM-DD' 轉為星期名稱。"""
-        try:
-            parts = date_str.split("-")
-            y, m, d = int(parts[0]), int(parts[1]), int(parts[2])
-            t = time.mktime(
-                (y, m, d, 0, 0, 0, 0, 0)
-            )
-            wday = time.localtime(t)[6]
-            days = ("Mon", "Tue", "Wed", "Thu",
-                    "Fri", "Sat", "Sun")
-            return days[wday]
-        except Exception:
-            return date_str[-5:]
-
-    def update(self):
-        now = time.time()
-        if (now - self._last_fetch > _FETCH_INTERVAL
-                and not self._fetching):
-            asyncio.create_task(self._fetch_weather())
+    def _clear_display(self):
+        """重設為尚無資料的預設文字。"""
+        self._weather_label.set_text("---")
+        self._temp_label.set_text("--.-")
+        self._humidity_label.set_text("Hum: --%")
+        self._wind_label.set_text("Wind: -- km/h")
+        for day_lbl, icon_lbl, temp_lbl in self._forecast_labels:
+            day_lbl.set_text("---")
+            icon_lbl.set_text("---")
+            temp_lbl.set_text("--/--")
 
     def draw(self, display, vector, offset_x=0):
         self._draw_background(display)
@@ -369,3 +561,92 @@ class WeatherPage(Page):
         )
 
         self._draw_widgets(display, offset_x)
+        if self._hourly:
+            self._draw_hourly(display, offset_x)
+
+    def _draw_hourly(self, display, offset_x):
+        """繪製逐時圖表；快取鍵為（紀錄, 背景色），新資料即是新紀錄。"""
+        data = self._data
+        w = self.app.width
+        key = (data, self.bg)
+        layer = self._chart_layer
+        if layer and layer.valid and layer.key == key:
+            if layer.blit(display, offset_x, _CHART_TOP):
+                return
+
+        if data and data.hours:
+            self._draw_chart(display, offset_x, data)
+        else:
+            display.set_pen(display.create_pen(*DARK_GRAY))
+            display.text("No hourly data", 70 + offset_x, 166, w, FONT_SMALL)
+
+        # 只在圖表區完整可見時擷取（同 CalendarPage）
+        if (self._chart_cacheable and offset_x == 0
+                and contains(0, _CHART_TOP, w, _CHART_H)):
+            if layer is None:
+                layer = self._chart_layer = Layer(w, _CHART_H)
+            if layer.capture(display, 0, _CHART_TOP):
+                layer.key = key
+            else:
+                self._chart_cacheable = False
+                self._chart_layer = None
+
+    def _draw_chart(self, display, offset_x, data):
+        """氣溫折線、天氣狀態色帶、降雨機率長條與時刻標示。"""
+        n = data.hours
+        temps = data.hour_temp
+        lo = hi = temps[0]
+        for i in range(1, n):
+            v = temps[i]
+            if v < lo:
+                lo = v
+            elif v > hi:
+                hi = v
+
+        display.set_pen(display.create_pen(*GRAY))
+        display.text("{:.0f}".format(hi), 4 + offset_x, _TEMP_Y,
+                     _CHART_X, FONT_SMALL)
+        display.text("{:.0f}".format(lo), 4 + offset_x,
+                     _TEMP_Y + _TEMP_H - 8, _CHART_X, FONT_SMALL)
+        display.text("%", 4 + offset_x, _PRECIP_Y + _PRECIP_H - 8,
+                     _CHART_X, FONT_SMALL)
+
+        self._temp_chart.draw(display, offset_x)
+
+        # 天氣狀態色帶：每小時一格，顏色沿用 WMO 對照
+        codes = data.hour_code
+        bar_w = max(_CHART_W // n - 1, 1)
+        prev = None
+        for i in range(n):
+            color = _wmo_text(codes[i])[1]
+            if color != prev:
+                display.set_pen(display.create_pen(*color))
+                prev = color
+            display.rectangle(_CHART_X + i * _CHART_W // n + offset_x,
+                              _PRECIP_Y - 4, bar_w, 2)
+
+        # 降雨機率：每小時一根長條，高度與機率成正比
+        display.set_pen(display.create_pen(*PRIMARY))
+        precip = data.hour_precip
+        bottom = _PRECIP_Y + _PRECIP_H
+        for i in range(n):
+            bh = precip[i] * _PRECIP_H // 100
+            if bh > 0:
+                display.rectangle(_CHART_X + i * _CHART_W // n + offset_x,
+                                  bottom - bh, bar_w, bh)
+
+        display.set_pen(display.create_pen(*DARK_GRAY))
+        display.rectangle(_CHART_X + offset_x, bottom, _CHART_W, 1)
+        for i in range(0, n, _HOUR_TICK):
+            x = _CHART_X + i * _CHART_W // n + offset_x
+            display.rectangle(x, bottom + 1, 1, 3)
+            display.text("{:02d}".format((data.hour_start + i) % 24),
+                         x, _HOUR_LABEL_Y, 30, FONT_SMALL)
+
+
+def _find_record(records, lat, lon):
+    """在紀錄清單中找出座標相同者，找不到回傳 None。"""
+    for r in records:
+        if r is not None and r.same_place(lat, lon):
+            return r
+    return None
@@ -0,0 +1,126 @@
+"""
+Price history — 每個交易對固定大小的價格歷史（ring buffer）。
+
+WebSocket 每秒推送一次報價，這裡以時間桶降取樣：同一個桶（預設 1 分鐘）
+內的報價只覆寫最新一筆（即該分鐘的收盤價），跨桶才前進一格；斷線期間
+漏掉的桶以前一個價格補齊，時間軸保持等距。每個交易對一個 array('f')，
+大小在加入清單時就固定（預設 1440 筆 = 24 小時，約 5.6 KB），
+之後收到報價只寫入既有陣列，不再配置。
+"""
+import time
+from array import array
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+class PriceHistory:
+    """多個槽位的價格歷史。
+
+    槽位 i 的第 k 筆（k = 0 為最舊）在
+    ``series[i][(head[i] + k) % size]``，可直接交給 Sparkline.set_series()。
+
+    Args:
+        size: 每個槽位保留的樣本數。
+        interval: 時間桶長度（秒）。
+
+    Attributes:
+        series: 每個槽位一個 array('f', size)。
+        head / count: 各槽位最舊一筆的索引與有效筆數（array 'i'）。
+        appended: 各槽位累計新增的樣本數（覆寫不計），供圖表判斷要前進幾格。
+    """
+
+    def __init__(self, size=1440, interval=60):
+        self.size = size
+        self.interval = interval
+        self.series = []
+        self.head = array("i")
+        self.count = array("i")
+        self.appended = array("i")
+        self._bucket = array("i")   # 各槽位最新一筆所在的時間桶
+        # 目前時間桶：以 ticks_ms 推算，每個桶只讀一次 time.time()
+        # （epoch 秒超出 small int 範圍，每次讀取都會配置）
+        self._now_bucket = 0
+        self._bucket_ms = 0
+        self._bucket_start = ticks_ms()
+
+    def set_slots(self, keep):
+        """槽位清單變更（監看清單變更）。
+
+        Args:
+            keep: 新槽位 → 舊槽位索引，-1 表示新加入（配置新的陣列）。
+        """
+        series = []
+        head = array("i")
+        count = array("i")
+        appended = array("i")
+        bucket = array("i")
+        for old in keep:
+            if old >= 0:
+                series.append(self.series[old])
+                head.append(self.head[old])
+                count.append(self.count[old])
+                appended.append(self.appended[old])
+                bucket.append(self._bucket[old])
+            else:
+                series.append(array("f", bytes(4 * self.size)))
+                head.append(0)
+                count.append(0)
+                appended.append(0)
+                bucket.append(0)
+        self.series = series
+        self.head = head
+        self.count = count
+        self.appended = appended
+        self._bucket = bucket
+
+    def bucket(self):
+        """目前的時間桶編號（epoch 秒 // interval）。"""
+        if (not self._bucket_ms
+                or ticks_diff(ticks_ms(), self._bucket_start)
+                >= self._bucket_ms):
+            now = int(time.time())
+            self._now_bucket = now // self.interval
+            # 下一次讀 time.time() 的時間點：本桶結束時
+            self._bucket_ms = (self.interval - now % self.interval) * 1000
+            self._bucket_start = ticks_ms()
+        return self._now_bucket
+
+    def add(self, slot, price):
+        """記錄一筆報價。
+
+        Returns:
+            新增的樣本數（0 表示只覆寫了最新一筆）。
+        """
+        b = self.bucket()
+        series = self.series[slot]
+        size = self.size
+        n = self.count[slot]
+        gap = b - self._bucket[slot] if n else 1
+        if gap <= 0:
+            # 同一個桶（或時鐘往回校正）：覆寫最新一筆
+            series[(self.head[slot] + n - 1) % size] = price
+            return 0
+        gap = min(gap, size)
+        prev = series[(self.head[slot] + n - 1) % size] if n else price
+        head = self.head[slot]
+        for i in range(gap):
+            value = price if i == gap - 1 else prev
+            if n < size:
+                series[(head + n) % size] = value
+                n += 1
+            else:
+                series[head] = value
+                head = (head + 1) % size
+        self.head[slot] = head
+        self.count[slot] = n
+        self.appended[slot] += gap
+        self._bucket[slot] = b
+        return gap
+
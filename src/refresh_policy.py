@@ -0,0 +1,103 @@
+"""
+Refresh policy — 背景資料更新的排程：對齊上游更新週期、失敗退避、依情境放寬。
+
+成功後的下次更新時間會對齊到上游的發布週期（例如 Open-Meteo 每 15 分鐘
+更新一次即時資料），避免在兩次發布之間抓到相同內容；失敗時以帶抖動的
+指數退避重試，多個裝置或多個來源不會同時重試；螢幕休眠或頁面離可見
+範圍較遠時放寬間隔，省下網路與 CPU。
+"""
+import random
+
+# 放寬倍率
+_ASLEEP_FACTOR = 4      # 螢幕休眠（背光關閉）
+_FAR_DISTANCE = 2       # 與目前頁面相距幾頁起開始放寬（相鄰頁面維持原間隔）
+
+
+class RefreshPolicy:
+    """單一資料來源的更新排程。
+
+    Args:
+        interval: 正常更新間隔（秒）。
+        align: 上游發布週期（秒），下次更新對齊到其整數倍；0 = 不對齊。
+        delay: 對齊點之後再等待的秒數，讓上游完成發布。
+        retry: 第一次失敗後的重試間隔（秒），之後倍增。
+        max_retry: 退避上限（秒）。
+        max_interval: 放寬後的間隔上限（秒）。
+
+    Attributes:
+        last_success: 上次成功更新的 epoch 秒，0 = 尚未成功。
+        failures: 連續失敗次數。
+    """
+
+    def __init__(self, interval=900, align=0, delay=0, retry=30,
+                 max_retry=1800, max_interval=3 * 3600):
+        self.interval = interval
+        self.align = align
+        self.delay = delay
+        self.retry = retry
+        self.max_retry = max_retry
+        self.max_interval = max_interval
+        self.last_success = 0
+        self.failures = 0
+        self._retry_at = 0
+
+    def success(self, now):
+        """記錄一次成功更新（也用於載入快取時的資料時間）。"""
+        self.last_success = now
+        self.failures = 0
+        self._retry_at = 0
+
+    def failure(self, now):
+        """記錄一次失敗，排定帶抖動的退避重試。
+
+        Returns:
+            到下次重試的秒數。
+        """
+        self.failures += 1
+        backoff = min(self.retry << min(self.failures - 1, 10),
+                      self.max_retry)
+        # equal jitter：一半固定、一半隨機
+        wait = backoff // 2 + random.getrandbits(16) * (backoff // 2) // 65536
+        self._retry_at = now + wait
+        return wait
+
+    def reset(self):
+        """清除狀態，下次檢查即更新（如設定變更）。"""
+        self.last_success = 0
+        self.failures = 0
+        self._retry_at = 0
+
+    def next_due(self, awake=True, distance=0):
+        """下次應更新的 epoch 秒。
+
+        Args:
+            awake: 螢幕是否開啟。
+            distance: 與目前頁面的距離（頁數，0 = 正在顯示）。
+        """
+        if self._retry_at:
+            return self._retry_at
+        if not self.last_success:
+            return 0
+        interval = self.interval
+        if not awake:
+            interval *= _ASLEEP_FACTOR
+        if distance >= _FAR_DISTANCE:
+            interval <<= min(distance - _FAR_DISTANCE + 1, 4)
+        due = self.last_success + min(interval, self.max_interval)
+        align = self.align
+        if align:
+            # 往後對齊到下一個發布點
+            due = ((due - self.delay + align - 1) // align * align
+                   + self.delay)
+        return due
+
+    def due(self, now, awake=True, distance=0):
+        """現在是否該更新。
+
+        排定時間離現在超過所有可能的間隔時（時鐘被往回校正）也視為到期，
+        避免 RTC 校正後長時間不更新。
+        """
+        due = self.next_due(awake, distance)
+        if now >= due:
+            return True
+        return due - now > max(self.max_interval, self.max_retry) + self.align
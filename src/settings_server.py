@@ -6,7 +6,7 @@ import json
 import machine
 import uasyncio as asyncio
 from web_server import WebServer
-from config_manager import ConfigManager
+from config_manager import ConfigManager, MAX_WEATHER_LOCATIONS
 from logger import Logger
 
 
@@ -53,6 +53,27 @@ class SettingsServer:
             "/api/pages", self._handle_set_pages,
             method="POST"
         )
+        self._web.add_route(
+            "/api/weather-locations", self._handle_get_locations
+        )
+        self._web.add_route(
+            "/api/weather-locations", self._handle_set_locations,
+            method="POST"
+        )
+        self._web.add_route(
+            "/api/watchlist", self._handle_get_watchlist
+        )
+        self._web.add_route(
+            "/api/watchlist", self._handle_set_watchlist,
+            method="POST"
+        )
+        self._web.add_route(
+            "/api/drawstats", self._handle_get_drawstats
+        )
+        self._web.add_route(
+            "/api/drawstats", self._handle_set_drawstats,
+            method="POST"
+        )
 
     def _read_template(self):
         """讀取設定頁面 HTML。"""
@@ -131,7 +152,7 @@ class SettingsServer:
 
         ConfigManager.set_setting("backlight", value)
         if self._app and hasattr(self._app, 'presto'):
-            self._app.presto.set_backlight(value)
+            self._app.set_backlight(value)
         self._log.info(f"Backlight set to {value}")
         return self._json_response(
             {"backlight": value}
@@ -172,6 +193,137 @@ class SettingsServer:
         self._log.info(f"Pages updated: {pages}")
         return self._json_response({"ok": True, "pages": pages})
 
+    async def _handle_get_locations(self, request):
+        """GET /api/weather-locations — 回傳多地點天氣清單。"""
+        return self._json_response({
+            "locations": ConfigManager.get_setting(
+                "weather_locations", []
+            ),
+            "max": MAX_WEATHER_LOCATIONS,
+        })
+
+    async def _handle_set_locations(self, request):
+        """POST /api/weather-locations — 驗證並儲存地點清單。
+
+        locations 格式：``name|lat|lon;name|lat|lon``，空字串表示
+        停用多地點模式（改用 weather_lat / weather_lon）。
+        """
+        params = request.get("params", {})
+        raw = params.get("locations", "")
+        locations = []
+        for entry in raw.split(";"):
+            parts = entry.split("|")
+            if len(parts) != 3:
+                continue
+            try:
+                lat = float(parts[1])
+                lon = float(parts[2])
+            except ValueError:
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                continue
+            locations.append([parts[0].strip(), lat, lon])
+        if raw.strip() and not locations:
+            return self._json_response(
+                {"error": "Invalid locations"}, 400
+            )
+        locations = locations[:MAX_WEATHER_LOCATIONS]
+        ConfigManager.set_setting("weather_locations", locations)
+        if self._app and hasattr(self._app, 'notify_settings'):
+            self._app.notify_settings("weather_locations")
+        self._log.info(f"Weather locations: {len(locations)}")
+        return self._json_response({"ok": True, "locations": locations})
+
+    _MAX_WATCHLIST = 8
+    _CRYPTO_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    _STOCK_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789.^-_"
+
+    @staticmethod
+    def _parse_symbols(raw, chars, upper):
+        """逗號分隔的代號 → 去重後的清單；含非法字元時回傳 None。"""
+        symbols = []
+        for sym in raw.split(","):
+            sym = sym.strip()
+            sym = sym.upper() if upper else sym.lower()
+            if not sym:
+                continue
+            if len(sym) > 16 or any(c not in chars for c in sym):
+                return None
+            if sym not in symbols:
+                symbols.append(sym)
+        return symbols
+
+    async def _handle_get_watchlist(self, request):
+        """GET /api/watchlist — 回傳行情頁監看清單。"""
+        return self._json_response({
+            "crypto": ConfigManager.get_setting("market_crypto"),
+            "stocks": ConfigManager.get_setting("market_stocks"),
+            "max": self._MAX_WATCHLIST,
+        })
+
+    async def _handle_set_watchlist(self, request):
+        """POST /api/watchlist — 驗證並儲存監看清單，立即套用到行情頁。
+
+        crypto 為 Binance 交易對（如 ``BTCUSDT,ETHUSDT``），
+        stocks 為 Stooq 代號（如 ``spy,^twii,2330.tw``）；
+        未提供的參數保持不變，空字串表示清空。
+        """
+        params = request.get("params", {})
+        if "crypto" not in params and "stocks" not in params:
+            return self._json_response(
+                {"error": "No parameters"}, 400
+            )
+        settings = ConfigManager.load_settings()
+        for key, param, chars, upper in (
+            ("market_crypto", "crypto", self._CRYPTO_CHARS, True),
+            ("market_stocks", "stocks", self._STOCK_CHARS, False),
+        ):
+            if param not in params:
+                continue
+            symbols = self._parse_symbols(params[param], chars, upper)
+            if symbols is None:
+                return self._json_response(
+                    {"error": "Invalid " + param}, 400
+                )
+            settings[key] = symbols[:self._MAX_WATCHLIST]
+        ConfigManager.save_settings(settings)
+        if self._app and hasattr(self._app, 'notify_settings'):
+            self._app.notify_settings("watchlist")
+        self._log.info(
+            f"Watchlist: {len(settings['market_crypto'])} crypto, "
+            f"{len(settings['market_stocks'])} stocks"
+        )
+        return self._json_response({
+            "ok": True,
+            "crypto": settings["market_crypto"],
+            "stocks": settings["market_stocks"],
+        })
+
+    async def _handle_get_drawstats(self, request):
+        """GET /api/drawstats — 回傳最近一幀的繪圖呼叫統計。"""
+        stats = None
+        if self._app and hasattr(self._app, 'draw_stats'):
+            stats = self._app.draw_stats()
+        if stats is None:
+            return self._json_response({"enabled": False})
+        stats["enabled"] = True
+        return self._json_response(stats)
+
+    async def _handle_set_drawstats(self, request):
+        """POST /api/drawstats — 切換繪圖統計（enabled / hud / log_every）。"""
+        if not self._app or not hasattr(self._app, 'set_profiling'):
+            return self._json_response({"error": "No app"}, 400)
+        params = request.get("params", {})
+        enabled = params.get("enabled", "1") not in ("0", "false", "")
+        hud = params.get("hud", "0") not in ("0", "false", "")
+        try:
+            log_every = int(params.get("log_every", "0"))
+        except ValueError:
+            log_every = 0
+        self._app.set_profiling(enabled, hud=hud, log_every=log_every)
+        self._log.info(f"Draw stats {'on' if enabled else 'off'}")
+        return self._json_response({"enabled": enabled, "hud": hud})
+
     async def _handle_reboot(self, request):
         """POST /api/reboot — 重啟裝置。"""
         self._log.info("Reboot requested via settings")
@@ -194,7 +346,7 @@ class SettingsServer:
         """套用設定到硬體。"""
         if self._app and hasattr(self._app, 'presto'):
             bl = settings.get("backlight", 1.0)
-            self._app.presto.set_backlight(bl)
+            self._app.set_backlight(bl)
             ambient = settings.get("ambient_leds", False)
             self._app.presto.auto_ambient_leds(
                 bool(ambient)
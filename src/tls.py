@@ -0,0 +1,185 @@
+"""
+TLS — 共用的 TLS 連線層（HTTPS / WSS）。
+
+每次連線都建立新的 SSLContext 並做完整握手，在 RP2350 上要一秒以上的
+CPU 與一大塊暫時 heap。這裡每個主機只建立一個 SSLContext 並重複使用；
+port 的 ssl 模組支援 session（SSLSocket.session 與 wrap_socket(session=)）
+時，保存上次連線的 session，下次以簡化握手（session resumption）重連，
+不支援時自動退回完整握手。
+
+每次連線記錄建立耗時（TCP + TLS 握手 + 第一行回應）與 heap 用量
+（連線前 gc.collect() 後、收到第一行回應時的 mem_free() 差，
+不是握手期間的峰值），寫入 log 並可由 stats() 取得。
+"""
+import gc
+import socket
+import ssl
+import uasyncio as asyncio
+from logger import Logger
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    import time
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    from errno import EINPROGRESS
+except ImportError:
+    EINPROGRESS = 115
+
+_log = Logger("TLS")
+
+
+class _Host:
+    """單一主機的共用 context、session 與連線統計。"""
+
+    def __init__(self):
+        self.ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.ctx.verify_mode = ssl.CERT_NONE
+        self.session = None
+        self.resumable = True   # wrap_socket(session=) 失敗後不再嘗試
+        self.connects = 0
+        self.resumed = 0
+        self.last_ms = 0
+        self.max_heap_delta = 0
+
+
+_hosts = {}
+
+
+def _host(host):
+    entry = _hosts.get(host)
+    if entry is None:
+        entry = _hosts[host] = _Host()
+    return entry
+
+
+def context(host):
+    """host 的共用 SSLContext（第一次使用時建立）。"""
+    return _host(host).ctx
+
+
+def stats():
+    """各主機的連線統計。
+
+    Returns:
+        {host: (連線次數, 確認為簡化握手的次數, 最近一次耗時 ms,
+        連線前後 mem_free() 差的最大值 bytes)}。
+    """
+    return {
+        host: (h.connects, h.resumed, h.last_ms, h.max_heap_delta)
+        for host, h in _hosts.items()
+    }
+
+
+def _ssl_socket(writer):
+    """stream 底下的 SSL socket（MicroPython 為 Stream.s）。"""
+    sock = getattr(writer, "s", None)
+    if sock is None:
+        get = getattr(writer, "get_extra_info", None)
+        if get is not None:
+            sock = get("ssl_object")
+    return sock
+
+
+async def _open_resumed(host, port, ctx, session):
+    """以既有 session 建立連線（同 asyncio.open_connection，多傳 session）。"""
+    ai = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0]
+    s = socket.socket(ai[0], ai[1], ai[2])
+    s.setblocking(False)
+    try:
+        try:
+            s.connect(ai[-1])
+        except OSError as e:
+            if e.errno != EINPROGRESS:
+                raise
+        s = ctx.wrap_socket(
+            s, server_hostname=host, do_handshake_on_connect=False,
+            session=session,
+        )
+        s.setblocking(False)
+        # 握手在第一次寫入（drain 等待可寫）時進行
+        stream = asyncio.StreamWriter(s, {})
+    except Exception:
+        s.close()
+        raise
+    return stream, stream
+
+
+async def request(host, port, head):
+    """建立 TLS 連線、送出請求並讀取第一行回應。
+
+    第一行回應到達時握手必定已完成，耗時與 heap 用量以此為準。
+
+    Args:
+        host: 主機名稱。
+        port: 連接埠。
+        head: 請求內容（bytes，HTTP 請求或 WebSocket Upgrade）。
+
+    Returns:
+        (reader, writer, status)，status 為第一行回應（bytes）。
+        呼叫端讀完後需 writer.close()。
+
+    Raises:
+        OSError: 連線或握手失敗（連線已關閉）。
+    """
+    h = _host(host)
+    mem_free = getattr(gc, "mem_free", None)
+    gc.collect()
+    free = mem_free() if mem_free else 0
+    t0 = ticks_ms()
+
+    session = h.session if h.resumable else None
+    writer = None
+    try:
+        if session is not None:
+            try:
+                reader, writer = await _open_resumed(
+                    host, port, h.ctx, session
+                )
+            except TypeError:
+                # port 不支援 session 參數：之後一律完整握手
+                h.resumable = False
+                session = None
+        if writer is None:
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=h.ctx
+            )
+        writer.write(head)
+        await writer.drain()
+        status = await reader.readline()
+    except Exception:
+        if writer is not None:
+            writer.close()
+        # session 可能已過期，下次改用完整握手
+        h.session = None
+        raise
+
+    ms = ticks_diff(ticks_ms(), t0)
+    heap = free - mem_free() if mem_free else 0
+    sock = _ssl_socket(writer)
+    # 只有 port 回報 session_reused 為真才算簡化握手；提供了 session
+    # 但無從確認時記為 full/unknown（伺服器可能仍做了完整握手）
+    reused = getattr(sock, "session_reused", None)
+    if session is None or reused is False:
+        kind = "full"
+    elif reused:
+        kind = "resumed"
+        h.resumed += 1
+    else:
+        kind = "full/unknown"
+    if h.resumable:
+        h.session = getattr(sock, "session", None)
+    h.connects += 1
+    h.last_ms = ms
+    h.max_heap_delta = max(h.max_heap_delta, heap)
+    _log.info(
+        f"{host}:{port} {kind} handshake {ms} ms, heap +{heap} B"
+    )
+    return reader, writer, status
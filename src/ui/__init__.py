@@ -2,5 +2,5 @@
 
 from ui.app import App
 from ui.page import Page
-from ui.widget import Label, Button, Container
+from ui.widget import Label, Button, Container, ListView, Sparkline
 from ui import theme
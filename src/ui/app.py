@@ -1,7 +1,11 @@
 """UI App — 主應用程式，管理 Presto 硬體與頁面生命週期。"""
 
+import time
 import uasyncio as asyncio
 from presto import Presto
+from ui.profiler import DrawProfiler
+from ui.clip import push_clip, pop_clip
+from ui.layer import Layer
 from ui.theme import BACKGROUND
 
 try:
@@ -13,6 +17,58 @@ except ImportError:
 # 滑動偵測參數
 _SWIPE_THRESHOLD = 50   # 最小滑動距離（px）
 _SWIPE_ANIM_SPEED = 20  # 動畫速度（px/frame）
+_SCROLL_SLOP = 8        # 垂直拖曳交給頁面捲動前的最小位移（px）
+_DRAG_SLOP = 10         # 水平拖曳開始跟手前的最小位移（px）
+_FLING_VELOCITY = 400   # 放開速度超過此值（px/s）即視為快滑提交
+_FLING_LOOKAHEAD_MS = 150  # 以放開速度預測落點的時間（ms）
+_VELOCITY_WINDOW_MS = 100  # 估算速度時採用的最近取樣時間窗（ms）
+
+
+class VelocityTracker:
+    """以帶時間戳的觸控取樣估算手指速度（px/s）。
+
+    Args:
+        size: 環形緩衝區保留的取樣數。
+    """
+
+    def __init__(self, size=6):
+        self._t = [0] * size
+        self._x = [0] * size
+        self._y = [0] * size
+        self._n = 0
+        self._i = 0
+
+    def reset(self):
+        self._n = 0
+        self._i = 0
+
+    def add(self, t_ms, x, y):
+        """加入一筆取樣（t_ms 為 time.ticks_ms()）。"""
+        i = self._i
+        self._t[i] = t_ms
+        self._x[i] = x
+        self._y[i] = y
+        self._i = (i + 1) % len(self._t)
+        if self._n < len(self._t):
+            self._n += 1
+
+    def velocity(self):
+        """回傳最近時間窗內的平均速度 (vx, vy)，單位 px/s。"""
+        size = len(self._t)
+        if self._n < 2:
+            return 0, 0
+        newest = (self._i - 1) % size
+        oldest = newest
+        for k in range(1, self._n):
+            j = (newest - k) % size
+            if time.ticks_diff(self._t[newest], self._t[j]) > _VELOCITY_WINDOW_MS:
+                break
+            oldest = j
+        dt = time.ticks_diff(self._t[newest], self._t[oldest])
+        if dt <= 0:
+            return 0, 0
+        return ((self._x[newest] - self._x[oldest]) * 1000 // dt,
+                (self._y[newest] - self._y[oldest]) * 1000 // dt)
 
 
 class App:
@@ -52,8 +108,15 @@ class App:
             self._transform = Transform()
             self.vector.set_transform(self._transform)
 
+        # 繪圖統計（可選，執行期切換）
+        self._raw_display = self.display
+        self._raw_vector = self.vector
+        self.profiler = None
+        self._profiling = False
+
         self._current_page = None
         self._running = False
+        self.backlight = 1.0   # 最後設定的背光亮度，0 = 螢幕休眠
 
         # 頁面序列（滑動切換用）
         self._pages = []       # Page 實例列表
@@ -69,6 +132,19 @@ class App:
         self._swipe_offset = 0.0
         self._swipe_direction = 0   # +1 往右（前一頁），-1 往左（下一頁）
         self._swipe_next_page = None
+        self._swipe_target = 0      # 動畫終點：±width = 提交，0 = 回彈
+        self._swipe_speed = _SWIPE_ANIM_SPEED
+
+        # 跟手拖曳狀態
+        self._dragging = False
+        self._velocity = VelocityTracker()
+
+        # 滑動快照：拖曳/動畫期間以 framebuffer 快照合成兩個頁面
+        self._snap_cur = None
+        self._snap_next = None
+        self._snap_cur_page = None
+        self._snap_next_page = None
+        self._snapshots_ok = True   # 不支援 framebuffer 存取時改為即時繪製
 
         # Overlay (Settings) 狀態
         self._overlay_page = None
@@ -81,12 +157,19 @@ class App:
         self._touch_start_y = -1
         self._touch_last_y = -1
 
+        # 頁面內捲動（ListView 等）狀態
+        self._touch_scrolling = False
+
     def set_pages(self, pages):
         """設定可滑動切換的頁面序列。
 
         Args:
             pages: Page 實例列表。
         """
+        # 被取代的頁面停止背景工作（否則 task 會讓舊頁面一直存活）
+        for page in self._pages:
+            if page not in pages:
+                page.on_remove()
         self._pages = pages
         # 將當前頁面對應到序列中的索引
         if self._current_page in self._pages:
@@ -110,29 +193,97 @@ class App:
         else:
             self._page_index = -1
 
-    def _navigate(self, direction):
-        """啟動滑動切換動畫。
+    def set_backlight(self, value):
+        """設定背光亮度（0.0–1.0），0 視為螢幕休眠。"""
+        self.backlight = value
+        self.presto.set_backlight(value)
+
+    @property
+    def asleep(self):
+        """螢幕是否休眠（背光關閉）。"""
+        return self.backlight <= 0
+
+    def page_distance(self, page):
+        """page 與目前頁面在頁面序列中相距幾頁。
+
+        目前頁面為 0；不在序列中（或目前頁面不在序列中）時回傳頁面數。
+        """
+        if page is self._current_page:
+            return 0
+        if self._page_index < 0 or page not in self._pages:
+            return len(self._pages)
+        return abs(self._pages.index(page) - self._page_index)
+
+    def notify_settings(self, key):
+        """設定在執行期被修改（如 Web 設定）時通知所有頁面。
 
         Args:
-            direction: -1（往左，下一頁）或 +1（往右，前一頁）。
+            key: 被修改的設定名稱。
         """
-        if self._swiping or self._page_index < 0:
-            return
+        for page in self._pages:
+            page.on_settings_changed(key)
+        if self._overlay_page and self._overlay_page not in self._pages:
+            self._overlay_page.on_settings_changed(key)
+
+    def _neighbour(self, direction):
+        """回傳往 direction 方向滑動時會進場的頁面，沒有則回傳 None。"""
+        if self._page_index < 0:
+            return None
         target = self._page_index - direction
-        if target < 0 or target >= len(self._pages):
-            return
+        if 0 <= target < len(self._pages):
+            return self._pages[target]
+        return None
 
-        self._swiping = True
-        self._swipe_direction = direction
+    def _begin_drag(self):
+        """水平位移超過 slop，頁面開始跟著手指移動。"""
+        self._dragging = True
         self._swipe_offset = 0.0
-        self._swipe_next_page = self._pages[target]
+        self._swipe_direction = 0
+        self._swipe_next_page = None
 
-    def _update_swipe_animation(self):
-        """更新滑動動畫（每幀呼叫）。"""
-        self._swipe_offset += (
-            self._swipe_direction * _SWIPE_ANIM_SPEED
+    def _update_drag(self, x):
+        """依手指位置更新拖曳偏移；沒有相鄰頁面時以 1/3 阻尼拉動。"""
+        dx = x - self._touch_start_x
+        if dx:
+            self._swipe_direction = 1 if dx > 0 else -1
+        nxt = self._neighbour(self._swipe_direction)
+        self._swipe_next_page = nxt
+        if nxt is None:
+            dx //= 3
+        self._swipe_offset = float(dx)
+
+    def _end_drag(self):
+        """放開手指：以放開速度預測落點，決定提交換頁或回彈。"""
+        self._dragging = False
+        vx = self._velocity.velocity()[0]
+        w = self.width
+        direction = self._swipe_direction
+        offset = self._swipe_offset
+        commit = False
+        if self._swipe_next_page is not None and direction:
+            projected = offset + vx * _FLING_LOOKAHEAD_MS // 1000
+            flick = vx * direction > _FLING_VELOCITY
+            commit = projected * direction > w // 2 or (
+                flick and offset * direction > 0
+            )
+        self._swiping = True
+        self._swipe_target = direction * w if commit else 0
+        # 動畫至少以放開速度延續，快滑不會在放開瞬間變慢
+        self._swipe_speed = max(
+            _SWIPE_ANIM_SPEED, abs(vx) * self._frame_ms // 1000
         )
-        if abs(self._swipe_offset) >= self.width:
+
+    def _update_swipe_animation(self):
+        """推進滑動動畫（每幀呼叫），往提交或回彈終點移動。"""
+        target = self._swipe_target
+        step = self._swipe_speed
+        if self._swipe_offset < target:
+            self._swipe_offset = min(self._swipe_offset + step, target)
+        else:
+            self._swipe_offset = max(self._swipe_offset - step, target)
+        if self._swipe_offset != target:
+            return
+        if target:
             # 動畫完成，切換頁面
             old = self._current_page
             old.on_exit()
@@ -142,9 +293,41 @@ class App:
                 self._page_index = self._pages.index(
                     self._current_page
                 )
-            self._swiping = False
-            self._swipe_offset = 0.0
-            self._swipe_next_page = None
+        self._swiping = False
+        self._swipe_offset = 0.0
+        self._swipe_next_page = None
+        self._release_snapshots()
+
+    def set_profiling(self, enabled, hud=False, log_every=0):
+        """切換繪圖呼叫統計。
+
+        啟用時以 DrawProfiler 代理替換 ``self.display`` / ``self.vector``；
+        停用時換回原始物件，繪圖路徑不留任何額外開銷。
+
+        Args:
+            enabled: 是否啟用統計。
+            hud: 是否在螢幕左上角顯示最近一幀的統計。
+            log_every: 每隔幾幀輸出一次日誌摘要，0 = 不輸出。
+        """
+        if enabled:
+            if self.profiler is None:
+                self.profiler = DrawProfiler(self._raw_display)
+            self.profiler.reset()
+            self.profiler.hud = hud
+            self.profiler.log_every = log_every
+            self.display = self.profiler
+            if self._raw_vector:
+                self.vector = self.profiler.wrap_vector(self._raw_vector)
+        else:
+            self.display = self._raw_display
+            self.vector = self._raw_vector
+        self._profiling = enabled
+
+    def draw_stats(self):
+        """回傳最近一幀的繪圖統計，未啟用時回傳 None。"""
+        if not self._profiling:
+            return None
+        return self.profiler.summary()
 
     def set_overlay(self, page):
         """設定 overlay 頁面（如 SettingsPage）。"""
@@ -223,19 +406,41 @@ class App:
                 self._touch_last_y = self.touch.y
         else:
             if touching:
+                tx = self.touch.x
+                ty = self.touch.y
                 if not self._touch_was_down or was_swiping:
                     # 觸控開始
-                    self._touch_start_x = self.touch.x
-                    self._touch_start_y = self.touch.y
+                    self._touch_start_x = tx
+                    self._touch_start_y = ty
+                    self._touch_last_y = ty
+                    self._touch_scrolling = False
+                    self._velocity.reset()
+                self._velocity.add(time.ticks_ms(), tx, ty)
+                if self._dragging:
+                    self._update_drag(tx)
+                elif not self._overlay_visible and not self._overlay_animating:
+                    self._track_scroll(tx, ty)
+                    if not self._touch_scrolling:
+                        self._track_drag(tx, ty)
                 # 持續追蹤最新位置
-                self._touch_last_x = self.touch.x
-                self._touch_last_y = self.touch.y
+                self._touch_last_x = tx
+                self._touch_last_y = ty
             elif self._touch_was_down and not was_swiping:
                 # 觸控結束
                 dx = self._touch_last_x - self._touch_start_x
                 dy = self._touch_last_y - self._touch_start_y
 
-                if abs(dy) > abs(dx):
+                if self._dragging:
+                    # 跟手拖曳結束 → 提交或回彈
+                    self._end_drag()
+                elif self._touch_scrolling:
+                    # 頁面內捲動結束 → 交給 widget 做慣性捲動
+                    vy = self._velocity.velocity()[1]
+                    self._current_page.handle_fling(
+                        vy * self._frame_ms // 1000
+                    )
+                    self._touch_scrolling = False
+                elif abs(dy) > abs(dx):
                     # 垂直滑動優先
                     if dy < -_SWIPE_THRESHOLD:
                         self._show_overlay()
@@ -252,12 +457,8 @@ class App:
                                 self._touch_last_x, self._touch_last_y
                             )
                 else:
-                    # 水平滑動或 tap
-                    if abs(dx) >= _SWIPE_THRESHOLD and not self._overlay_visible:
-                        # 滑動 → 切換頁面
-                        direction = 1 if dx > 0 else -1
-                        self._navigate(direction)
-                    else:
+                    # 水平移動：換頁已由跟手拖曳處理，這裡只剩 tap
+                    if abs(dx) < _SWIPE_THRESHOLD or self._overlay_visible:
                         # tap：優先給 overlay，否則給主頁面
                         if self._overlay_visible and self._overlay_page:
                             self._overlay_page.handle_touch(
@@ -277,49 +478,170 @@ class App:
             self._overlay_page.update()
 
         # 繪製
-        if self._swiping:
+        profiling = self._profiling
+        if profiling:
+            self.profiler.begin_frame()
+        if self._swiping or self._dragging:
             self._draw_swipe_transition()
         elif self._overlay_animating:
-            # 動畫中：先畫主頁面，再疊 overlay
-            self._current_page.draw(self.display, self.vector, offset_x=0)
-            self._overlay_page.draw(
-                self.display, self.vector,
-                offset_y=int(self._overlay_offset_y)
+            # 動畫中：先畫主頁面（只剩 overlay 上方可見），再疊 overlay
+            oy = int(self._overlay_offset_y)
+            self._draw_page(
+                self._current_page,
+                clip=(0, 0, self.width, oy),
+            )
+            self._draw_page(
+                self._overlay_page, offset_y=oy,
+                clip=(0, oy, self.width, self.height - oy),
             )
         elif self._overlay_visible:
             # 只畫 overlay (offset_y=0)
-            self._overlay_page.draw(self.display, self.vector, offset_y=0)
+            self._draw_page(self._overlay_page, offset_y=0)
         else:
-            self._current_page.draw(
-                self.display, self.vector, offset_x=0
-            )
+            self._draw_page(self._current_page)
 
         # 推送到螢幕
-        self.presto.update()
+        if profiling:
+            if self.profiler.hud:
+                self.profiler.draw_hud()
+            t0 = time.ticks_us()
+            self.presto.update()
+            self.profiler.end_frame(
+                time.ticks_diff(time.ticks_us(), t0)
+            )
+        else:
+            self.presto.update()
+
+    def _track_scroll(self, x, y):
+        """手指按住期間，把垂直拖曳交給當前頁面的可捲動 widget。"""
+        step = y - self._touch_last_y
+        if not self._touch_scrolling:
+            dx = x - self._touch_start_x
+            dy = y - self._touch_start_y
+            if abs(dy) < _SCROLL_SLOP or abs(dy) <= abs(dx):
+                return
+            # 首次進入捲動：補上 slop 內累積的位移
+            step = dy
+        if self._current_page.handle_scroll(
+            self._touch_start_x, self._touch_start_y, step
+        ):
+            self._touch_scrolling = True
+
+    def _track_drag(self, x, y):
+        """水平位移超過 slop 且大於垂直位移時，開始跟手拖曳換頁。"""
+        if self._page_index < 0:
+            return
+        dx = x - self._touch_start_x
+        dy = y - self._touch_start_y
+        if abs(dx) > _DRAG_SLOP and abs(dx) > abs(dy):
+            self._begin_drag()
+            self._update_drag(x)
 
-    def _draw_swipe_transition(self):
-        """繪製滑動過渡動畫（兩個頁面同時顯示）。"""
-        ofs = int(self._swipe_offset)
-        w = self.width
+    def _draw_page(self, page, offset_x=0, offset_y=None, clip=None):
+        """在指定可見視窗內繪製單一頁面。
 
-        # 清除背景
-        self.display.set_pen(
-            self.display.create_pen(*BACKGROUND)
-        )
-        self.display.clear()
+        視窗外的繪製由 display 裁切，完全落在視窗外的 widget
+        則在 Python 端直接剔除。
 
-        # 當前頁面滑出
-        self._current_page.draw(
-            self.display, self.vector, offset_x=ofs
-        )
+        Args:
+            page: Page 實例。
+            offset_x: 水平偏移。
+            offset_y: 垂直偏移（僅 overlay 使用）。
+            clip: 可見視窗 (x, y, w, h)，預設整個螢幕。
+        """
+        x, y, w, h = clip or (0, 0, self.width, self.height)
+        if w <= 0 or h <= 0:
+            return
+        if self._profiling:
+            self.profiler.page = type(page).__name__
+        display = self.display
+        push_clip(display, x, y, w, h)
+        try:
+            if offset_y is None:
+                page.draw(display, self.vector, offset_x=offset_x)
+            else:
+                page.draw(
+                    display, self.vector,
+                    offset_x=offset_x, offset_y=offset_y,
+                )
+        finally:
+            pop_clip(display)
+
+    def _draw_swipe_transition(self):
+        """繪製滑動過渡（兩個頁面同時顯示）。
 
-        # 新頁面滑入（從反方向進入）
-        if self._swipe_next_page:
-            incoming_ofs = ofs - self._swipe_direction * w
-            self._swipe_next_page.draw(
-                self.display, self.vector,
-                offset_x=incoming_ofs,
+        可用時以 framebuffer 快照合成：拖曳開始時各畫一次兩個頁面並擷取，
+        之後每幀只做記憶體複製，跟手速度與頁面複雜度無關。
+        不支援快照時，每個頁面只在自己可見的那段視窗內即時繪製。
+        """
+        ofs = int(self._swipe_offset)
+        w = self.width
+        h = self.height
+        nxt = self._swipe_next_page
+        incoming_ofs = ofs - self._swipe_direction * w
+
+        if self._prepare_snapshots():
+            display = self.display
+            self._snap_cur.blit(display, ofs, 0)
+            if nxt:
+                self._snap_next.blit(display, incoming_ofs, 0)
+        else:
+            # 當前頁面滑出
+            self._draw_page(
+                self._current_page, offset_x=ofs,
+                clip=(max(ofs, 0), 0, w - abs(ofs), h),
             )
+            # 新頁面滑入（從反方向進入）
+            if nxt:
+                self._draw_page(
+                    nxt, offset_x=incoming_ofs,
+                    clip=(max(incoming_ofs, 0), 0,
+                          w - abs(incoming_ofs), h),
+                )
+
+        if not nxt and ofs:
+            # 沒有相鄰頁面（邊界阻尼拉動）：露出的空白補背景色
+            display = self.display
+            display.set_pen(display.create_pen(*BACKGROUND))
+            if ofs > 0:
+                display.rectangle(0, 0, ofs, h)
+            else:
+                display.rectangle(w + ofs, 0, -ofs, h)
+
+    def _prepare_snapshots(self):
+        """確保當前/進場頁面的快照可用，回傳是否可用快照合成。"""
+        if not self._snapshots_ok:
+            return False
+        if self._snap_cur is None:
+            self._snap_cur = Layer(self.width, self.height)
+            self._snap_next = Layer(self.width, self.height)
+        display = self.display
+        cur = self._current_page
+        nxt = self._swipe_next_page
+        if self._snap_cur_page is not cur:
+            self._draw_page(cur)
+            if not self._snap_cur.capture(display, 0, 0):
+                self._snapshots_ok = False
+                return False
+            self._snap_cur_page = cur
+        if nxt is not None and self._snap_next_page is not nxt:
+            self._draw_page(nxt)
+            if not self._snap_next.capture(display, 0, 0):
+                self._snapshots_ok = False
+                return False
+            self._snap_next_page = nxt
+        return True
+
+    def _release_snapshots(self):
+        """過渡結束，釋放快照。
+
+        兩張全螢幕快照在 RGB565 下各約 115 KB，不在兩次換頁之間佔用 heap；
+        下次拖曳開始時重新配置。
+        """
+        self._snap_cur = None
+        self._snap_next = None
+        self._snap_cur_page = None
+        self._snap_next_page = None
 
     def stop(self):
         """停止主迴圈。"""
@@ -0,0 +1,58 @@
+"""UI Clip — 裁切矩形堆疊，讓不可見的繪製在 Python 端就被剔除。
+
+App 在繪製每個頁面前推入該頁面的可見視窗（滑動換頁、Overlay 時只有部分可見），
+Page / Container 依此跳過完全落在視窗外的 Widget，不發出任何 display 呼叫。
+所有座標皆為螢幕座標。
+"""
+
+_stack = []
+
+
+def push_clip(display, x, y, w, h):
+    """推入裁切矩形（與目前裁切取交集），並同步到 display。
+
+    Returns:
+        實際生效的 (x, y, w, h)。
+    """
+    if _stack:
+        cx, cy, cw, ch = _stack[-1]
+        x2 = min(x + w, cx + cw)
+        y2 = min(y + h, cy + ch)
+        x = max(x, cx)
+        y = max(y, cy)
+        w = max(x2 - x, 0)
+        h = max(y2 - y, 0)
+    rect = (x, y, w, h)
+    _stack.append(rect)
+    display.set_clip(x, y, w, h)
+    return rect
+
+
+def pop_clip(display):
+    """彈出最上層裁切矩形，恢復上一層（或移除裁切）。"""
+    _stack.pop()
+    if _stack:
+        display.set_clip(*_stack[-1])
+    else:
+        display.remove_clip()
+
+
+def current_clip():
+    """目前生效的裁切矩形，無裁切時回傳 None。"""
+    return _stack[-1] if _stack else None
+
+
+def is_visible(x, y, w, h):
+    """判斷矩形是否與目前裁切區域相交（無裁切時一律可見）。"""
+    if not _stack:
+        return True
+    cx, cy, cw, ch = _stack[-1]
+    return x < cx + cw and x + w > cx and y < cy + ch and y + h > cy
+
+
+def contains(x, y, w, h):
+    """判斷矩形是否完全落在目前裁切區域內（無裁切時一律成立）。"""
+    if not _stack:
+        return True
+    cx, cy, cw, ch = _stack[-1]
+    return cx <= x and cy <= y and x + w <= cx + cw and y + h <= cy + ch
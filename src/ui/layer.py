@@ -0,0 +1,136 @@
+"""UI Layer — framebuffer 區塊快取。
+
+把一塊已繪製完成的畫面擷取到 bytearray，之後每幀以逐列記憶體複製貼回，
+取代重複的繪圖呼叫。用於滑動換頁的頁面快照，以及錶面、月曆等靜態圖層。
+需要 PicoGraphics 支援 buffer protocol；不支援時 capture() 回傳 False，
+呼叫端應退回直接繪製。
+"""
+
+from ui.clip import current_clip
+
+try:
+    import micropython
+
+    @micropython.viper
+    def _copy_rows(dst, dst_off: int, dst_stride: int,
+                   src, src_off: int, src_stride: int,
+                   n: int, rows: int):
+        # 對齊 4 bytes 時以 word 複製，否則逐 byte
+        if ((dst_off | src_off | n | dst_stride | src_stride) & 3) == 0:
+            d32 = ptr32(dst)
+            s32 = ptr32(src)
+            words = n >> 2
+            di = dst_off >> 2
+            si = src_off >> 2
+            ds = dst_stride >> 2
+            ss = src_stride >> 2
+            for _ in range(rows):
+                for i in range(words):
+                    d32[di + i] = s32[si + i]
+                di += ds
+                si += ss
+        else:
+            d8 = ptr8(dst)
+            s8 = ptr8(src)
+            for _ in range(rows):
+                for i in range(n):
+                    d8[dst_off + i] = s8[src_off + i]
+                dst_off += dst_stride
+                src_off += src_stride
+except (ImportError, AttributeError):
+    def _copy_rows(dst, dst_off, dst_stride, src, src_off, src_stride,
+                   n, rows):
+        for _ in range(rows):
+            dst[dst_off:dst_off + n] = src[src_off:src_off + n]
+            dst_off += dst_stride
+            src_off += src_stride
+
+
+def _framebuffer(display):
+    """取得 (framebuffer, 寬, 高, bytes/pixel)；不支援時回傳 None。"""
+    display = getattr(display, "target", display)  # 解開 DrawProfiler 代理
+    try:
+        fb = memoryview(display)
+    except TypeError:
+        return None
+    w, h = display.get_bounds()
+    bpp = len(fb) // (w * h)
+    if bpp < 1:
+        return None
+    return fb, w, h, bpp
+
+
+class Layer:
+    """固定大小的畫面區塊快取。
+
+    Args:
+        w: 區塊寬度（px）。
+        h: 區塊高度（px）。
+
+    Attributes:
+        valid: 快取內容是否可用。
+        key: 呼叫端自訂的快取鍵（如主題、月份），不符時應重建。
+    """
+
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.valid = False
+        self.key = None
+        self._buf = None
+        self._bpp = 0
+
+    def invalidate(self):
+        """標記快取失效，下次需重新繪製並擷取。"""
+        self.valid = False
+
+    def capture(self, display, x, y):
+        """擷取螢幕 (x, y) 起的 w×h 區塊。
+
+        區塊必須完全落在螢幕內。
+
+        Returns:
+            是否擷取成功。
+        """
+        info = _framebuffer(display)
+        if info is None:
+            return False
+        fb, sw, sh, bpp = info
+        if x < 0 or y < 0 or x + self.w > sw or y + self.h > sh:
+            return False
+        row = self.w * bpp
+        if self._buf is None or self._bpp != bpp:
+            self._buf = bytearray(row * self.h)
+            self._bpp = bpp
+        _copy_rows(self._buf, 0, row,
+                   fb, (y * sw + x) * bpp, sw * bpp,
+                   row, self.h)
+        self.valid = True
+        return True
+
+    def blit(self, display, x, y):
+        """把快取區塊貼回螢幕 (x, y)。
+
+        超出螢幕或目前裁切區域（ui.clip）的部分會被裁掉。
+
+        Returns:
+            是否已貼上（快取無效或不支援時回傳 False）。
+        """
+        if not self.valid:
+            return False
+        info = _framebuffer(display)
+        if info is None:
+            return False
+        fb, sw, sh, bpp = info
+        cx, cy, cw, ch = current_clip() or (0, 0, sw, sh)
+        x0 = max(x, cx, 0)
+        y0 = max(y, cy, 0)
+        x1 = min(x + self.w, cx + cw, sw)
+        y1 = min(y + self.h, cy + ch, sh)
+        if x1 <= x0 or y1 <= y0:
+            return True
+        row = self.w * bpp
+        _copy_rows(fb, (y0 * sw + x0) * bpp, sw * bpp,
+                   self._buf, ((y0 - y) * self.w + (x0 - x)) * bpp, row,
+                   (x1 - x0) * bpp, y1 - y0)
+        return True
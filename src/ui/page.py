@@ -14,6 +14,7 @@ class Page:
         self.app = app
         self.widgets = []
         self.bg = BACKGROUND
+        self._scroll_target = None  # 目前拖曳中的可捲動 widget
 
     def add(self, widget):
         """加入 Widget 到頁面。"""
@@ -21,8 +22,13 @@ class Page:
         return widget
 
     def update(self):
-        """邏輯更新。子類覆寫以處理資料抓取等。"""
-        pass
+        """邏輯更新。子類覆寫以處理資料抓取等。
+
+        預設推進各 widget 的每幀狀態（如 ListView 慣性捲動）；
+        子類覆寫時應呼叫 super().update()。
+        """
+        for widget in self.widgets:
+            widget.update()
 
     def draw(self, display, vector, offset_x=0, offset_y=0):
         """繪製頁面。
@@ -49,7 +55,9 @@ class Page:
 
     def _draw_widgets(self, display, offset_x=0, offset_y=0):
         for widget in self.widgets:
-            widget.draw(display, offset_x, offset_y)
+            # 完全落在可見視窗外的 widget 直接剔除
+            if widget.visible and widget.in_view(offset_x, offset_y):
+                widget.draw(display, offset_x, offset_y)
 
     def handle_touch(self, tx, ty):
         """分發觸控事件給 widgets。"""
@@ -58,6 +66,28 @@ class Page:
                 return True
         return False
 
+    def handle_scroll(self, tx, ty, dy):
+        """分發垂直拖曳給可捲動的 widgets。回傳 True 表示已消費。
+
+        Args:
+            tx, ty: 拖曳起點座標。
+            dy: 本幀手指垂直位移（px）。
+        """
+        target = self._scroll_target
+        if target and target.handle_scroll(tx, ty, dy):
+            return True
+        for widget in self.widgets:
+            if widget.handle_scroll(tx, ty, dy):
+                self._scroll_target = widget
+                return True
+        return False
+
+    def handle_fling(self, vy):
+        """拖曳放開，把放開速度交給正在捲動的 widget。"""
+        if self._scroll_target:
+            self._scroll_target.handle_fling(vy)
+            self._scroll_target = None
+
     def on_enter(self):
         """頁面進入時呼叫。"""
         pass
@@ -69,3 +99,14 @@ class Page:
     def on_resume(self):
         """Overlay 關閉後底層頁面恢復時呼叫。"""
         pass
+
+    def on_settings_changed(self, key):
+        """設定在執行期被修改時呼叫（由 App.notify_settings 轉發）。"""
+        pass
+
+    def on_remove(self):
+        """頁面被移出頁面序列（如 WiFi 重新連線後重建頁面）時呼叫。
+
+        子類應在此停止自己啟動的背景 task，讓頁面可被回收。
+        """
+        pass
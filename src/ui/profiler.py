@@ -0,0 +1,256 @@
+"""UI Profiler — 繪圖呼叫統計代理，量測每幀、每頁的繪圖成本。"""
+
+import time
+from logger import Logger
+from ui.clip import current_clip
+
+# 原語 → 耗時分類
+_CATEGORIES = {
+    "pixel": "shape",
+    "pixel_span": "shape",
+    "line": "shape",
+    "rectangle": "shape",
+    "circle": "shape",
+    "triangle": "shape",
+    "polygon": "shape",
+    "text": "text",
+    "measure_text": "text",
+    "set_pen": "state",
+    "create_pen": "state",
+    "set_clip": "state",
+    "remove_clip": "state",
+    "clear": "clear",
+    "draw": "vector",
+    "update": "flush",
+}
+
+# App 自身（背景清除、推送螢幕）使用的頁面名稱
+APP_SCOPE = "App"
+
+
+class _VectorProxy:
+    """PicoVector 代理：只統計 draw()，其他屬性直接轉發。"""
+
+    def __init__(self, vector, profiler):
+        self.target = vector
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+    def draw(self, *args):
+        t0 = time.ticks_us()
+        self.target.draw(*args)
+        self._profiler._record("draw", 0, t0)
+
+
+class DrawProfiler:
+    """PicoGraphics 代理：統計繪圖呼叫次數、觸及像素數與耗時。
+
+    App 啟用統計時以此物件替換 ``app.display``，停用時換回原始
+    display，因此關閉狀態下繪圖路徑沒有任何額外開銷。
+    未攔截的屬性（``get_bounds``、``set_font`` 等）直接轉發給原始 display。
+
+    Args:
+        display: 原始 PicoGraphics 實例。
+        log_every: 每隔幾幀輸出一次日誌摘要，0 = 不輸出。
+    """
+
+    def __init__(self, display, log_every=0):
+        self.target = display
+        self.page = APP_SCOPE
+        self.hud = False
+        self.log_every = log_every
+        self.frames = 0
+        self._w, self._h = display.get_bounds()
+        self._frame = {}  # {page: {prim: [count, pixels, us]}}
+        self._last = {}
+        self._log = Logger("Profiler")
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+    def wrap_vector(self, vector):
+        """包裝 PicoVector，讓向量繪圖也計入統計。"""
+        return _VectorProxy(vector, self)
+
+    def reset(self):
+        """清除所有統計資料。"""
+        self.frames = 0
+        self._frame = {}
+        self._last = {}
+
+    # --- 幀邊界 ---
+
+    def begin_frame(self):
+        """開始新的一幀統計。"""
+        self._frame = {}
+        self.page = APP_SCOPE
+
+    def end_frame(self, flush_us=0):
+        """結束當前幀，保存結果供查詢。
+
+        Args:
+            flush_us: presto.update() 推送螢幕的耗時（微秒）。
+        """
+        if flush_us:
+            self.page = APP_SCOPE
+            self._add("update", 0, flush_us)
+        self._last = self._frame
+        self.frames += 1
+        if self.log_every and self.frames % self.log_every == 0:
+            self._log_summary()
+
+    # --- 統計 ---
+
+    def _add(self, prim, pixels, us):
+        stats = self._frame.get(self.page)
+        if stats is None:
+            stats = self._frame[self.page] = {}
+        entry = stats.get(prim)
+        if entry is None:
+            stats[prim] = [1, pixels, us]
+        else:
+            entry[0] += 1
+            entry[1] += pixels
+            entry[2] += us
+
+    def _record(self, prim, pixels, t0):
+        self._add(prim, pixels, time.ticks_diff(time.ticks_us(), t0))
+
+    def summary(self):
+        """回傳最近一幀的統計摘要（可直接 json.dumps）。
+
+        Returns:
+            {"frame": n, "pages": {page: {"calls", "pixels", "us",
+            "prims": {prim: [count, pixels, us]},
+            "categories": {category: us}}}}
+        """
+        pages = {}
+        for page, prims in self._last.items():
+            calls = pixels = us = 0
+            cats = {}
+            for prim, entry in prims.items():
+                calls += entry[0]
+                pixels += entry[1]
+                us += entry[2]
+                cat = _CATEGORIES.get(prim, "other")
+                cats[cat] = cats.get(cat, 0) + entry[2]
+            pages[page] = {
+                "calls": calls,
+                "pixels": pixels,
+                "us": us,
+                "prims": prims,
+                "categories": cats,
+            }
+        return {"frame": self.frames, "pages": pages}
+
+    def totals(self):
+        """回傳最近一幀的 (呼叫數, 像素數, 微秒) 總和。"""
+        calls = pixels = us = 0
+        for prims in self._last.values():
+            for entry in prims.values():
+                calls += entry[0]
+                pixels += entry[1]
+                us += entry[2]
+        return calls, pixels, us
+
+    def _log_summary(self):
+        for page, info in self.summary()["pages"].items():
+            self._log.info(
+                f"{page}: {info['calls']} calls, "
+                f"{info['pixels']} px, {info['us']} us"
+            )
+
+    def draw_hud(self):
+        """在左上角繪製最近一幀的統計（直接畫在原始 display，不計入）。"""
+        d = self.target
+        calls, _, us = self.totals()
+        text = "{} calls {}.{}ms".format(calls, us // 1000, us % 1000 // 100)
+        d.set_pen(d.create_pen(0, 0, 0))
+        d.rectangle(0, 0, d.measure_text(text, 1) + 4, 10)
+        d.set_pen(d.create_pen(255, 255, 0))
+        d.text(text, 2, 1, 240, 1)
+
+    # --- 攔截的繪圖原語 ---
+
+    def clear(self):
+        t0 = time.ticks_us()
+        self.target.clear()
+        # clear() 只會填滿目前裁切區域
+        clip = current_clip()
+        px = clip[2] * clip[3] if clip else self._w * self._h
+        self._record("clear", px, t0)
+
+    def set_pen(self, pen):
+        t0 = time.ticks_us()
+        self.target.set_pen(pen)
+        self._record("set_pen", 0, t0)
+
+    def create_pen(self, *args):
+        t0 = time.ticks_us()
+        pen = self.target.create_pen(*args)
+        self._record("create_pen", 0, t0)
+        return pen
+
+    def set_clip(self, x, y, w, h):
+        t0 = time.ticks_us()
+        self.target.set_clip(x, y, w, h)
+        self._record("set_clip", 0, t0)
+
+    def remove_clip(self):
+        t0 = time.ticks_us()
+        self.target.remove_clip()
+        self._record("remove_clip", 0, t0)
+
+    def pixel(self, x, y):
+        t0 = time.ticks_us()
+        self.target.pixel(x, y)
+        self._record("pixel", 1, t0)
+
+    def pixel_span(self, x, y, length):
+        t0 = time.ticks_us()
+        self.target.pixel_span(x, y, length)
+        self._record("pixel_span", length, t0)
+
+    def line(self, x1, y1, x2, y2, *args):
+        t0 = time.ticks_us()
+        self.target.line(x1, y1, x2, y2, *args)
+        self._record(
+            "line", max(abs(x2 - x1), abs(y2 - y1)) + 1, t0
+        )
+
+    def rectangle(self, x, y, w, h):
+        t0 = time.ticks_us()
+        self.target.rectangle(x, y, w, h)
+        self._record("rectangle", max(w, 0) * max(h, 0), t0)
+
+    def circle(self, x, y, r):
+        t0 = time.ticks_us()
+        self.target.circle(x, y, r)
+        self._record("circle", 3 * r * r, t0)
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        t0 = time.ticks_us()
+        self.target.triangle(x1, y1, x2, y2, x3, y3)
+        area = abs((x2 - x1) * (y3 - y1) - (x3 - x1) * (y2 - y1)) // 2
+        self._record("triangle", area, t0)
+
+    def polygon(self, *args):
+        t0 = time.ticks_us()
+        self.target.polygon(*args)
+        self._record("polygon", 0, t0)
+
+    def text(self, text, x, y, wordwrap=240, scale=2, *args):
+        t0 = time.ticks_us()
+        self.target.text(text, x, y, wordwrap, scale, *args)
+        us = time.ticks_diff(time.ticks_us(), t0)
+        # 像素數以文字外框估算（measure_text 不計入耗時）
+        tw = self.target.measure_text(text, scale)
+        self._add("text", min(tw, wordwrap) * 8 * scale, us)
+
+    def measure_text(self, text, scale=2, *args):
+        t0 = time.ticks_us()
+        w = self.target.measure_text(text, scale, *args)
+        self._record("measure_text", 0, t0)
+        return w
@@ -1,9 +1,15 @@
 """UI Widgets — 基礎 UI 元件。"""
 
+from array import array
 from ui.theme import (
     TEXT_COLOR, BUTTON_BG, BUTTON_PRESSED_BG, BUTTON_TEXT,
-    FONT_MEDIUM, BACKGROUND, PADDING,
+    FONT_MEDIUM, BACKGROUND, PADDING, PRIMARY,
 )
+from ui.clip import is_visible, push_clip, pop_clip
+
+# ListView 慣性捲動參數
+_FLING_FRICTION = 0.92   # 每幀速度衰減
+_FLING_MIN_SPEED = 0.3   # 低於此速度（px/frame）停止
 
 
 class Widget:
@@ -24,15 +30,50 @@ class Widget:
         """繪製元件。子類必須覆寫。"""
         pass
 
+    def update(self):
+        """每幀邏輯更新（動畫、慣性等），由 Page.update() 呼叫。
+
+        狀態推進放在這裡而不是 draw()：被剔除或由快照圖層代替時
+        不會停住，同一幀繪製兩次也不會推進兩次。
+        """
+        pass
+
     def handle_touch(self, tx, ty):
         """處理觸控事件。回傳 True 表示已消費。"""
         return False
 
+    def handle_scroll(self, tx, ty, dy):
+        """處理垂直拖曳（手指按住期間每幀呼叫）。回傳 True 表示已消費。
+
+        Args:
+            tx, ty: 拖曳起點座標。
+            dy: 本幀手指垂直位移（px，往下為正）。
+        """
+        return False
+
+    def handle_fling(self, vy):
+        """拖曳放開時呼叫，vy 為放開瞬間的垂直速度（px/frame）。"""
+        pass
+
     def contains(self, tx, ty):
         """判斷座標是否在元件範圍內。"""
         return (self.x <= tx < self.x + self.w and
                 self.y <= ty < self.y + self.h)
 
+    def bounds(self):
+        """回傳元件外框 (x, y, w, h)；尺寸未知時回傳 None。"""
+        if self.w <= 0 or self.h <= 0:
+            return None
+        return (self.x, self.y, self.w, self.h)
+
+    def in_view(self, offset_x=0, offset_y=0):
+        """判斷元件（加上偏移後）是否與目前裁切區域相交。"""
+        box = self.bounds()
+        if box is None:
+            return True
+        return is_visible(box[0] + offset_x, box[1] + offset_y,
+                          box[2], box[3])
+
 
 class Label(Widget):
     """文字標籤。"""
@@ -50,6 +91,15 @@ class Label(Widget):
             self.text = text
             self.mark_dirty()
 
+    def bounds(self):
+        """以字元上限寬度（8px * scale）保守估算文字外框。"""
+        wrap = self.wrap_width or 240
+        line_h = 8 * self.scale
+        text_w = len(self.text) * line_h
+        if text_w <= wrap:
+            return (self.x, self.y, text_w, line_h)
+        return (self.x, self.y, wrap, line_h * (text_w // wrap + 1))
+
     def draw(self, display, offset_x=0, offset_y=0):
         if not self.visible:
             return
@@ -140,7 +190,12 @@ class Container(Widget):
             display.rectangle(self.x + offset_x, self.y + offset_y,
                               self.w, self.h)
         for child in self.children:
-            child.draw(display, offset_x, offset_y)
+            if child.visible and child.in_view(offset_x, offset_y):
+                child.draw(display, offset_x, offset_y)
+
+    def update(self):
+        for child in self.children:
+            child.update()
 
     def handle_touch(self, tx, ty):
         if not self.visible:
@@ -149,3 +204,388 @@ class Container(Widget):
             if child.handle_touch(tx, ty):
                 return True
         return False
+
+
+class ListView(Widget):
+    """虛擬化捲動清單：只繪製可見列，列 widget 由小型物件池循環使用。
+
+    資料不存在 ListView 內，而是透過 callback 取得；不論資料有幾筆，
+    記憶體與每幀成本只跟可見列數有關。
+
+    Args:
+        x, y, w, h: 清單可見範圍。
+        row_h: 每列高度（px）。
+        row_count: 回傳資料總筆數的 callable。
+        build_row: callable(list_view)，建立一列並回傳 Container
+            （子元件座標相對於列的左上角）。
+        bind_row: callable(row, index)，把第 index 筆資料寫入 row。
+        on_select: 點擊某列時呼叫 callable(index)（可為 None）。
+    """
+
+    def __init__(self, x=0, y=0, w=240, h=120, row_h=24,
+                 row_count=None, build_row=None, bind_row=None,
+                 on_select=None):
+        super().__init__(x=x, y=y, w=w, h=h)
+        self.row_h = row_h
+        self._row_count = row_count
+        self._bind_row = bind_row
+        self.on_select = on_select
+        self._scroll = 0.0
+        self._velocity = 0.0
+
+        # 列物件池：可見列數 + 1（部分露出的上下兩列）
+        pool_size = h // row_h + 2
+        self._rows = [build_row(self) for _ in range(pool_size)]
+        self._bound = [-1] * pool_size  # 每個池位目前綁定的資料索引
+
+    def count(self):
+        return self._row_count() if self._row_count else 0
+
+    def max_scroll(self):
+        return max(self.count() * self.row_h - self.h, 0)
+
+    def refresh(self, index=None):
+        """資料變更後呼叫；index=None 表示全部重新綁定。"""
+        if index is None:
+            for i in range(len(self._bound)):
+                self._bound[i] = -1
+        else:
+            slot = index % len(self._rows)
+            if self._bound[slot] == index:
+                self._bound[slot] = -1
+
+    def scroll_to(self, offset):
+        """捲動到指定偏移（px），並停止慣性。"""
+        self._velocity = 0.0
+        self._scroll = max(0.0, min(float(offset), self.max_scroll()))
+
+    def update(self):
+        """推進慣性捲動（每幀一次）。"""
+        if not self._velocity:
+            return
+        limit = self.max_scroll()
+        self._scroll += self._velocity
+        self._velocity *= _FLING_FRICTION
+        if self._scroll <= 0 or self._scroll >= limit:
+            self._scroll = max(0.0, min(self._scroll, limit))
+            self._velocity = 0.0
+        elif abs(self._velocity) < _FLING_MIN_SPEED:
+            self._velocity = 0.0
+
+    def draw(self, display, offset_x=0, offset_y=0):
+        if not self.visible:
+            return
+        total = self.count()
+        if total == 0:
+            return
+        row_h = self.row_h
+        pool = len(self._rows)
+        scroll = int(self._scroll)
+        first = scroll // row_h
+        last = min((scroll + self.h - 1) // row_h, total - 1)
+        base_x = self.x + offset_x
+        base_y = self.y + offset_y - scroll
+
+        push_clip(display, base_x, self.y + offset_y, self.w, self.h)
+        try:
+            for index in range(first, last + 1):
+                slot = index % pool
+                row = self._rows[slot]
+                if self._bound[slot] != index:
+                    self._bind_row(row, index)
+                    self._bound[slot] = index
+                row_y = base_y + index * row_h
+                if row.in_view(base_x, row_y):
+                    row.draw(display, base_x, row_y)
+        finally:
+            pop_clip(display)
+
+    def handle_touch(self, tx, ty):
+        if not self.visible or not self.contains(tx, ty):
+            return False
+        self._velocity = 0.0
+        index = int(ty - self.y + self._scroll) // self.row_h
+        if index < self.count() and self.on_select:
+            self.on_select(index)
+        return True
+
+    def handle_scroll(self, tx, ty, dy):
+        if (not self.visible or not self.contains(tx, ty)
+                or self.max_scroll() == 0):
+            return False
+        self._velocity = 0.0
+        self._scroll = max(
+            0.0, min(self._scroll - dy, self.max_scroll())
+        )
+        return True
+
+    def handle_fling(self, vy):
+        self._velocity = -vy
+
+
+class Sparkline(Widget):
+    """折線圖 / sparkline：把 array('f') 序列抽樣到像素寬度後繪製。
+
+    資料點多於寬度時以 min/max 分桶抽樣（每個像素欄保留該區間的
+    最低與最高值，並銜接前一欄），尖峰不會被平均掉，每欄畫一條垂直線段；
+    資料點少於寬度時直接連線，有 PicoVector 時以抗鋸齒折線繪製。
+    抽樣結果快取到序列變更（set_series / mark_dirty）為止，
+    每幀繪製成本只跟寬度有關，與序列長度無關。
+
+    bucket > 0 時為固定分桶模式（ring buffer 持續新增資料用）：每欄固定
+    bucket 筆、靠右對齊（最新資料在右緣），新增資料後呼叫 advance()，
+    只重算最後一欄，滿一欄才把欄位左移一格，不重新抽樣整個序列。
+
+    Args:
+        x, y, w, h: 圖表範圍。
+        color: 線條顏色。
+        vector: PicoVector 實例（可為 None）。
+        transform: 與 vector 綁定的 Transform（vector 不為 None 時必填）。
+        lo, hi: 固定縱軸範圍；None 表示依資料自動縮放。
+        thickness: 向量折線粗細（px）。
+        bucket: 固定分桶模式的每欄筆數；0 = 依序列長度抽樣。
+    """
+
+    def __init__(self, x=0, y=0, w=100, h=30, color=PRIMARY,
+                 vector=None, transform=None, lo=None, hi=None,
+                 thickness=2, bucket=0):
+        super().__init__(x=x, y=y, w=w, h=h)
+        self.color = color
+        self.lo = lo
+        self.hi = hi
+        self.thickness = thickness
+        self.bucket = bucket
+        self._fill = 0      # 固定分桶模式：最後一欄已有的筆數
+        self._range_lo = 0.0
+        self._range_hi = 0.0
+        self._vector = vector
+        self._transform = transform
+        self._series = None
+        self._head = 0
+        self._count = 0
+
+        # 抽樣快取：每欄 min/max 值與對應的像素位置（相對於圖表左上角）
+        self._col_lo = array('f', [0] * w)
+        self._col_hi = array('f', [0] * w)
+        self._xs = array('h', [0] * w)
+        self._top = array('h', [0] * w)
+        self._bot = array('h', [0] * w)
+        self._cols = 0
+        self._dense = False
+        self._poly = None
+
+    def set_series(self, series, head=0, count=None):
+        """設定資料序列。
+
+        Args:
+            series: array('f')（或任何可索引的數值序列）。
+            head: 最舊元素的索引（ring buffer 用），預設 0。
+            count: 有效元素數，預設 len(series)。
+        """
+        self._series = series
+        self._head = head
+        self._count = len(series) if count is None else count
+        self.mark_dirty()
+
+    def advance(self, head, count, added=1):
+        """Ring buffer 新增 added 筆（0 = 只改寫了最新一筆）後呼叫。
+
+        固定分桶模式下只重算最後一欄（滿一欄時先把欄位左移一格），
+        縱軸範圍不變時也只重算該欄的像素位置；其他情況標記為 dirty，
+        下次繪製時完整重算。
+        """
+        self._head = head
+        self._count = count
+        if (self._dirty or not self.bucket or added > 1
+                or not self._cols):
+            self.mark_dirty()
+            return
+        cols = self._cols
+        shifted = grew = False
+        if added and self._fill >= self.bucket:
+            if cols < self.w:
+                cols += 1
+                self._cols = cols
+                grew = True
+            else:
+                shifted = True
+                col_lo = self._col_lo
+                col_hi = self._col_hi
+                for c in range(cols - 1):
+                    col_lo[c] = col_lo[c + 1]
+                    col_hi[c] = col_hi[c + 1]
+            self._fill = 0
+        self._fill += added
+        self._bucket_range(cols - 1, count - self._fill, count)
+        if self._scale_range() != (self._range_lo, self._range_hi):
+            self._layout()
+            return
+        if shifted:
+            # 欄位左移了一格，像素位置跟著左移
+            top = self._top
+            bot = self._bot
+            for c in range(cols - 1):
+                top[c] = top[c + 1]
+                bot[c] = bot[c + 1]
+        elif grew:
+            self._set_xs()   # 靠右對齊，欄數增加時整體左移
+        self._layout_col(cols - 1)
+
+    def _bucket_range(self, c, start, end):
+        """第 c 欄 = 序列 [start, end) 的 min/max（含前一筆以銜接前一欄）。"""
+        series = self._series
+        size = len(series)
+        head = self._head
+        if start > 0:
+            start -= 1
+        lo = hi = series[(head + start) % size]
+        for i in range(start + 1, end):
+            v = series[(head + i) % size]
+            if v < lo:
+                lo = v
+            elif v > hi:
+                hi = v
+        self._col_lo[c] = lo
+        self._col_hi[c] = hi
+
+    def _decimate_buckets(self):
+        """固定分桶：每欄 bucket 筆，只保留最後 w 欄。"""
+        k = self.bucket
+        n = self._count
+        total = (n + k - 1) // k
+        cols = min(total, self.w)
+        first = total - cols
+        for c in range(cols):
+            start = (first + c) * k
+            self._bucket_range(c, start, min(start + k, n))
+        self._fill = n - (total - 1) * k
+        self._cols = cols
+        self._dense = True
+
+    def _decimate(self):
+        """把序列抽樣成欄位 min/max（只在資料變更時執行）。"""
+        if self.bucket:
+            self._decimate_buckets()
+            return
+        series = self._series
+        n = self._count
+        size = len(series)
+        head = self._head
+        col_lo = self._col_lo
+        col_hi = self._col_hi
+        if n > self.w:
+            cols = self.w
+            for c in range(cols):
+                start = c * n // cols
+                end = (c + 1) * n // cols
+                if start > 0:
+                    start -= 1  # 銜接前一欄，垂直線段才會連續
+                lo = hi = series[(head + start) % size]
+                for i in range(start + 1, end):
+                    v = series[(head + i) % size]
+                    if v < lo:
+                        lo = v
+                    elif v > hi:
+                        hi = v
+                col_lo[c] = lo
+                col_hi[c] = hi
+            self._dense = True
+        else:
+            cols = n
+            for c in range(cols):
+                v = series[(head + c) % size]
+                col_lo[c] = v
+                col_hi[c] = v
+            self._dense = False
+        self._cols = cols
+
+    def _scale_range(self):
+        """縱軸範圍 (lo, hi)。"""
+        cols = self._cols
+        col_lo = self._col_lo
+        col_hi = self._col_hi
+        lo = self.lo
+        hi = self.hi
+        if lo is None or hi is None:
+            d_lo = min(col_lo[c] for c in range(cols))
+            d_hi = max(col_hi[c] for c in range(cols))
+            lo = d_lo if lo is None else lo
+            hi = d_hi if hi is None else hi
+        return lo, hi
+
+    def _set_xs(self):
+        cols = self._cols
+        last_x = self.w - 1
+        for c in range(cols):
+            if self.bucket:
+                self._xs[c] = self.w - cols + c   # 靠右對齊
+            elif self._dense:
+                self._xs[c] = c
+            else:
+                self._xs[c] = c * last_x // (cols - 1) if cols > 1 else 0
+
+    def _layout_col(self, c):
+        """第 c 欄的像素位置。"""
+        lo = self._range_lo
+        span = self._range_hi - lo
+        if span <= 0:
+            span = 1.0
+        bottom = self.h - 1
+        scale = bottom / span
+        top = bottom - int((self._col_hi[c] - lo) * scale)
+        bot = bottom - int((self._col_lo[c] - lo) * scale)
+        self._top[c] = max(0, min(top, bottom))
+        self._bot[c] = max(0, min(bot, bottom))
+
+    def _layout(self):
+        """把欄位值換算成像素位置，並重建向量折線。"""
+        cols = self._cols
+        self._range_lo, self._range_hi = self._scale_range()
+        for c in range(cols):
+            self._layout_col(c)
+        self._set_xs()
+
+        self._poly = None
+        if self._vector and not self._dense and cols > 1:
+            try:
+                from picovector import Polygon
+                poly = Polygon()
+                xs = self._xs
+                ys = self._top
+                for c in range(1, cols):
+                    poly.line(xs[c - 1], ys[c - 1], xs[c], ys[c],
+                              self.thickness)
+                self._poly = poly
+            except (ImportError, AttributeError):
+                self._poly = None
+
+    def draw(self, display, offset_x=0, offset_y=0):
+        if not self.visible or not self._count:
+            return
+        if self._dirty:
+            self._decimate()
+            self._layout()
+            self._dirty = False
+        ox = self.x + offset_x
+        oy = self.y + offset_y
+        cols = self._cols
+        xs = self._xs
+        top = self._top
+        display.set_pen(display.create_pen(*self.color))
+        if self._dense:
+            bot = self._bot
+            for c in range(cols):
+                display.rectangle(ox + xs[c], oy + top[c],
+                                  1, bot[c] - top[c] + 1)
+        elif self._poly is not None:
+            t = self._transform
+            t.reset()
+            t.translate(ox, oy)
+            self._vector.draw(self._poly)
+            t.reset()
+        elif cols == 1:
+            display.pixel(ox + xs[0], oy + top[0])
+        else:
+            for c in range(1, cols):
+                display.line(ox + xs[c - 1], oy + top[c - 1],
+                             ox + xs[c], oy + top[c])
@@ -0,0 +1,344 @@
+"""
+Weather data — Open-Meteo 回應的精簡資料結構。
+
+搭配 json_stream 使用：解析時只把頁面需要的欄位寫進固定大小的
+array / bytearray，不保留原始 JSON 與物件樹。也可直接由 Open-Meteo 的
+FlatBuffers 回應（format=flatbuffers）填入，見 decode_fb()。
+
+最後一次成功的結果以 struct 打包寫入 Flash（weather_cache.bin），
+開機時立即顯示，再於背景重新驗證。
+"""
+import struct
+from array import array
+import flatbuf as fb
+from date_util import days_from_civil, weekday
+
+MAX_DAYS = 7    # 每日預報保留天數上限
+MAX_HOURS = 48  # 逐時預報保留小時數
+
+CACHE_FILE = "weather_cache.bin"
+_MAGIC = b"WR2"
+_HEAD = "<3sIB"       # magic, fetched_at, 筆數
+_REC = "<fffhfhBBB"   # lat, lon, temp, humidity, wind, code, days,
+                      # hours, hour_start
+# 每筆紀錄後接的陣列大小（bytes）：day_code, day_max, day_min, weekday,
+# hour_temp, hour_precip, hour_code
+_ARRAY_SIZES = (2 * MAX_DAYS, 4 * MAX_DAYS, 4 * MAX_DAYS, MAX_DAYS,
+                4 * MAX_HOURS, MAX_HOURS, MAX_HOURS)
+
+# Open-Meteo FlatBuffers schema（openmeteo_sdk）的欄位序號與列舉值
+_FB_UTC_OFFSET = 6                  # WeatherApiResponse.utc_offset_seconds
+_FB_CURRENT = 9
+_FB_DAILY = 10
+_FB_HOURLY = 11
+_FB_TIME = 0                        # VariablesWithTime.time（unix 秒）
+_FB_VARIABLES = 3
+_FB_VARIABLE = 0                    # VariableWithValues.variable
+_FB_VALUE = 2
+_FB_VALUES = 3
+_FB_AGGREGATION = 6
+_VAR_PRECIP_PROB = 26               # Variable enum
+_VAR_HUMIDITY = 29
+_VAR_TEMP = 47
+_VAR_CODE = 56
+_VAR_WIND = 59
+_AGG_MIN = 1                        # Aggregation enum
+_AGG_MAX = 2
+_UNIX_DAY0 = 10957                  # 1970-01-01 → 2000-01-01 的天數
+
+
+class WeatherRecord:
+    """即時天氣 + 每日預報。
+
+    Args:
+        lat: 緯度（設定值，非 API 回傳的網格座標）。
+        lon: 經度。
+
+    Attributes:
+        temp: 目前氣溫（°C）。
+        humidity: 相對濕度（%）。
+        wind: 風速（km/h）。
+        code: WMO weather code，-1 表示未知。
+        days: 已填入的預報天數。
+        day_code: 每日 WMO code（array 'h'）。
+        day_max / day_min: 每日最高 / 最低溫（array 'f'）。
+        weekday: 每日星期（0=Monday，bytearray）。
+        hours: 已填入的逐時預報小時數。
+        hour_start: 第一筆逐時資料的本地小時（0–23）。
+        hour_temp: 逐時氣溫（array 'f'，48 × 4 bytes）。
+        hour_precip: 逐時降雨機率 %（array 'b'）。
+        hour_code: 逐時 WMO code（array 'b'）。
+    """
+
+    def __init__(self, lat=0.0, lon=0.0):
+        self.lat = lat
+        self.lon = lon
+        self.temp = 0.0
+        self.humidity = 0
+        self.wind = 0.0
+        self.code = -1
+        self.has_current = False
+        self.days = 0
+        self.day_code = array("h", [-1] * MAX_DAYS)
+        self.day_max = array("f", [0] * MAX_DAYS)
+        self.day_min = array("f", [0] * MAX_DAYS)
+        self.weekday = bytearray(MAX_DAYS)
+        self.hours = 0
+        self.hour_start = 0
+        self.hour_temp = array("f", [0] * MAX_HOURS)
+        self.hour_precip = array("b", [0] * MAX_HOURS)
+        self.hour_code = array("b", [0] * MAX_HOURS)
+
+    def complete(self):
+        """是否包含即時天氣與至少一天預報。"""
+        return self.has_current and self.days > 0
+
+    def same_place(self, lat, lon):
+        """座標是否與此紀錄相同（容許 float32 誤差）。"""
+        return abs(self.lat - lat) < 1e-3 and abs(self.lon - lon) < 1e-3
+
+    def on_value(self, path, value, base=0):
+        """json_stream callback：挑出需要的欄位。
+
+        Args:
+            base: path 中本紀錄物件的起始層（多地點陣列時為 1）。
+        """
+        if len(path) < base + 2:
+            return
+        section = path[base]
+        key = path[base + 1]
+        if section == "current":
+            if value is None:
+                return
+            self.has_current = True
+            if key == "temperature_2m":
+                self.temp = value
+            elif key == "relative_humidity_2m":
+                self.humidity = value
+            elif key == "wind_speed_10m":
+                self.wind = value
+            elif key == "weather_code":
+                self.code = value
+        elif section == "daily" and len(path) == base + 3:
+            i = path[base + 2]
+            if i >= MAX_DAYS or value is None:
+                return
+            if key == "time":
+                self.weekday[i] = _weekday_of(value)
+                if i >= self.days:
+                    self.days = i + 1
+            elif key == "weather_code":
+                self.day_code[i] = value
+            elif key == "temperature_2m_max":
+                self.day_max[i] = value
+            elif key == "temperature_2m_min":
+                self.day_min[i] = value
+        elif section == "hourly" and len(path) == base + 3:
+            i = path[base + 2]
+            if i >= MAX_HOURS:
+                return
+            if key == "time":
+                # 'YYYY-MM-DDTHH:MM'
+                if i == 0:
+                    try:
+                        self.hour_start = int(value[11:13])
+                    except (ValueError, TypeError):
+                        self.hour_start = 0
+                if i >= self.hours:
+                    self.hours = i + 1
+            elif value is None:
+                return
+            elif key == "temperature_2m":
+                self.hour_temp[i] = value
+            elif key == "precipitation_probability":
+                self.hour_precip[i] = min(int(value), 100)
+            elif key == "weather_code":
+                self.hour_code[i] = min(int(value), 127)
+
+
+def decode_fb(buf, record):
+    """由一則 Open-Meteo FlatBuffers 訊息填入紀錄。
+
+    欄位以 struct.unpack_from 就地讀取，不建立中間物件；變數以
+    (variable, aggregation) 辨識，與請求中的順序無關。
+
+    Args:
+        buf: 訊息內容（flatbuf.read_messages 的 buffer）。
+        record: 要填入的 WeatherRecord。
+    """
+    r = fb.root(buf)
+    utc_offset = fb.scalar(buf, r, _FB_UTC_OFFSET, "<i")
+
+    cur = fb.table(buf, r, _FB_CURRENT)
+    if cur:
+        start, n = fb.vector(buf, cur, _FB_VARIABLES)
+        for i in range(n):
+            v = fb.indirect(buf, start + 4 * i)
+            var = fb.scalar(buf, v, _FB_VARIABLE, "B")
+            value = fb.scalar(buf, v, _FB_VALUE, "<f", 0.0)
+            if var == _VAR_TEMP:
+                record.temp = value
+            elif var == _VAR_HUMIDITY:
+                record.humidity = _to_int(value, 0)
+            elif var == _VAR_WIND:
+                record.wind = value
+            elif var == _VAR_CODE:
+                record.code = _to_int(value, -1)
+        record.has_current = True
+
+    daily = fb.table(buf, r, _FB_DAILY)
+    if daily:
+        day0 = (fb.scalar(buf, daily, _FB_TIME, "<q") + utc_offset) // 86400
+        start, n = fb.vector(buf, daily, _FB_VARIABLES)
+        for i in range(n):
+            v = fb.indirect(buf, start + 4 * i)
+            var = fb.scalar(buf, v, _FB_VARIABLE, "B")
+            agg = fb.scalar(buf, v, _FB_AGGREGATION, "B")
+            p, count = fb.vector(buf, v, _FB_VALUES)
+            count = min(count, MAX_DAYS)
+            if var == _VAR_CODE:
+                _copy_values(buf, p, count, record.day_code, 32767)
+            elif var == _VAR_TEMP and agg == _AGG_MAX:
+                _copy_values(buf, p, count, record.day_max)
+            elif var == _VAR_TEMP and agg == _AGG_MIN:
+                _copy_values(buf, p, count, record.day_min)
+            else:
+                continue
+            record.days = max(record.days, count)
+        for j in range(record.days):
+            record.weekday[j] = weekday(day0 + j - _UNIX_DAY0)
+
+    hourly = fb.table(buf, r, _FB_HOURLY)
+    if hourly:
+        t0 = fb.scalar(buf, hourly, _FB_TIME, "<q") + utc_offset
+        record.hour_start = t0 // 3600 % 24
+        start, n = fb.vector(buf, hourly, _FB_VARIABLES)
+        for i in range(n):
+            v = fb.indirect(buf, start + 4 * i)
+            var = fb.scalar(buf, v, _FB_VARIABLE, "B")
+            p, count = fb.vector(buf, v, _FB_VALUES)
+            count = min(count, MAX_HOURS)
+            if var == _VAR_TEMP:
+                _copy_values(buf, p, count, record.hour_temp)
+            elif var == _VAR_PRECIP_PROB:
+                _copy_values(buf, p, count, record.hour_precip, 100)
+            elif var == _VAR_CODE:
+                _copy_values(buf, p, count, record.hour_code, 127)
+            else:
+                continue
+            record.hours = max(record.hours, count)
+
+
+def _copy_values(buf, p, count, out, limit=None):
+    """把 float 向量複製進 out；有 limit 時轉成整數並限制上限。"""
+    for j in range(count):
+        value = struct.unpack_from("<f", buf, p + 4 * j)[0]
+        if limit is not None:
+            value = min(_to_int(value, -1), limit)
+        out[j] = value
+
+
+def _to_int(value, default):
+    """float → int；缺值（NaN）時回傳 default。"""
+    if value != value:
+        return default
+    return int(value)
+
+
+def _weekday_of(date_str):
+    """'YYYY-MM-DD' → 星期（0=Monday），格式錯誤時回傳 0。"""
+    try:
+        return weekday(days_from_civil(
+            int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])
+        ))
+    except ValueError:
+        return 0
+
+
+def dispatch(records):
+    """建立 json_stream callback，把回應分派到各地點的紀錄。
+
+    單一地點時 Open-Meteo 回傳物件，多地點時回傳物件陣列，
+    以最外層 path 是否為陣列索引區分。
+    """
+    first = records[0]
+
+    def on_value(path, value):
+        if not path:
+            return
+        i = path[0]
+        if isinstance(i, int):
+            if i < len(records):
+                records[i].on_value(path, value, 1)
+        else:
+            first.on_value(path, value)
+    return on_value
+
+
+def save_cache(records, fetched_at):
+    """把紀錄寫入 Flash。
+
+    Args:
+        records: WeatherRecord 清單。
+        fetched_at: 抓取時的 epoch 秒。
+
+    Returns:
+        是否寫入成功。
+    """
+    try:
+        with open(CACHE_FILE, "wb") as f:
+            f.write(struct.pack(_HEAD, _MAGIC, int(fetched_at),
+                                len(records)))
+            for r in records:
+                f.write(struct.pack(
+                    _REC, r.lat, r.lon, r.temp,
+                    int(r.humidity), r.wind, int(r.code), r.days,
+                    r.hours, r.hour_start,
+                ))
+                for buf in _arrays(r):
+                    f.write(buf)
+        return True
+    except OSError:
+        return False
+
+
+def load_cache():
+    """讀取 Flash 中的紀錄。
+
+    Returns:
+        (records, fetched_at)；檔案不存在或格式不符時回傳 (None, 0)。
+    """
+    try:
+        with open(CACHE_FILE, "rb") as f:
+            magic, fetched_at, count = struct.unpack(
+                _HEAD, f.read(struct.calcsize(_HEAD))
+            )
+            if magic != _MAGIC:
+                return None, 0
+            size = struct.calcsize(_REC)
+            records = []
+            for _ in range(count):
+                (lat, lon, temp, humidity, wind, code, days, hours,
+                 hour_start) = struct.unpack(_REC, f.read(size))
+                r = WeatherRecord(lat, lon)
+                r.temp = temp
+                r.humidity = humidity
+                r.wind = wind
+                r.code = code
+                r.has_current = True
+                r.days = min(days, MAX_DAYS)
+                r.hours = min(hours, MAX_HOURS)
+                r.hour_start = hour_start
+                for buf, n in zip(_arrays(r), _ARRAY_SIZES):
+                    if f.readinto(buf) != n:
+                        return None, 0
+                records.append(r)
+        return records, fetched_at
+    except (OSError, ValueError):
+        return None, 0
+
+
+def _arrays(r):
+    """紀錄中需持久化的陣列，順序與 _ARRAY_SIZES 一致。"""
+    return (r.day_code, r.day_max, r.day_min, r.weekday,
+            r.hour_temp, r.hour_precip, r.hour_code)
@@ -0,0 +1,340 @@
+"""
+WebSocket client — 以 uasyncio stream 實作的 RFC 6455 用戶端。
+
+- 讀取一律以精確長度讀入預先配置的 bytearray（有 readinto 時直接寫入），
+  大於一個 TCP segment 的 frame 不會因短讀而錯亂。
+- 分段訊息（continuation frames）在同一塊 buffer 中重組，超過 max_size
+  時以 1009 關閉連線。
+- 送出的 payload 在傳送 buffer 中就地 mask（有 viper 時走快速路徑），
+  mask key 直接寫入傳送 buffer；收到 masked frame 時以同一路徑解 mask。
+- Ping 自動回 Pong；Close 依規範回應並等待對方關閉。
+- wss:// 經 tls 模組連線，重連時沿用同一主機的 TLS context 與 session。
+
+recv() 回傳的 memoryview 指向內部 buffer，下次 recv() 前有效，
+解析訊息時不需要為每個 frame 配置新物件。
+"""
+import struct
+import uos
+from random import getrandbits
+import ubinascii
+import uasyncio as asyncio
+import tls
+
+# Opcodes
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Close status codes
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+_CLOSE_TIMEOUT = 2      # 等待對方回應 Close 的秒數
+_TX_SIZE = 256          # 傳送 buffer 初始大小（header + mask + payload）
+
+try:
+    import micropython
+
+    @micropython.viper
+    def _mask(buf, off: int, n: int, key, key_off: int):
+        # buf[off:off+n] ^= key[key_off:key_off+4]（循環）
+        p = ptr8(buf)
+        k = ptr8(key)
+        for i in range(n):
+            p[off + i] = p[off + i] ^ k[key_off + (i & 3)]
+except (ImportError, AttributeError):
+    def _mask(buf, off, n, key, key_off):
+        for i in range(n):
+            buf[off + i] ^= key[key_off + (i & 3)]
+
+
+class WebSocketClient:
+    """WebSocket 用戶端連線。
+
+    Args:
+        host: 伺服器主機名稱。
+        path: 請求路徑（含 query string）。
+        port: 連接埠。
+        secure: 是否使用 TLS（wss://）。
+        max_size: 單一訊息（重組後）上限，同時是接收 buffer 大小。
+
+    Attributes:
+        open: 連線是否可用（握手完成且尚未關閉）。
+        close_code: 對方送來的關閉狀態碼，未關閉時為 None。
+    """
+
+    def __init__(self, host, path, port=443, secure=True, max_size=4096):
+        self.host = host
+        self.path = path
+        self.port = port
+        self.secure = secure
+        self.open = False
+        self.close_code = None
+        self._reader = None
+        self._writer = None
+        self._buf = bytearray(max_size)
+        self._mv = memoryview(self._buf)
+        self._hdr = bytearray(8)
+        self._hdr_mv = memoryview(self._hdr)
+        self._ctl = bytearray(125)      # 控制 frame payload 上限
+        self._ctl_mv = memoryview(self._ctl)
+        self._tx = bytearray(_TX_SIZE)
+        self._readinto = None
+
+    @property
+    def buffer(self):
+        """接收 buffer；recv() 回傳的訊息一律從 buffer[0] 起存放。"""
+        return self._buf
+
+    # --- 連線 ---
+
+    async def connect(self):
+        """建立連線並完成 HTTP Upgrade 握手。
+
+        Raises:
+            OSError: 伺服器未回應 101 Switching Protocols。
+        """
+        key = ubinascii.b2a_base64(uos.urandom(16)).strip()
+        handshake = (
+            "GET {} HTTP/1.1\r\n"
+            "Host: {}:{}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            "Sec-WebSocket-Key: {}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "\r\n"
+        ).format(self.path, self.host, self.port, key.decode())
+        if self.secure:
+            reader, writer, status = await tls.request(
+                self.host, self.port, handshake.encode()
+            )
+        else:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            writer.write(handshake.encode())
+            await writer.drain()
+            status = await reader.readline()
+        self._reader = reader
+        self._writer = writer
+        self._readinto = getattr(reader, "readinto", None)
+
+        if b" 101 " not in status:
+            self._shutdown()
+            raise OSError("WS handshake: " + status.decode().strip())
+        while True:
+            line = await reader.readline()
+            if not line or line == b"\r\n":
+                break
+        self.open = True
+        self.close_code = None
+
+    def _shutdown(self):
+        self.open = False
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except OSError:
+                pass
+        self._reader = None
+        self._writer = None
+
+    # --- 讀取 ---
+
+    async def _read_exact(self, mv):
+        """把 mv 讀滿，連線中斷時丟出 EOFError。"""
+        n = len(mv)
+        got = 0
+        readinto = self._readinto
+        while got < n:
+            if readinto is not None:
+                k = await readinto(mv[got:])
+            else:
+                chunk = await self._reader.read(n - got)
+                k = len(chunk)
+                mv[got:got + k] = chunk
+            if not k:
+                raise EOFError("connection closed")
+            got += k
+
+    async def _read_header(self):
+        """讀取 frame header → (fin, opcode, length, masked)。"""
+        hdr = self._hdr
+        mv = self._hdr_mv
+        await self._read_exact(mv[:2])
+        b0 = hdr[0]
+        b1 = hdr[1]
+        length = b1 & 0x7F
+        if length == 126:
+            await self._read_exact(mv[:2])
+            length = struct.unpack_from(">H", hdr, 0)[0]
+        elif length == 127:
+            await self._read_exact(mv[:8])
+            length = struct.unpack_from(">Q", hdr, 0)[0]
+        return b0 & 0x80, b0 & 0x0F, length, b1 & 0x80
+
+    async def _read_payload(self, buf, mv, off, length, masked):
+        """讀取 payload 到 buf[off:]（伺服器 frame 通常不 mask）。"""
+        if masked:
+            await self._read_exact(self._hdr_mv[4:8])
+            await self._read_exact(mv[off:off + length])
+            _mask(buf, off, length, self._hdr, 4)
+        else:
+            await self._read_exact(mv[off:off + length])
+
+    async def _discard(self, length):
+        """丟棄 length bytes（訊息過大時）。"""
+        mv = self._mv
+        size = len(mv)
+        while length > 0:
+            n = min(length, size)
+            await self._read_exact(mv[:n])
+            length -= n
+
+    async def recv(self):
+        """接收下一則完整的資料訊息。
+
+        控制 frame 在此處理：Ping 自動回 Pong、Pong 忽略、
+        Close 回應後結束。
+
+        Returns:
+            (opcode, memoryview)，opcode 為 OP_TEXT 或 OP_BINARY；
+            memoryview 在下次 recv() 前有效。連線已關閉時回傳 None。
+
+        Raises:
+            ValueError: 訊息超過 max_size 或違反協定（連線已關閉）。
+            EOFError: 連線中斷。
+        """
+        buf = self._buf
+        mv = self._mv
+        size = 0
+        msg_op = None
+        while self.open:
+            fin, opcode, length, masked = await self._read_header()
+            if opcode >= OP_CLOSE:
+                if length > 125:
+                    await self._fail(CLOSE_PROTOCOL_ERROR, "control frame")
+                await self._read_payload(
+                    self._ctl, self._ctl_mv, 0, length, masked
+                )
+                payload = self._ctl_mv[:length]
+                if opcode == OP_PING:
+                    await self.send(payload, OP_PONG)
+                elif opcode == OP_CLOSE:
+                    self.close_code = (
+                        struct.unpack_from(">H", self._ctl, 0)[0]
+                        if length >= 2 else CLOSE_NORMAL
+                    )
+                    # 回應 Close 後由伺服器關閉 TCP
+                    try:
+                        await self._send_close(self.close_code)
+                    finally:
+                        self._shutdown()
+                    return None
+                continue
+
+            if opcode == OP_CONT:
+                if msg_op is None:
+                    await self._fail(CLOSE_PROTOCOL_ERROR, "continuation")
+            elif msg_op is not None:
+                await self._fail(CLOSE_PROTOCOL_ERROR, "interleaved")
+            else:
+                msg_op = opcode
+            if size + length > len(buf):
+                await self._discard(length)
+                await self._fail(CLOSE_TOO_BIG, "message too large")
+            await self._read_payload(buf, mv, size, length, masked)
+            size += length
+            if fin:
+                return msg_op, mv[:size]
+        return None
+
+    async def _fail(self, code, reason):
+        """以 code 關閉連線並丟出 ValueError。"""
+        try:
+            await self._send_close(code)
+        except OSError:
+            pass
+        self._shutdown()
+        raise ValueError(reason)
+
+    # --- 傳送 ---
+
+    async def send(self, data, opcode=OP_TEXT):
+        """送出一個 frame（Client → Server 必須 mask）。
+
+        Args:
+            data: str / bytes / bytearray / memoryview。
+            opcode: OP_TEXT、OP_BINARY 或控制 opcode。
+
+        Raises:
+            OSError: 尚未連線或已關閉。
+        """
+        if self._writer is None:
+            raise OSError("not connected")
+        if isinstance(data, str):
+            data = data.encode()
+        n = len(data)
+        if n < 126:
+            head = 2
+        elif n < 65536:
+            head = 4
+        else:
+            head = 10
+        need = head + 4 + n
+        if need > len(self._tx):
+            self._tx = bytearray(need)
+        tx = self._tx
+        tx[0] = 0x80 | opcode
+        if head == 2:
+            tx[1] = 0x80 | n
+        elif head == 4:
+            tx[1] = 0x80 | 126
+            struct.pack_into(">H", tx, 2, n)
+        else:
+            tx[1] = 0x80 | 127
+            struct.pack_into(">Q", tx, 2, n)
+        # mask key 逐 16 bits 寫入（small int，不配置 bytes 物件）
+        r = getrandbits(16)
+        tx[head] = r >> 8
+        tx[head + 1] = r & 0xFF
+        r = getrandbits(16)
+        tx[head + 2] = r >> 8
+        tx[head + 3] = r & 0xFF
+        off = head + 4
+        tx[off:off + n] = data
+        _mask(tx, off, n, tx, head)
+        self._writer.write(memoryview(tx)[:need])
+        await self._writer.drain()
+
+    async def ping(self, data=b""):
+        """送出 Ping。"""
+        await self.send(data, OP_PING)
+
+    async def _send_close(self, code):
+        if self._writer is None:
+            return
+        await self.send(struct.pack(">H", code), OP_CLOSE)
+
+    async def close(self, code=CLOSE_NORMAL):
+        """關閉握手：送出 Close，等待對方的 Close（最多 _CLOSE_TIMEOUT 秒）。"""
+        if not self.open:
+            self._shutdown()
+            return
+        try:
+            await self._send_close(code)
+            await asyncio.wait_for(self._drain_until_close(), _CLOSE_TIMEOUT)
+        except Exception:
+            pass
+        self._shutdown()
+
+    async def _drain_until_close(self):
+        while True:
+            fin, opcode, length, masked = await self._read_header()
+            if opcode == OP_CLOSE:
+                return
+            await self._discard(length + (4 if masked else 0))